@@ -15,7 +15,7 @@ from typing import Callable, List, Union
 import readdy
 
 from ...utils.topology import Topology
-from ...reactions import BondBreaking, StructuralReaction
+from ...reactions import BondBreaking, StructuralReaction, Recipe
 
 from softnanotools.logger import Logger
 logger = Logger(__name__)
@@ -25,6 +25,8 @@ class Gel(Topology):
     A Gel is a ReaDDy Topology that can be used
     to generate systems to model hydrogels.
     """
+    __slots__ = ('monomer', 'unbonded')
+
     def __init__(
         self,
         top_type,
@@ -73,7 +75,9 @@ class Gel(Topology):
         released: str = None,
         reaction_type: Union[str, StructuralReaction] = 'polymer',
         rate: Union[float, Callable] = None,
-    ):
+        instrument: bool = False,
+        scission_rate: float = None,
+    ) -> StructuralReaction:
         """Registers the decay of unbonded topology particles
         to released particles to a system
 
@@ -81,12 +85,27 @@ class Gel(Topology):
             system: A ReaDDy system instance
             released: name of the released particle aka the product
             reaction_type: the name or a custom scheme of a reaction type
-            rate: constant rate or pre-defined rate function
-
+            rate: constant rate or pre-defined rate function, where
+                rate functions need to come from intermediate_rate for
+                the probabilistic mode of the batched reaction type.
+                Gel.register_degradation creates unbonded particles with
+                an ordinary reaction, after which ReaDDy does not
+                re-evaluate the rate, so intermediate_rate does not work
+                with it
+            instrument: collect statistics on every call of the reaction
+            scission_rate: per-particle rate for the probabilistic mode
+                of the batched reaction type, by default every unbonded
+                particle of a topology is released in one call
+
+        Returns:
+            The StructuralReaction that was registered
         """
 
         if isinstance(reaction_type, StructuralReaction):
+            if instrument:
+                reaction_type.instrument()
             reaction_type.register(system)
+            return reaction_type
 
         if not released:
             released = 'released'
@@ -94,7 +113,7 @@ class Gel(Topology):
         name = 'decay'
 
         def function(topology):
-            recipe = readdy.StructuralReactionRecipe(topology)
+            recipe = Recipe(topology)
             index = np.random.randint(0, len(topology.particles))
             if topology.particles[index].type == self.unbonded:
                 recipe.separate_vertex(index)
@@ -104,18 +123,18 @@ class Gel(Topology):
         # parse rate options
         if isinstance(rate, Callable):
             rate_function = rate
+            rate = getattr(rate_function, 'rate', None)
 
-        if isinstance(rate, (float, int)):
-            rate_function = lambda x: rate
-
-        if not rate:
-            rate_function = lambda x: 10000.0
+        else:
+            rate = float(rate) if rate else 10000.0
+            rate_function = lambda topology: rate
 
         default = StructuralReaction(
             function,
             name=name,
             topology_type=self.top_type,
-            rate_function=rate_function
+            rate_function=rate_function,
+            instrument=instrument,
         )
 
         bond_breaking_instance = BondBreaking(
@@ -124,19 +143,25 @@ class Gel(Topology):
             released,
             name=name,
             topology_type=self.top_type,
-            rate_function=rate_function
+            rate_function=rate_function,
+            instrument=instrument,
+            scission_rate=scission_rate,
+            rate=rate,
         )
 
+        # only the requested scheme is created
         reaction_types = {
-            'legacy': default,
-            'polymer': bond_breaking_instance.polymer,
-            'diatomic': bond_breaking_instance.diatomic
+            'legacy': lambda: default,
+            'polymer': lambda: bond_breaking_instance.polymer,
+            'diatomic': lambda: bond_breaking_instance.diatomic,
+            'batched': lambda: bond_breaking_instance.batched,
         }
 
         logger.info(f'Registering reaction type: {reaction_type}')
-        reaction_types[reaction_type].register(system)
+        reaction = reaction_types[reaction_type]()
+        reaction.register(system)
 
-        return
+        return reaction
 
     def register_degradation(
         self,
@@ -145,14 +170,30 @@ class Gel(Topology):
         rate: float = 1e-3,
         radius: float = 2.0
     ):
+        """Registers the enzymatic degradation of monomers to unbonded
+        topology particles to a system
+
+        If the system is a hydrogels.System, the reaction is added to its
+        reaction registry, so that gels sharing the same particle types
+        only register the reaction once when a simulation is created
 
-        system.reactions.add_enzymatic(
-            name="degradation",
+        Parameters:
+            system: A ReaDDy system instance
+            enzyme: name of the enzyme species
+            rate: rate of the degradation
+            radius: reaction radius
+        """
+        settings = dict(
             type_catalyst=enzyme,
             type_from=self.monomer,
             type_to=self.unbonded,
             rate=rate,
             educt_distance=radius
         )
+        registry = getattr(system, 'reaction_registry', None)
+        if registry is not None:
+            return registry.add_enzymatic('degradation', **settings)
+
+        system.reactions.add_enzymatic(name="degradation", **settings)
 
         return
@@ -13,6 +13,8 @@ class AbstractPolymer(Topology):
     Wrapper for topology with basic Polymer operations
     that can be shared amongst many polymers.
     """
+    __slots__ = ('start',)
+
     def __init__(self, top_type : str, **kwargs):
         self.start = kwargs.get('start', np.array([[0., 0., 0.]]))
         super().__init__(top_type, **kwargs)
@@ -37,6 +39,8 @@ class LinearPolymer(AbstractPolymer):
     """
     Linear Polymers are generated as a chain of atoms.
     """
+    __slots__ = ('n',)
+
     def __init__(
         self, 
         top_type : str, 
@@ -73,6 +77,8 @@ class CrosslinkingPolymer(AbstractPolymer):
     """
     Linear Polymers are generated as a chain of atoms.
     """
+    __slots__ = ('kap', 'lam')
+
     def __init__(
         self, 
         top_type : str, 
@@ -5,6 +5,8 @@ logger = Logger(__name__)
 
 from .spatial import *
 from .structural import *
+from .statistics import ReactionStatistics, dump_statistics
+from .events import EventRecorder, load_events
 
 if __name__ == '__main__':
     import doctest
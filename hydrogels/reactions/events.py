@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""Records the individual events of structural reactions in a compact
+binary format
+
+Classes:
+    EventRecorder: buffers events and flushes them to a binary file
+
+Functions:
+    load_events: reads a file written by an EventRecorder
+"""
+from pathlib import Path
+from typing import List, Union
+import json
+
+import numpy as np
+import readdy
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+EVENT_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('topology', '<i8'),
+    ('vertex', '<i8'),
+    ('old', '<i2'),
+    ('new', '<i2'),
+    ('edge', '<i8'),
+])
+
+# values of the edge field for events that do not remove a single edge
+NO_EDGE = -1
+SEPARATED = -2
+
+class EventRecorder:
+    """Records every change that a structural reaction makes to a topology
+    as a (time, topology, vertex, old, new, edge) record of 38 bytes:
+
+        time: time of the step in which the event happened, or NaN if
+            the recorder has not been attached to a simulation
+        topology: smallest particle id of the topology at the time of
+            the event, which does not depend on the order of its
+            vertices. Particle ids are never reused, so after a fission
+            every fragment has its own id and the fragment that contains
+            the smallest particle keeps the id of the parent. The id is
+            cached for every topology by the ids of its first and last
+            vertex and its number of vertices, so it is only looked up
+            again once the topology has changed size
+        vertex: particle id of the vertex that was changed
+        old, new: codes of the particle type before and after the event,
+            see EventRecorder.types
+        edge: particle id of the other vertex of a removed edge,
+            NO_EDGE (-1) for type changes and SEPARATED (-2) if all of
+            the edges of the vertex were removed
+
+    Records are kept in a preallocated buffer. If fname is given, the
+    buffer is appended to the file whenever it is full (and on flush or
+    close), otherwise it acts as a ring buffer holding the latest records.
+    The particle types are written to fname + '.json'.
+
+    Example:
+
+    ```python
+    recorder = EventRecorder('events.bin')
+    reaction = BondBreaking('A', 'B', 'C', recorder=recorder).polymer
+    ...
+    recorder.attach(simulation, timestep=0.01)
+    simulation.run(1000, 0.01)
+    recorder.close()
+    events = load_events('events.bin')
+    ```
+
+    Parameters:
+        fname: binary file to write records to
+        capacity: number of records held in memory
+    """
+    def __init__(
+        self,
+        fname: Union[str, Path] = None,
+        capacity: int = 65536,
+    ):
+        self.fname = Path(fname) if fname is not None else None
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.types: List[str] = []
+        self._codes = {}
+        self.position = 0
+        self.total = 0
+        self.time = np.nan
+        self._step = 0
+        self._roots = {}
+        if self.fname is not None:
+            self.fname.write_bytes(b'')
+            self._write_types()
+
+    @property
+    def types_file(self) -> Path:
+        return self.fname.with_name(self.fname.name + '.json')
+
+    def _write_types(self):
+        with open(self.types_file, 'w') as f:
+            json.dump({
+                'dtype': EVENT_DTYPE.descr,
+                'types': self.types,
+            }, f)
+
+    def _code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.types)
+            self.types.append(name)
+            if self.fname is not None:
+                self._write_types()
+        return code
+
+    def attach(
+        self,
+        simulation: readdy.Simulation,
+        timestep: float,
+        stride: int = 1,
+    ):
+        """Keeps EventRecorder.time up to date with the simulation using
+        an unsaved observable, so events are timed to within stride steps
+        """
+        def callback(_):
+            self.time = self._step * timestep
+            self._step += stride
+        simulation.observe.energy(stride, callback=callback, save=None)
+        return
+
+    def append(self, topology: int, vertex: int, old: int, new: int, edge: int):
+        if self.position == self.capacity:
+            if self.fname is not None:
+                self.flush()
+            else:
+                self.position = 0
+        self.buffer[self.position] = (
+            self.time, topology, vertex, old, new, edge
+        )
+        self.position += 1
+        self.total += 1
+
+    def _root(self, topology, vertices) -> int:
+        """Returns the smallest particle id of a topology, which is only
+        computed from every vertex on the first event of the topology
+        and after it has changed size"""
+        pid = topology.particle_id_of_vertex
+        key = (pid(vertices[0]), pid(vertices[-1]), len(vertices))
+        root = self._roots.get(key)
+        if root is None:
+            if len(self._roots) >= self.capacity:
+                self._roots.clear()
+            root = self._roots[key] = min(
+                pid(vertex) for vertex in vertices
+            )
+        return root
+
+    def record(self, topology, recipe) -> int:
+        """Records the operations of a hydrogels.reactions.Recipe before
+        it is applied to a topology and returns the number of records"""
+        operations = getattr(recipe, 'operations', None)
+        if not operations:
+            return 0
+        vertices = getattr(recipe, 'vertices', None)
+        if vertices is None:
+            vertices = topology.get_graph().get_vertices()
+        pid = topology.particle_id_of_vertex
+        ptype = topology.particle_type_of_vertex
+
+        def vertex(v):
+            # recipes are given vertices or their indices in the topology
+            return vertices[v] if isinstance(v, (int, np.integer)) else v
+
+        root = self._root(topology, vertices)
+        for kind, v, other in operations:
+            v = vertex(v)
+            old = self._code(ptype(v))
+            if kind == 'type':
+                self.append(root, pid(v), old, self._code(other), NO_EDGE)
+            elif kind == 'edge':
+                self.append(root, pid(v), old, old, pid(vertex(other)))
+            else:
+                self.append(root, pid(v), old, old, SEPARATED)
+        return len(operations)
+
+    def flush(self):
+        """Appends the buffered records to the file"""
+        if self.fname is None or self.position == 0:
+            return
+        with open(self.fname, 'ab') as f:
+            self.buffer[:self.position].tofile(f)
+        logger.debug(f'Flushed {self.position} events to {self.fname}')
+        self.position = 0
+
+    def close(self):
+        self.flush()
+
+    @property
+    def events(self) -> np.ndarray:
+        """Records held in memory in the order they were recorded"""
+        if self.fname is None and self.total > self.capacity:
+            return np.concatenate([
+                self.buffer[self.position:],
+                self.buffer[:self.position]
+            ])
+        return self.buffer[:self.position].copy()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return f'EventRecorder<{self.fname}; {self.total} events>'
+
+def load_events(fname: Union[str, Path]) -> dict:
+    """Reads the records written by an EventRecorder and returns a
+    dictionary containing an array for each field and the array of
+    particle types that the old and new codes refer to"""
+    fname = Path(fname)
+    with open(fname.with_name(fname.name + '.json'), 'r') as f:
+        header = json.load(f)
+    dtype = np.dtype([tuple(field) for field in header['dtype']])
+    records = np.fromfile(fname, dtype=dtype)
+    result = {name: records[name] for name in dtype.names}
+    result['types'] = np.array(header['types'], dtype=str)
+    return result
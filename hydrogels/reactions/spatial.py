@@ -1,8 +1,165 @@
 #!/usr/bin/env python
-"""_spatial.py - auto-generated by softnanotools"""
+"""Contains a registry for spatial reactions so that a reaction that is
+requested many times, e.g. once for every gel in a system, is only
+registered with ReaDDy once
+
+Classes:
+    SpatialReaction: a single spatial reaction and its parameters
+    SpatialReactionRegistry: deduplicated collection of spatial reactions
+"""
+from typing import Dict, Tuple
+
+import readdy
+
 from softnanotools.logger import Logger
 logger = Logger(__name__)
 
+# reactions whose educts can be swapped without changing the reaction
+SYMMETRIC = {
+    'fusion': ('type_from1', 'type_from2'),
+}
+
+class SpatialReaction:
+    """A spatial reaction that can be registered using one of the add_*
+    methods of readdy.ReactionDiffusionSystem.reactions
+
+    Parameters:
+        kind: kind of reaction e.g. 'enzymatic', 'conversion', 'fusion'
+        name: name of the reaction
+        **kwargs: species (type_*) and parameters of the reaction
+    """
+    def __init__(self, kind: str, name: str, **kwargs):
+        self.kind = kind
+        self.name = name
+        self.species = {
+            key: value for key, value in kwargs.items()
+            if key.startswith('type_')
+        }
+        self.parameters = {
+            key: value for key, value in kwargs.items()
+            if not key.startswith('type_')
+        }
+        if kind in SYMMETRIC:
+            first, second = SYMMETRIC[kind]
+            if self.species[first] > self.species[second]:
+                self.species[first], self.species[second] = \
+                    self.species[second], self.species[first]
+
+    @property
+    def signature(self) -> Tuple:
+        """Kind and species of the reaction"""
+        return (self.kind, tuple(sorted(self.species.items())))
+
+    def register(self, system: readdy.ReactionDiffusionSystem):
+        logger.debug(f'Registering {self}')
+        getattr(system.reactions, f'add_{self.kind}')(
+            name=self.name,
+            **self.species,
+            **self.parameters
+        )
+        return
+
+    def __repr__(self):
+        species = ', '.join(f'{k}={v}' for k, v in self.species.items())
+        return f'SpatialReaction<{self.kind} {self.name}; {species}>'
+
+class SpatialReactionRegistry:
+    """Collects spatial reactions for a System and registers every distinct
+    reaction exactly once when the simulation is initialised.
+
+    Reactions are identified by their kind and species, so requesting the
+    same reaction again does nothing, while requesting it with different
+    parameters (e.g. another rate) raises a ValueError.
+
+    Example:
+
+    ```python
+    registry = SpatialReactionRegistry(system)
+    registry.add_enzymatic(
+        'degradation', 'enzyme', 'monomer', 'unbonded', 1e-3, 2.0
+    )
+    registry.configure()
+    ```
+
+    Parameters:
+        system: the system that the reactions are registered to
+    """
+    def __init__(self, system: readdy.ReactionDiffusionSystem):
+        self.system = system
+        self._reactions: Dict[Tuple, SpatialReaction] = {}
+        self._registered = set()
+
+    def __len__(self):
+        return len(self._reactions)
+
+    def __contains__(self, signature: Tuple) -> bool:
+        return signature in self._reactions
+
+    @property
+    def reactions(self) -> list:
+        return list(self._reactions.values())
+
+    def _unique_name(self, name: str) -> str:
+        names = {reaction.name for reaction in self._reactions.values()}
+        if name not in names:
+            return name
+        i = 1
+        while f'{name}_{i}' in names:
+            i += 1
+        return f'{name}_{i}'
+
+    def add(self, kind: str, name: str, **kwargs) -> SpatialReaction:
+        """Adds a reaction of a given kind, where the kwargs are the
+        arguments of system.reactions.add_[kind], and returns the
+        reaction that is stored in the registry"""
+        reaction = SpatialReaction(kind, name, **kwargs)
+        existing = self._reactions.get(reaction.signature)
+        if existing is not None:
+            if existing.parameters != reaction.parameters:
+                raise ValueError(
+                    f'Conflicting parameters for {existing}: '
+                    f'{existing.parameters} != {reaction.parameters}'
+                )
+            logger.debug(f'{existing} has already been added')
+            return existing
+        reaction.name = self._unique_name(name)
+        self._reactions[reaction.signature] = reaction
+        return reaction
+
+    def add_enzymatic(
+        self,
+        name: str,
+        type_catalyst: str,
+        type_from: str,
+        type_to: str,
+        rate: float,
+        educt_distance: float,
+    ) -> SpatialReaction:
+        return self.add(
+            'enzymatic',
+            name,
+            type_catalyst=type_catalyst,
+            type_from=type_from,
+            type_to=type_to,
+            rate=rate,
+            educt_distance=educt_distance,
+        )
+
+    def configure(self) -> list:
+        """Registers every reaction that has not been registered yet and
+        returns the list of all reactions"""
+        registered_before = len(self._registered)
+        for signature, reaction in self._reactions.items():
+            if signature in self._registered:
+                continue
+            reaction.register(self.system)
+            self._registered.add(signature)
+        if len(self._registered) > registered_before:
+            logger.info(
+                f'Registered {len(self._registered)} spatial reactions'
+            )
+        return self.reactions
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
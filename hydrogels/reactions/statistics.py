@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""Low-overhead counters for instrumenting structural reactions
+
+Classes:
+    ReactionStatistics: call counts, latency and topology size histograms
+        and recipe outcomes for a single structural reaction
+"""
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterable, Union
+import json
+
+import pandas as pd
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+# latency bin edges in seconds, from 100 ns to 1 s in steps of 10^(1/3)
+LATENCY_BINS = [10 ** (i / 3) for i in range(-21, 1)]
+
+# topology sizes are binned by powers of two
+SIZE_BINS = [2 ** i for i in range(32)]
+
+OUTCOMES = ('none', 'type_changed', 'edge_removed', 'separated', 'unknown')
+
+class ReactionStatistics:
+    """Aggregates the calls of a structural reaction function in a few
+    Python integers and lists so that it can be left on for entire runs
+
+    Parameters:
+        name: name of the reaction that is being instrumented
+
+    Attributes:
+        calls: number of times the reaction function was called
+        total_time: total wall time spent in the reaction function
+        latency: counts in each of LATENCY_BINS (plus overflow)
+        sizes: counts of topology sizes in each of SIZE_BINS
+        outcomes: counts of each recipe outcome
+    """
+    def __init__(self, name: str = 'reaction'):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.latency = [0] * (len(LATENCY_BINS) + 1)
+        self.sizes = [0] * (len(SIZE_BINS) + 1)
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+
+    def record(self, elapsed: float, size: int, recipe):
+        """Records a single call of the reaction function"""
+        self.calls += 1
+        self.total_time += elapsed
+        self.latency[bisect_right(LATENCY_BINS, elapsed)] += 1
+        self.sizes[bisect_right(SIZE_BINS, size)] += 1
+        self.outcomes[getattr(recipe, 'outcome', 'unknown')] += 1
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'total_time': self.total_time,
+            'mean_time': self.mean_time,
+            'outcomes': dict(self.outcomes),
+            'latency': {
+                'bins': LATENCY_BINS,
+                'counts': list(self.latency),
+            },
+            'sizes': {
+                'bins': SIZE_BINS,
+                'counts': list(self.sizes),
+            },
+        }
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        """Histograms in long format with one row per non-empty bin"""
+        rows = []
+        for kind, edges, counts in (
+            ('latency', LATENCY_BINS, self.latency),
+            ('size', SIZE_BINS, self.sizes),
+        ):
+            lower = [0] + edges
+            upper = edges + [float('inf')]
+            for i, count in enumerate(counts):
+                if count:
+                    rows.append((self.name, kind, lower[i], upper[i], count))
+        for outcome, count in self.outcomes.items():
+            rows.append((self.name, 'outcome', outcome, outcome, count))
+        return pd.DataFrame(
+            rows,
+            columns=['reaction', 'histogram', 'lower', 'upper', 'count']
+        )
+
+    def __repr__(self):
+        return (
+            f'ReactionStatistics<{self.name}; calls={self.calls}, '
+            f'mean={self.mean_time:.3g}s>'
+        )
+
+def dump_statistics(
+    statistics: Iterable[ReactionStatistics],
+    fname: Union[str, Path],
+):
+    """Writes the statistics of many reactions to a JSON or CSV file
+    depending on the suffix of fname"""
+    statistics = [i for i in statistics if i is not None]
+    fname = Path(fname)
+    if fname.suffix == '.csv':
+        pd.concat(
+            [i.dataframe for i in statistics],
+            ignore_index=True
+        ).to_csv(fname, index=False)
+    else:
+        with open(fname, 'w') as f:
+            json.dump([i.to_dict() for i in statistics], f, indent=2)
+    logger.info(f'Written reaction statistics to {fname}')
+    return
@@ -3,30 +3,203 @@
 structural topology reactions
 
 Classes:
+    Recipe: reaction recipe that keeps track of its changes
+    StructuralReaction: wrapper for a reaction function
     BondBreaking: container for bond breaking schemes
+
+Functions:
+    vertex_types: particle types of the vertices of a topology
+    indices_of: indices of the vertices of a given type
+    intermediate_rate: rate function that is zero for topologies without
+        any intermediate particles
 """
 
-from typing import Callable
+from contextlib import contextmanager
+from typing import Callable, List
+import time
+import numpy as np
 import readdy
 
 from softnanotools.logger import Logger
 logger = Logger(__name__)
 
+from .statistics import ReactionStatistics
+from .events import EventRecorder
+
+class Recipe(readdy.StructuralReactionRecipe):
+    """readdy.StructuralReactionRecipe that counts the changes that it
+    contains, so that the outcome of a reaction can be recorded. If
+    record is True it also keeps a list of the changes (as operations)
+    for hydrogels.reactions.events.EventRecorder, which uses the
+    vertices of the topology if they are given rather than fetching
+    them again"""
+    def __init__(self, topology, record: bool = False, vertices=None):
+        super().__init__(topology)
+        self.removed_edges = 0
+        self.separated = 0
+        self.changed_types = 0
+        self.operations = [] if record else None
+        self.vertices = vertices
+
+    def remove_edge(self, vertex1, vertex2):
+        self.removed_edges += 1
+        if self.operations is not None:
+            self.operations.append(('edge', vertex1, vertex2))
+        return super().remove_edge(vertex1, vertex2)
+
+    def separate_vertex(self, vertex):
+        self.separated += 1
+        if self.operations is not None:
+            self.operations.append(('separate', vertex, None))
+        return super().separate_vertex(vertex)
+
+    def change_particle_type(self, vertex, type_to):
+        self.changed_types += 1
+        if self.operations is not None:
+            self.operations.append(('type', vertex, type_to))
+        return super().change_particle_type(vertex, type_to)
+
+    @property
+    def outcome(self) -> str:
+        if self.separated:
+            return 'separated'
+        elif self.removed_edges:
+            return 'edge_removed'
+        elif self.changed_types:
+            return 'type_changed'
+        return 'none'
+
+def vertex_types(vertices) -> List[str]:
+    """Returns the particle types of the vertices of a topology graph,
+    so that reactions look up the type of every vertex exactly once and
+    index into the result.
+
+    ReaDDy 2.0 has no bulk type query: Topology.particles copies every
+    particle and is several times slower, and mapping the accessor over
+    the vertices is slower than this comprehension, since the cost is
+    dominated by the call into ReaDDy for each vertex"""
+    return [vertex.particle_type() for vertex in vertices]
+
+def indices_of(types: List[str], kind: str) -> List[int]:
+    """Returns the indices of the entries of types that are equal to kind"""
+    return [i for i, value in enumerate(types) if value == kind]
+
+def intermediate_rate(
+    intermediate: str,
+    rate: float = 10000.0,
+    lone: bool = True,
+) -> Callable:
+    """Returns a rate function for a structural reaction that only fires
+    when there is something for it to do.
+
+    ReaDDy 2.0 only re-evaluates the rate of a topology after a topology
+    reaction has changed it, e.g. after a spatial topology reaction such
+    as molecule(A) + (E) -> molecule(B) + (E) has converted one of its
+    particles to an intermediate. Topologies without intermediates can
+    then be given a rate of zero instead of calling the reaction
+    function over and over to return empty recipes. Intermediates that
+    are created by ordinary reactions, such as the enzymatic reaction of
+    Gel.register_degradation, do not trigger a re-evaluation, so the
+    reaction would never fire and a constant rate has to be used.
+
+    Every evaluation looks up the type of every vertex (see
+    vertex_types), since ReaDDy has no cheaper per-topology count. This
+    only happens when a topology changes, whereas a constant rate calls
+    the reaction function, which does the same lookup, at every step
+    (see protocols/benchmarks/rate_functions.py).
+
+    Parameters:
+        intermediate: name of the intermediate topology species
+        rate: rate when at least one intermediate is present
+        lone: also fire for topologies with a single particle, which
+            BondBreaking.polymer releases as product particles
+    """
+    def rate_function(topology) -> float:
+        vertices = topology.get_graph().get_vertices()
+        if lone and len(vertices) == 1:
+            return rate
+        # the same single type lookup that the reactions use, so that a
+        # bulk query only has to be added to vertex_types
+        if intermediate in vertex_types(vertices):
+            return rate
+        return 0.0
+    # the constant rate is kept so that reactions can use it, see
+    # BondBreaking.batched
+    rate_function.rate = rate
+    return rate_function
+
 class StructuralReaction:
+    """Wrapper for a reaction function that is called by ReaDDy for every
+    topology of a given type.
+
+    If instrument is True (or StructuralReaction.instrument is called),
+    every call is timed and aggregated in StructuralReaction.statistics,
+    see hydrogels.reactions.statistics.ReactionStatistics
+
+    If a recorder is given, every change made by the recipes that the
+    reaction function returns is recorded, for which the reaction
+    function has to create them as Recipe(topology, record=True), see
+    hydrogels.reactions.events.EventRecorder
+
+    Neither happens inside StructuralReaction.quiet()
+    """
+    # set by StructuralReaction.quiet
+    _quiet = False
+
     def __init__(
         self,
         reaction_function,
         name: str = 'reaction',
         topology_type: str = 'molecule',
         rate_function: Callable = lambda x: 10000.0,
+        instrument: bool = False,
+        recorder: EventRecorder = None,
     ):
         self.name = name
         self.topology_type = topology_type
         self.reaction_function = reaction_function
         self.rate_function = rate_function
+        self.statistics = None
+        self.recorder = recorder
+        if instrument:
+            self.instrument()
+
+    @classmethod
+    @contextmanager
+    def quiet(cls):
+        """Context manager in which no structural reaction is
+        instrumented or recorded, e.g. for the trial integrations of
+        hydrogels.System.autotune"""
+        previous = cls._quiet
+        cls._quiet = True
+        try:
+            yield
+        finally:
+            cls._quiet = previous
+
+    def instrument(self) -> ReactionStatistics:
+        """Turns on instrumentation and returns the statistics object"""
+        if self.statistics is None:
+            self.statistics = ReactionStatistics(self.name)
+        return self.statistics
 
     def __call__(self, topology):
-        return self.reaction_function(topology)
+        if StructuralReaction._quiet or (
+            self.statistics is None and self.recorder is None
+        ):
+            return self.reaction_function(topology)
+        start = time.perf_counter()
+        recipe = self.reaction_function(topology)
+        elapsed = time.perf_counter() - start
+        if self.statistics is not None:
+            self.statistics.record(
+                elapsed,
+                topology.get_n_particles(),
+                recipe
+            )
+        if self.recorder is not None:
+            self.recorder.record(topology, recipe)
+        return recipe
 
     def register(self, system: readdy.ReactionDiffusionSystem):
         """Registers the structural reaction to a given system"""
@@ -53,12 +226,15 @@ class BondBreaking:
     reactions, and BondBreaking provides a mechanism and functionality
     to convert these to [product] particles.
 
-    There are currently two reaction schemes:
+    There are currently three reaction schemes:
         - polymer
             Generic Bond breaking with an arbitrary number of particles
             in a topology
         - diatomic:
             Bond breaking when a topology has only two particles
+        - batched:
+            Releases every [intermediate] particle of a topology as a
+            [product] particle in a single recipe
 
     Example:
 
@@ -82,8 +258,18 @@ class BondBreaking:
         intermediate: name of reactant topology species
         product: name of reactant topology species
         name (optional): name of reaction type
-        rate_function (optional): rate function for use in ReaDDy
+        rate_function (optional): rate function for use in ReaDDy, by
+            default the constant rate, see intermediate_rate for
+            intermediates that are created by topology reactions
         topology_type (optional): topology to execute reaction on
+        instrument (optional): collect statistics on every call
+        scission_rate (optional): rate of scission of each intermediate
+            particle for the probabilistic mode of the batched scheme
+        rate (optional): rate of the reaction when intermediates are
+            present, which defaults to 10000.0 for the default constant
+            rate function and otherwise to the rate of a rate function
+            from intermediate_rate
+        recorder (optional): EventRecorder that records every event
 
     Attributes:
         reactant: name of reactant topology species
@@ -95,6 +281,7 @@ class BondBreaking:
 
         diatomic: Bond breaking when a topology has only two particles
         polymer: Bond breaking with an arbitrary number of particles
+        batched: Release of many intermediates per call
 
     """
     def __init__(
@@ -103,8 +290,12 @@ class BondBreaking:
         intermediate,
         product,
         name: str = 'bond_breaking',
-        rate_function: Callable = lambda x: 10000,
+        rate_function: Callable = None,
         topology_type: str = 'molecule',
+        instrument: bool = False,
+        scission_rate: float = None,
+        rate: float = None,
+        recorder: EventRecorder = None,
     ):
         # important variables
         self.reactant = reactant
@@ -114,8 +305,17 @@ class BondBreaking:
         # optional variables that are useful for storage
         # but not essential, and easy to override
         self.name = name
+        if rate_function is None:
+            rate = 10000.0 if rate is None else float(rate)
+            rate_function = lambda topology: rate
+        elif rate is None:
+            rate = getattr(rate_function, 'rate', None)
+        self.rate = rate
         self.rate_function = rate_function
         self.topology_type = topology_type
+        self._instrumented = instrument
+        self.scission_rate = scission_rate
+        self.recorder = recorder
 
     @property
     def diatomic(self) -> Callable:
@@ -123,15 +323,19 @@ class BondBreaking:
         diatomic molecule to two product particles. The diatomic
         molecule should contain a topology particle that corresponds
         to BondBreaking.intermediate"""
-        def fn(topology) -> readdy.StructuralReactionRecipe:
-            # get reaction recipe
-            recipe = readdy.StructuralReactionRecipe(topology)
-
+        def fn(topology) -> Recipe:
             # get the vertices of the topology
             vertices = topology.get_graph().get_vertices()
 
+            # get reaction recipe
+            recipe = Recipe(
+                topology,
+                record=self.recorder is not None,
+                vertices=vertices
+            )
+
             # sort types (either A or B) for easier analysis
-            types = [topology.particle_type_of_vertex(v) for v in vertices]
+            types = vertex_types(vertices)
 
             # if B is present then change both particles to C
             # and delete bond by using recipe.separate_vertex
@@ -146,55 +350,135 @@ class BondBreaking:
             fn,
             name=self.name,
             topology_type=self.topology_type,
-            rate_function=self.rate_function
+            rate_function=self.rate_function,
+            instrument=self._instrumented,
+            recorder=self.recorder,
         )
 
     @property
     def polymer(self) -> Callable:
-        def fn(topology) -> readdy.StructuralReactionRecipe:
-            recipe = readdy.StructuralReactionRecipe(topology)
+        """Returns a bond breaking function for topologies with an
+        arbitrary number of particles.
+
+        The vertex types are fetched in one lookup per call (see
+        vertex_types) and only the edges incident to [intermediate]
+        vertices are visited, rather than two lookups for every edge"""
+        def fn(topology) -> Recipe:
+            vertices = topology.get_graph().get_vertices()
+            recipe = Recipe(
+                topology,
+                record=self.recorder is not None,
+                vertices=vertices
+            )
+            n_vertices = len(vertices)
+
             # it is possible for there to be a lone particle in a topology
             # when reactions happen very quickly, this step ensures that
             # these are converted to [product] particles which are not
             # topology-bound
-            vertices = topology.get_graph().get_vertices()
-            if len(vertices) == 1:
+            if n_vertices == 1:
                 recipe.separate_vertex(0)
-                recipe.change_particle_type(vertices[0], self.product)
+                recipe.change_particle_type(0, self.product)
+                return recipe
+
+            intermediates = indices_of(
+                vertex_types(vertices),
+                self.intermediate
+            )
+            if not intermediates:
+                return recipe
 
             # register R-I -> P + P reaction
-            elif len(vertices) == 2:
-                types = [topology.particle_type_of_vertex(v) for v in vertices]
-                if self.intermediate in types:
-                    recipe.separate_vertex(0)
-                    recipe.change_particle_type(vertices[0], self.product)
-                    recipe.change_particle_type(vertices[1], self.product)
+            if n_vertices == 2:
+                recipe.separate_vertex(0)
+                recipe.change_particle_type(0, self.product)
+                recipe.change_particle_type(1, self.product)
 
             # register -R-I-R- -> -R + R-R-
             else:
-                # insert reaction
-                edges = topology.get_graph().get_edges()
-                for edge in edges:
-                    if topology.particle_type_of_vertex(edge[0]) \
-                        == self.intermediate:
-
-                        # remove the bond and convert back to reactant
-                        recipe.remove_edge(edge[0], edge[1])
-                        recipe.change_particle_type(edge[0], self.reactant)
-
-                    elif topology.particle_type_of_vertex(edge[1]) \
-                        == self.intermediate:
-
-                        # do the same but with the other particle
-                        # since that is the one that is an intermediate
-                        recipe.remove_edge(edge[0], edge[1])
-                        recipe.change_particle_type(edge[1], self.reactant)
+                # neighbours are vertex objects whose particle_index is
+                # the index of the particle in the kernel rather than in
+                # the topology, so they are passed to the recipe as they
+                # are and only used to recognise visited vertices
+                visited = set()
+                for i in intermediates:
+                    vertex = vertices[i]
+                    for neighbor in vertex.neighbors():
+                        # an I-I edge is removed only once
+                        if neighbor.particle_index in visited:
+                            continue
+                        recipe.remove_edge(vertex, neighbor)
+                    recipe.change_particle_type(i, self.reactant)
+                    visited.add(vertex.particle_index)
             return recipe
         return StructuralReaction(
             fn,
             name=self.name,
             topology_type=self.topology_type,
-            rate_function=self.rate_function
+            rate_function=self.rate_function,
+            instrument=self._instrumented,
+            recorder=self.recorder,
+        )
+
+    @property
+    def batched(self) -> Callable:
+        """Returns a scission function that separates every [intermediate]
+        vertex of a topology from its neighbours and converts it to a
+        [product] particle, so that a gel with many pending intermediates
+        needs one evaluation rather than one per intermediate.
+
+        If BondBreaking.scission_rate (k) is set, each intermediate is
+        only released with the probability 1 - exp(-k / R) that it has
+        decayed in the mean time 1 / R between evaluations, where R is
+        BondBreaking.rate, the rate of the reaction when intermediates
+        are present, and the number of events is drawn from the
+        corresponding binomial distribution.
+
+        Lone vertices are released in the same way as in
+        BondBreaking.polymer
+
+        Raises:
+            ValueError: if scission_rate is set but the rate R of a
+                custom rate function is unknown
+        """
+        if self.scission_rate is not None and self.rate is None:
+            raise ValueError(
+                'The probabilistic batched scheme needs the rate of the '
+                'reaction, pass rate or a rate function created with '
+                'intermediate_rate'
+            )
+
+        def fn(topology) -> Recipe:
+            vertices = topology.get_graph().get_vertices()
+            recipe = Recipe(
+                topology,
+                record=self.recorder is not None,
+                vertices=vertices
+            )
+            if len(vertices) == 1:
+                recipe.separate_vertex(0)
+                recipe.change_particle_type(0, self.product)
+                return recipe
+
+            pending = indices_of(vertex_types(vertices), self.intermediate)
+            if pending and self.scission_rate is not None:
+                probability = 1.0 - np.exp(-self.scission_rate / self.rate)
+                n_events = np.random.binomial(len(pending), probability)
+                pending = sorted(
+                    int(i) for i in
+                    np.random.choice(pending, n_events, replace=False)
+                )
+            for i in pending:
+                recipe.separate_vertex(i)
+                recipe.change_particle_type(i, self.product)
+            return recipe
+        return StructuralReaction(
+            fn,
+            name=self.name,
+            topology_type=self.topology_type,
+            rate_function=self.rate_function,
+            instrument=self._instrumented,
+            recorder=self.recorder,
         )
 
 if __name__ == '__main__':
@@ -71,8 +71,11 @@ class EnzymaticDegradation(System):
         if potentials:
             self.manager.add('lj', name, 'all', **self._kwargs)
 
+        # gels that share particle types share a single reaction, see
+        # hydrogels.reactions.spatial.SpatialReactionRegistry
         for top in self._topologies:
-            top.register_degradation(self, name, rate, radius)
+            if isinstance(top, Gel):
+                top.register_degradation(self, name, rate, radius)
         return
 
     def add_payload(self, positions: np.ndarray, name: str = 'payload', diffusion_constant: float = None, potentials: bool = False):
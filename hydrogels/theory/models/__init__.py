@@ -1,2 +1,3 @@
 import hydrogels.potentials as potentials
 import hydrogels.functions as functions
+import hydrogels.engine as engine
@@ -1,69 +1,347 @@
-#include <Python.h>
-#include "functions.hpp"
-#include "utils.hpp"
-
-static PyObject* 
-engine_addNumbers(PyObject* self, PyObject* args) {
-    // declare variables
-    double n1, n2, result;
-
-    // parse arguments
-    if (!PyArg_ParseTuple(args, "dd", &n1, &n2)) {
-        return NULL;
+#include "engine.hpp"
+
+// variables of the fixed model chains
+struct State {
+    double N;
+    double R = NAN;
+    double V = NAN;
+    double k = NAN;
+    double KV = NAN;
+};
+
+// numpy array that takes ownership of a vector without copying it
+py::array_t<double> toArray (std::vector<double>&& data) {
+    auto owner = new std::vector<double>(std::move(data));
+    py::capsule capsule(owner, [](void* p) {
+        delete reinterpret_cast<std::vector<double>*>(p);
+    });
+    return py::array_t<double>(owner->size(), owner->data(), capsule);
+}
+
+// Runs steps iterations of step on the state without the GIL, recording
+// the variables every stride steps (and after the last step), and returns
+// a dictionary of the recorded arrays and the times
+template <typename Step>
+py::dict integrate (
+    State state,
+    double dt,
+    long steps,
+    long stride,
+    bool terminate,
+    double t0,
+    Step step
+) {
+    if (steps < 0) {
+        throw std::invalid_argument("steps must not be negative");
+    }
+    if (stride < 1) {
+        throw std::invalid_argument("stride must be at least 1");
+    }
+    std::size_t rows = 1 + (steps + stride - 1) / stride;
+    std::vector<double> t, N, R, V, k, KV;
+    for (auto column : {&t, &N, &R, &V, &k, &KV}) {
+        column->reserve(rows);
+    }
+    auto record = [&](long i) {
+        t.push_back(t0 + i * dt);
+        N.push_back(state.N);
+        R.push_back(state.R);
+        V.push_back(state.V);
+        k.push_back(state.k);
+        KV.push_back(state.KV);
     };
 
-    // function here
-    result = addNumbers(n1, n2);
+    {
+        py::gil_scoped_release release;
+        record(0);
+        for (long i = 1; i <= steps; i++) {
+            step(state);
+            bool done = terminate && state.N <= 0.0;
+            if (i % stride == 0 || i == steps || done) {
+                record(i);
+            }
+            if (done) {
+                break;
+            }
+        }
+    }
 
-    // return correct Type
-    return PyFloat_FromDouble(result);
-    
-};
+    py::dict result;
+    result["t"] = toArray(std::move(t));
+    result["N"] = toArray(std::move(N));
+    result["R"] = toArray(std::move(R));
+    result["V"] = toArray(std::move(V));
+    result["k"] = toArray(std::move(k));
+    result["KV"] = toArray(std::move(KV));
+    return result;
+}
 
-static PyObject*
-engine_vectorNorm(PyObject* self, PyObject* args) {
-    PyObject* py_vect;
-    if (!PyArg_ParseTuple(args, "O", &py_vect)) {
-        return NULL;
+CubicTable tableFrom (py::object table) {
+    DoubleArray coefficients = DoubleArray::ensure(table.attr("coefficients"));
+    if (!coefficients) {
+        throw std::invalid_argument("table.coefficients must be an array");
     }
-    std::vector<double> vect = listTupleToVector_Double(py_vect);
-    double result = vectorNorm(vect);
-    return PyFloat_FromDouble(result);
-};
+    return CubicTable(
+        table.attr("r0").cast<double>(),
+        table.attr("h").cast<double>(),
+        std::vector<double>(
+            coefficients.data(),
+            coefficients.data() + coefficients.size()
+        )
+    );
+}
 
-// Define docstrings
-PyDoc_STRVAR(engine_docs, "Package for running iterative numerical simulations");
-PyDoc_STRVAR(engine_addNumbers_docs, "addNumbers(n1 : number, n2 : number) -> float: add two numbers together\n");
-PyDoc_STRVAR(engine_vectorNorm_docs, "vectorNorm(vector : list) -> float: returns the magnitude of a 1D Vector");
+py::dict integrateLennardJones (
+    double N, double dt, long steps,
+    double sig, double eps, double nV, double rE,
+    double beta, double c0, double rate, double thickness,
+    long stride, bool terminate, double t0, py::object table
+) {
+    // tabulated potential with the r0, h and coefficients of a CubicTable,
+    // using the exact potential outside of the table
+    CubicTable V = table.is_none()
+        ? CubicTable(0.0, 1.0, std::vector<double>(4, NAN))
+        : tableFrom(table);
+    bool tabulated = !table.is_none();
+    State state;
+    state.N = N;
+    return integrate(state, dt, steps, stride, terminate, t0, [=](State& s) {
+        s.R = radiusFromNumber(s.N, nV);
+        if (tabulated && V.contains(s.R)) {
+            s.V = V(s.R);
+        } else {
+            s.V = macroLJ(sig, eps, nV, 12, rE, s.R) - macroLJ(sig, eps, nV, 6, rE, s.R);
+        }
+        s.KV = KVFromR(s.R, rate, thickness);
+        s.k = rateFromPotentialEnergy(s.KV, c0, s.V, beta);
+        s.N = updateNumberFromRate(s.N, s.k, dt);
+    });
+}
 
-// Create list of PyMethodDefs
-static PyMethodDef EngineFunctions[] = {
-    {
-        "addNumbers", 
-        (PyCFunction)engine_addNumbers,
-        METH_VARARGS, 
-        engine_addNumbers_docs
-    },
+double parameter (
+    const std::map<std::string, double>& parameters,
+    const std::string& key
+) {
+    auto found = parameters.find(key);
+    if (found == parameters.end()) {
+        throw std::invalid_argument("Missing potential parameter: " + key);
+    }
+    return found->second;
+}
+
+// potential energy as a function of the radius, from its name
+std::function<double(double)> namedPotential (
+    const std::string& name,
+    const std::map<std::string, double>& parameters
+) {
+    if (name == "zero") {
+        return [](double R) { return zero(R); };
+    }
+    if (name == "harmonic") {
+        double K = parameter(parameters, "K");
+        return [=](double R) { return harmonic(K, R); };
+    }
+    if (name == "lennard_jones") {
+        double sig = parameter(parameters, "sig");
+        double eps = parameter(parameters, "eps");
+        double rc = parameter(parameters, "rc");
+        return [=](double R) { return lennardJones(sig, eps, rc, R); };
+    }
+    if (name == "macro_LJ") {
+        double sig = parameter(parameters, "sig");
+        double eps = parameter(parameters, "eps");
+        double nV = parameter(parameters, "nV");
+        double rE = parameter(parameters, "rE");
+        return [=](double R) {
+            return macroLJ(sig, eps, nV, 12, rE, R) - macroLJ(sig, eps, nV, 6, rE, R);
+        };
+    }
+    throw std::invalid_argument("Unknown potential: " + name);
+}
+
+py::dict integrateConstantDensity (
+    double N, double dt, long steps,
+    std::string potential, std::map<std::string, double> parameters,
+    double beta, double c0, double KV, double nV,
+    long stride, bool terminate, double t0
+) {
+    auto V = namedPotential(potential, parameters);
+    State state;
+    state.N = N;
+    return integrate(state, dt, steps, stride, terminate, t0, [=](State& s) {
+        s.R = radiusFromNumber(s.N, nV);
+        s.V = V(s.R);
+        // same argument order as ConstantDensity.equations
+        s.k = rateFromPotentialEnergy(KV, c0, beta, s.V);
+        s.N = updateNumberFromRate(s.N, s.k, dt);
+    });
+}
+
+// states of the particles of the kinetic Monte Carlo model, as in
+// hydrogels.theory.models.kinetic
+const int MONOMER = 0;
+const int UNBONDED = 1;
+const int RELEASED = 2;
+
+// Gillespie algorithm of KineticMonteCarlo on the graph of a gel given by
+// the CSR arrays indptr and indices. Monomers start with rates, and if
+// table is not empty the rate of a monomer with d bonds is table[d].
+// Unbonded particles are released with the scission rate, cutting their
+// bonds, and particles without bonds are released straight away. Returns
+// the number of particles in each state at every time and the number of
+// events
+py::dict kineticMonteCarlo (
+    py::array_t<std::int64_t, py::array::c_style | py::array::forcecast> indptr,
+    py::array_t<std::int64_t, py::array::c_style | py::array::forcecast> indices,
+    py::array_t<std::int8_t, py::array::c_style | py::array::forcecast> initial,
+    DoubleArray rates, DoubleArray table, double scission,
+    DoubleArray times, std::uint64_t seed
+) {
+    py::ssize_t N = initial.size();
+    if (indptr.size() != N + 1) {
+        throw std::invalid_argument("indptr must have one element more than initial");
+    }
+    if (rates.size() != N) {
+        throw std::invalid_argument("rates must have one element per particle");
+    }
+    const std::int64_t* start = indptr.data();
+    const std::int64_t* neighbours = indices.data();
+    if (start[0] != 0 || start[N] != indices.size()) {
+        throw std::invalid_argument("indptr does not match indices");
+    }
+    for (py::ssize_t k = 0; k < indices.size(); k++) {
+        if (neighbours[k] < 0 || neighbours[k] >= N) {
+            throw std::invalid_argument("indices must be particles");
+        }
+    }
+
+    bool dynamic = table.size() > 0;
+    std::vector<std::int64_t> degree(N);
+    std::vector<int> state(N);
+    std::vector<double> initialRates(N);
+    std::array<std::int64_t, 3> counts = {0, 0, 0};
+    for (py::ssize_t i = 0; i < N; i++) {
+        degree[i] = start[i + 1] - start[i];
+        if (dynamic && degree[i] >= table.size()) {
+            throw std::invalid_argument("table must have a rate for every number of bonds");
+        }
+        // lone particles are released straight away
+        state[i] = degree[i] == 0 ? RELEASED : initial.data()[i];
+        if (state[i] == MONOMER) {
+            initialRates[i] = rates.data()[i];
+        } else if (state[i] == UNBONDED) {
+            initialRates[i] = scission;
+        }
+        counts[state[i]]++;
+    }
+
+    py::ssize_t samples = times.size();
+    const double* sampled = times.data();
+    const double* rateOf = table.data();
+    py::array_t<std::int64_t> result({samples, py::ssize_t(3)});
+    std::int64_t* out = result.mutable_data();
+    std::int64_t events = 0;
     {
-        "vectorNorm", 
-        (PyCFunction)engine_vectorNorm,
-        METH_VARARGS, 
-        engine_vectorNorm_docs
-    },
-    {NULL, NULL, 0, NULL} /* Sentinel */
-};
+        py::gil_scoped_release release;
+        RateTree tree(initialRates);
+        std::mt19937_64 generator(seed);
+        std::uniform_real_distribution<double> uniform(0.0, 1.0);
+        py::ssize_t sample = 0;
+        auto record = [&]() {
+            std::copy(counts.begin(), counts.end(), out + 3 * sample);
+            sample++;
+        };
+        auto releaseParticle = [&](std::int64_t i) {
+            counts[state[i]]--;
+            counts[RELEASED]++;
+            state[i] = RELEASED;
+            tree.update(i, 0.0);
+            events++;
+        };
 
-// Create the Module
-static struct PyModuleDef enginemodule = {
-    PyModuleDef_HEAD_INIT,
-    "engine", /* module name */
-    engine_docs, /* documentation */
-    -1, /* Leave this as -1 */
-    EngineFunctions /* function list */
-};
+        double t = 0.0;
+        while (sample < samples) {
+            double total = tree.total();
+            if (total <= 0.0) {
+                break;
+            }
+            std::size_t i = tree.sample(uniform(generator) * total);
+            if (tree[i] == 0.0) {
+                // rounding errors in the partial sums can point to a
+                // particle that has already been released, in which case
+                // the event is drawn again without advancing time
+                continue;
+            }
+            t -= std::log(1.0 - uniform(generator)) / total;
+            while (sample < samples && sampled[sample] < t) {
+                record();
+            }
 
-// Export module when __init__ is called
-PyMODINIT_FUNC 
-PyInit_engine(void) {
-    return PyModule_Create(&enginemodule);
-};
+            if (state[i] == MONOMER) {
+                state[i] = UNBONDED;
+                counts[MONOMER]--;
+                counts[UNBONDED]++;
+                tree.update(i, scission);
+                events++;
+                continue;
+            }
+
+            // cut every remaining bond of i and release it
+            releaseParticle(i);
+            degree[i] = 0;
+            for (std::int64_t k = start[i]; k < start[i + 1]; k++) {
+                std::int64_t j = neighbours[k];
+                if (state[j] == RELEASED) {
+                    continue;
+                }
+                degree[j]--;
+                if (degree[j] == 0) {
+                    releaseParticle(j);
+                } else if (dynamic && state[j] == MONOMER) {
+                    tree.update(j, rateOf[degree[j]]);
+                }
+            }
+        }
+        while (sample < samples) {
+            record();
+        }
+    }
+
+    py::dict dict;
+    dict["counts"] = result;
+    dict["events"] = events;
+    return dict;
+}
+
+PYBIND11_MODULE(engine, m) {
+    m.doc() = "Package for running iterative numerical simulations";
+    m.def("addNumbers", &addNumbers, R"pbdoc(add two numbers together)pbdoc", py::arg("n1"), py::arg("n2"));
+    m.def("vectorNorm", &vectorNorm, R"pbdoc(returns the magnitude of a 1D Vector)pbdoc", py::arg("vector"));
+    m.def("integrate_lennard_jones", &integrateLennardJones,
+        R"pbdoc(Integrates the LennardJones model chain radius -> potential -> KV -> rate -> number and returns a dict of the history arrays)pbdoc",
+        py::arg("N"), py::arg("dt"), py::arg("steps"),
+        py::arg("sig"), py::arg("eps"), py::arg("nV"), py::arg("rE"),
+        py::arg("beta"), py::arg("c0"), py::arg("rate"), py::arg("thickness"),
+        py::arg("stride") = 1, py::arg("terminate") = false, py::arg("t0") = 0.0,
+        py::arg("table") = py::none()
+    );
+    m.def("integrate_constant_density", &integrateConstantDensity,
+        R"pbdoc(Integrates the ConstantDensity model chain radius -> potential -> rate -> number with a named potential and returns a dict of the history arrays)pbdoc",
+        py::arg("N"), py::arg("dt"), py::arg("steps"),
+        py::arg("potential"), py::arg("parameters"),
+        py::arg("beta"), py::arg("c0"), py::arg("KV"), py::arg("nV"),
+        py::arg("stride") = 1, py::arg("terminate") = false, py::arg("t0") = 0.0
+    );
+    m.def("kinetic_monte_carlo", &kineticMonteCarlo,
+        R"pbdoc(Runs the Gillespie algorithm of KineticMonteCarlo on the CSR graph of a gel and returns a dict of the counts of each state at every time and the number of events)pbdoc",
+        py::arg("indptr"), py::arg("indices"), py::arg("initial"),
+        py::arg("rates"), py::arg("table"), py::arg("scission"),
+        py::arg("times"), py::arg("seed")
+    );
+
+    #ifdef VERSION_INFO
+        m.attr("__version__") = VERSION_INFO;
+    #else
+        m.attr("__version__") = "dev";
+    #endif
+}
@@ -1,4 +1,36 @@
-#ifndef ENGINE
-#define ENGINE
-double addNumbers(double a, double b);
-#endif
\ No newline at end of file
+#ifndef ENGINE_HPP
+#define ENGINE_HPP
+#include <array>
+#include <cmath>
+#include <cstdint>
+#include <functional>
+#include <map>
+#include <random>
+#include <string>
+#include <vector>
+#include "pybind11/pybind11.h"
+#include "pybind11/numpy.h"
+#include "pybind11/stl.h"
+#include "functions.hpp"
+#include "potentials.hpp"
+#include "rate_tree.hpp"
+py::dict integrateLennardJones (
+    double N, double dt, long steps,
+    double sig, double eps, double nV, double rE,
+    double beta, double c0, double rate, double thickness,
+    long stride, bool terminate, double t0, py::object table
+);
+py::dict integrateConstantDensity (
+    double N, double dt, long steps,
+    std::string potential, std::map<std::string, double> parameters,
+    double beta, double c0, double KV, double nV,
+    long stride, bool terminate, double t0
+);
+py::dict kineticMonteCarlo (
+    py::array_t<std::int64_t, py::array::c_style | py::array::forcecast> indptr,
+    py::array_t<std::int64_t, py::array::c_style | py::array::forcecast> indices,
+    py::array_t<std::int8_t, py::array::c_style | py::array::forcecast> initial,
+    DoubleArray rates, DoubleArray table, double scission,
+    DoubleArray times, std::uint64_t seed
+);
+#endif
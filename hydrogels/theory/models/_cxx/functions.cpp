@@ -59,6 +59,9 @@ double KVFromR (double R, double rate, double thickness) {
 
 namespace py = pybind11;
 
+// the kernels are also compiled into the engine extension, which
+// defines KERNELS_ONLY to leave out this module
+#ifndef KERNELS_ONLY
 PYBIND11_MODULE(functions, m) {
     m.def("boltzmann", &boltzmann, R"pbdoc(Boltzmann Factor)pbdoc", py::arg("beta"), py::arg("U"));
     m.def("radius_from_number", &radiusFromNumber, R"pbdoc(Radius from number of particles and number density)pbdoc", py::arg("N"), py::arg("nV"));
@@ -66,9 +69,27 @@ PYBIND11_MODULE(functions, m) {
     m.def("update_number_from_rate", &updateNumberFromRate, R"pbdoc(New number of particles using rate and timestep)pbdoc", py::arg("N"), py::arg("k"), py::arg("dt"));
     m.def("kv_from_radius", &KVFromR, R"pbdoc(Returns the rate per unit volume)pbdoc", py::arg("R"), py::arg("rate"), py::arg("thickness"));
 
+    // array overloads that broadcast over numpy arrays
+    m.def("boltzmann", [](DoubleArray beta, DoubleArray U, int threads) {
+        return vectorise<2>(&boltzmann, {beta, U}, threads);
+    }, R"pbdoc(Boltzmann Factor)pbdoc", py::arg("beta"), py::arg("U"), py::arg("threads") = 1);
+    m.def("radius_from_number", [](DoubleArray N, DoubleArray nV, int threads) {
+        return vectorise<2>(&radiusFromNumber, {N, nV}, threads);
+    }, R"pbdoc(Radius from number of particles and number density)pbdoc", py::arg("N"), py::arg("nV"), py::arg("threads") = 1);
+    m.def("rate_from_potential_energy", [](DoubleArray KV, DoubleArray c0, DoubleArray U, DoubleArray beta, int threads) {
+        return vectorise<4>(&rateFromPotentialEnergy, {KV, c0, U, beta}, threads);
+    }, R"pbdoc(Rate from Potential Energy at surface and bulk concentration)pbdoc", py::arg("KV"), py::arg("c0"), py::arg("U"), py::arg("beta"), py::arg("threads") = 1);
+    m.def("update_number_from_rate", [](DoubleArray N, DoubleArray k, DoubleArray dt, int threads) {
+        return vectorise<3>(&updateNumberFromRate, {N, k, dt}, threads);
+    }, R"pbdoc(New number of particles using rate and timestep)pbdoc", py::arg("N"), py::arg("k"), py::arg("dt"), py::arg("threads") = 1);
+    m.def("kv_from_radius", [](DoubleArray R, DoubleArray rate, DoubleArray thickness, int threads) {
+        return vectorise<3>(&KVFromR, {R, rate, thickness}, threads);
+    }, R"pbdoc(Returns the rate per unit volume)pbdoc", py::arg("R"), py::arg("rate"), py::arg("thickness"), py::arg("threads") = 1);
+
     #ifdef VERSION_INFO
         m.attr("__version__") = VERSION_INFO;
     #else
         m.attr("__version__") = "dev";
     #endif
-}
\ No newline at end of file
+}
+#endif
@@ -3,6 +3,7 @@
 #include <cmath>
 #include <vector>
 #include "pybind11/pybind11.h"
+#include "vectorise.hpp"
 double addNumbers (double a, double b);
 double massFromRadius (double R, double rho);
 double radiusFromMass (double mass, double rho);
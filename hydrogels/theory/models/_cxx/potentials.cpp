@@ -43,15 +43,51 @@ double macroPower3D (double r) {
 
 namespace py = pybind11;
 
+// the kernels are also compiled into the engine extension, which
+// defines KERNELS_ONLY to leave out this module
+#ifndef KERNELS_ONLY
 PYBIND11_MODULE(potentials, m) {
     m.def("lennard_jones", &lennardJones, R"pbdoc(LJ)pbdoc", py::arg("sig"), py::arg("eps"), py::arg("rc"), py::arg("r") );
     m.def("harmonic", &harmonic, R"pbdoc(HARM)pbdoc", py::arg("k"), py::arg("r"));
     m.def("zero", &zero, R"pbdoc(ZERO)pbdoc", py::arg("r"));
     m.def("macro_LJ", &macroLJ, R"pbdoc(3D Macroscopic Lennard-Jones Nanoparticle)pbdoc", py::arg("sig"), py::arg("eps"), py::arg("nV"), py::arg("n"), py::arg("rE"), py::arg("r"));
 
+    // array overloads that broadcast over numpy arrays
+    m.def("lennard_jones", [](DoubleArray sig, DoubleArray eps, DoubleArray rc, DoubleArray r, int threads) {
+        return vectorise<4>(&lennardJones, {sig, eps, rc, r}, threads);
+    }, R"pbdoc(LJ)pbdoc", py::arg("sig"), py::arg("eps"), py::arg("rc"), py::arg("r"), py::arg("threads") = 1);
+    m.def("harmonic", [](DoubleArray k, DoubleArray r, int threads) {
+        return vectorise<2>(&harmonic, {k, r}, threads);
+    }, R"pbdoc(HARM)pbdoc", py::arg("k"), py::arg("r"), py::arg("threads") = 1);
+    m.def("zero", [](DoubleArray r, int threads) {
+        return vectorise<1>(&zero, {r}, threads);
+    }, R"pbdoc(ZERO)pbdoc", py::arg("r"), py::arg("threads") = 1);
+    m.def("macro_LJ", [](DoubleArray sig, DoubleArray eps, DoubleArray nV, DoubleArray n, DoubleArray rE, DoubleArray r, int threads) {
+        return vectorise<6>(&macroLJ, {sig, eps, nV, n, rE, r}, threads);
+    }, R"pbdoc(3D Macroscopic Lennard-Jones Nanoparticle)pbdoc", py::arg("sig"), py::arg("eps"), py::arg("nV"), py::arg("n"), py::arg("rE"), py::arg("r"), py::arg("threads") = 1);
+
+    py::class_<CubicTable>(m, "CubicTable", R"pbdoc(Piecewise cubic polynomial on a uniform grid, which is NaN outside of the grid)pbdoc")
+        .def(py::init([](double r0, double h, DoubleArray coefficients) {
+            return CubicTable(r0, h, std::vector<double>(
+                coefficients.data(),
+                coefficients.data() + coefficients.size()
+            ));
+        }), py::arg("r0"), py::arg("h"), py::arg("coefficients"))
+        .def_readonly("r0", &CubicTable::r0)
+        .def_readonly("h", &CubicTable::h)
+        .def_readonly("intervals", &CubicTable::intervals)
+        .def_property_readonly("r1", &CubicTable::r1)
+        .def("__call__", [](const CubicTable& table, double r) {
+            return table(r);
+        }, py::arg("r"))
+        .def("__call__", [](const CubicTable& table, DoubleArray r, int threads) {
+            return vectorise<1>([&table](double x) { return table(x); }, {r}, threads);
+        }, py::arg("r"), py::arg("threads") = 1);
+
     #ifdef VERSION_INFO
         m.attr("__version__") = VERSION_INFO;
     #else
         m.attr("__version__") = "dev";
     #endif
-}
\ No newline at end of file
+}
+#endif
@@ -2,6 +2,8 @@
 #define POTENTIALS_HPP
 #include <cmath>
 #include "pybind11/pybind11.h"
+#include "vectorise.hpp"
+#include "table.hpp"
 double lennardJones (double sig, double eps, double rc, double r);
 double harmonic (double k, double r);
 double zero (double r);
@@ -0,0 +1,59 @@
+#ifndef RATE_TREE_HPP
+#define RATE_TREE_HPP
+#include <algorithm>
+#include <vector>
+
+// Binary sum tree over a fixed number of rates that supports updating a
+// single rate and sampling an index proportionally to its rate in
+// O(log N). Parents are recalculated from their children rather than
+// shifted by the change, so the total does not drift and is exactly zero
+// once every rate is zero.
+class RateTree {
+public:
+    explicit RateTree (const std::vector<double>& rates) : n(rates.size()) {
+        size = 1;
+        while (size < std::max<std::size_t>(n, 1)) {
+            size *= 2;
+        }
+        tree.assign(2 * size, 0.0);
+        std::copy(rates.begin(), rates.end(), tree.begin() + size);
+        for (std::size_t i = size - 1; i > 0; i--) {
+            tree[i] = tree[2 * i] + tree[2 * i + 1];
+        }
+    }
+
+    double total () const {
+        return tree[1];
+    }
+
+    double operator[] (std::size_t index) const {
+        return tree[size + index];
+    }
+
+    void update (std::size_t index, double rate) {
+        std::size_t i = size + index;
+        tree[i] = rate;
+        for (i /= 2; i > 0; i /= 2) {
+            tree[i] = tree[2 * i] + tree[2 * i + 1];
+        }
+    }
+
+    // index at which the cumulative rate exceeds u, for 0 <= u < total
+    std::size_t sample (double u) const {
+        std::size_t i = 1;
+        while (i < size) {
+            i *= 2;
+            if (u >= tree[i]) {
+                u -= tree[i];
+                i += 1;
+            }
+        }
+        return std::min(i - size, n - 1);
+    }
+
+private:
+    std::size_t n;
+    std::size_t size;
+    std::vector<double> tree;
+};
+#endif
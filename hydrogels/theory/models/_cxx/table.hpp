@@ -0,0 +1,52 @@
+#ifndef TABLE_HPP
+#define TABLE_HPP
+#include <cmath>
+#include <stdexcept>
+#include <vector>
+
+// Piecewise cubic polynomial on a uniform grid starting at r0 with spacing
+// h, where interval i holds the coefficients (c0, c1, c2, c3) of
+// c0 dr^3 + c1 dr^2 + c2 dr + c3 with dr = r - r0 - i h.
+// Evaluates to NaN outside of the grid.
+class CubicTable {
+public:
+    double r0;
+    double h;
+    std::size_t intervals;
+    std::vector<double> coefficients;
+
+    CubicTable (double r0, double h, std::vector<double> coefficients)
+        : r0(r0), h(h), intervals(coefficients.size() / 4),
+          coefficients(std::move(coefficients)) {
+        if (this->coefficients.size() % 4 != 0 || intervals == 0) {
+            throw std::invalid_argument(
+                "coefficients must have shape (intervals, 4)"
+            );
+        }
+        if (h <= 0.0) {
+            throw std::invalid_argument("h must be positive");
+        }
+    }
+
+    inline double r1 () const {
+        return r0 + intervals * h;
+    }
+
+    inline bool contains (double r) const {
+        return r >= r0 && r <= r1();
+    }
+
+    inline double operator() (double r) const {
+        if (!contains(r)) {
+            return NAN;
+        }
+        std::size_t i = std::min(
+            static_cast<std::size_t>((r - r0) / h),
+            intervals - 1
+        );
+        double dr = r - (r0 + i * h);
+        const double* c = &coefficients[4 * i];
+        return ((c[0] * dr + c[1]) * dr + c[2]) * dr + c[3];
+    }
+};
+#endif
@@ -0,0 +1,106 @@
+#ifndef VECTORISE_HPP
+#define VECTORISE_HPP
+#include <array>
+#include <thread>
+#include <utility>
+#include <vector>
+#include "pybind11/pybind11.h"
+#include "pybind11/numpy.h"
+
+namespace py = pybind11;
+
+typedef py::array_t<double, py::array::c_style | py::array::forcecast> DoubleArray;
+
+// minimum number of elements given to each thread
+const py::ssize_t MIN_CHUNK = 16384;
+
+// argument of a vectorised function, which is either a single value or a
+// contiguous array with the same shape as the result
+struct Argument {
+    const double* data = nullptr;
+    bool scalar = true;
+    inline double operator[] (py::ssize_t i) const {
+        return scalar ? data[0] : data[i];
+    }
+};
+
+template <typename Func, std::size_t N, std::size_t... I>
+inline double applyAt (
+    Func func,
+    const std::array<Argument, N>& args,
+    py::ssize_t i,
+    std::index_sequence<I...>
+) {
+    return func(args[I][i]...);
+}
+
+// Evaluates func for every element of the broadcast arrays, without the
+// GIL and split across threads for large arrays. The scalar overload of a
+// function should be registered before its array overload, so that
+// pybind11 only picks the array overload for array arguments
+template <std::size_t N, typename Func>
+py::array_t<double> vectorise (
+    Func func,
+    std::array<DoubleArray, N> arrays,
+    int threads
+) {
+    py::module_ np = py::module_::import("numpy");
+    py::tuple inputs(N);
+    for (std::size_t i = 0; i < N; i++) {
+        inputs[i] = arrays[i];
+    }
+    py::tuple shape = np.attr("broadcast")(*inputs).attr("shape");
+    std::vector<py::ssize_t> dims;
+    for (auto dim : shape) {
+        dims.push_back(dim.cast<py::ssize_t>());
+    }
+
+    std::array<Argument, N> args;
+    // holds the materialised arrays that the arguments point to
+    std::array<DoubleArray, N> keep;
+    for (std::size_t i = 0; i < N; i++) {
+        DoubleArray array = arrays[i];
+        args[i].scalar = array.size() == 1;
+        if (!args[i].scalar && !shape.equal(py::tuple(array.attr("shape")))) {
+            // materialise partial broadcasts e.g. (n, 1) with (1, m)
+            array = DoubleArray::ensure(np.attr("ascontiguousarray")(
+                np.attr("broadcast_to")(array, shape)
+            ));
+        }
+        keep[i] = array;
+        args[i].data = keep[i].data();
+    }
+
+    py::array_t<double> result(dims);
+    double* out = result.mutable_data();
+    py::ssize_t n = result.size();
+    auto work = [&](py::ssize_t start, py::ssize_t stop) {
+        for (py::ssize_t i = start; i < stop; i++) {
+            out[i] = applyAt(func, args, i, std::make_index_sequence<N>{});
+        }
+    };
+
+    {
+        py::gil_scoped_release release;
+        // threads <= 0 uses every available core
+        py::ssize_t workers = threads > 0
+            ? threads
+            : std::max(1u, std::thread::hardware_concurrency());
+        workers = std::min(workers, std::max<py::ssize_t>(1, n / MIN_CHUNK));
+        if (workers == 1) {
+            work(0, n);
+        } else {
+            std::vector<std::thread> pool;
+            py::ssize_t chunk = (n + workers - 1) / workers;
+            for (py::ssize_t start = 0; start < n; start += chunk) {
+                pool.emplace_back(work, start, std::min(n, start + chunk));
+            }
+            for (auto& thread : pool) {
+                thread.join();
+            }
+        }
+    }
+    return result;
+}
+
+#endif
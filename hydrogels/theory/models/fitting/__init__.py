@@ -0,0 +1 @@
+from .fit import ModelFit, fit_experiments
@@ -0,0 +1,190 @@
+from typing import Callable, Dict, Iterable, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import least_squares
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+class ModelFit():
+    """
+    Fits constants of a theory model to a species count time series, e.g.
+    a column of the dataframe returned by analyse_trajectory or
+    ParticleTrajectory.count_atoms, by least squares.
+
+    Candidate parameter sets are evaluated in batches using the ensemble
+    mode of Simulation: the residuals and the finite difference Jacobian
+    at a point are computed from a single ensemble containing the point
+    and one displaced copy for each parameter, instead of running one
+    Simulation per candidate.
+
+    The model is called with the fitted constants as arrays (one element
+    per candidate) and must return a Simulation, e.g.
+
+    ```python
+    model = functools.partial(LennardJones, 0.1, 1000, **settings)
+    fit = ModelFit(model, df, {'rate': 0.1, 'eps': 1.0}, column='monomer')
+    fit.fit()
+    fit.prediction().plot(x='t')
+    ```
+
+    Parameters:
+        model: callable that takes the fitted constants as keyword
+            arguments and returns a Simulation
+        data: dataframe containing the time and the species counts
+        parameters: initial values of the fitted constants
+        target: variable of the model that is compared to the data
+        column: column of data (defaults to target)
+        time: column of data containing the time
+        log: fit the logarithm of the parameters, which keeps them
+            positive and suits rates that span orders of magnitude
+        bounds: (lower, upper) bounds of the parameters (or of their
+            logarithms if log is True)
+        step: relative step used for the finite differences
+    """
+    def __init__(
+        self,
+        model: Callable,
+        data: pd.DataFrame,
+        parameters: Dict[str, float],
+        target: str = 'N',
+        column: str = None,
+        time: str = 't',
+        log: bool = True,
+        bounds: Tuple = (-np.inf, np.inf),
+        step: float = 1e-6,
+    ):
+        self.model = model
+        self.names = list(parameters)
+        self.initial = np.array(list(parameters.values()), dtype=float)
+        self.target = target
+        self.column = column or target
+        self.times = np.asarray(data[time], dtype=float)
+        self.observed = np.asarray(data[self.column], dtype=float)
+        self.log = log
+        self.bounds = bounds
+        self.step = step
+
+        self.n_simulations = 0
+        self.n_candidates = 0
+        self._last = None
+        self.result = None
+        self.parameters = dict(parameters)
+
+    def _constants(self, x: np.ndarray) -> np.ndarray:
+        return np.exp(x) if self.log else x
+
+    def _x(self, constants: np.ndarray) -> np.ndarray:
+        return np.log(constants) if self.log else constants
+
+    def evaluate(self, candidates: np.ndarray) -> np.ndarray:
+        """Runs a single ensemble Simulation for an (m, parameters) array
+        of constants and returns the (m, times) array of the target
+        interpolated to the times of the data"""
+        candidates = np.atleast_2d(candidates)
+        m = len(candidates)
+        if m == 1:
+            # an ensemble has at least two members
+            candidates = np.repeat(candidates, 2, axis=0)
+        simulation = self.model(**{
+            name: candidates[:, i] for i, name in enumerate(self.names)
+        })
+        dt = simulation.constants['dt']
+        steps = int(np.ceil(self.times.max() / dt))
+        simulation.run(steps)
+        values = simulation.history.array(self.target)
+        self.n_simulations += 1
+        self.n_candidates += m
+
+        # linear interpolation from the steps to the times of the data
+        position = np.clip(self.times / dt, 0, steps)
+        lower = np.minimum(np.floor(position).astype(int), max(steps - 1, 0))
+        weight = (position - lower)[:, None]
+        upper = np.minimum(lower + 1, steps)
+        prediction = values[lower] * (1 - weight) + values[upper] * weight
+        return prediction.T[:m]
+
+    def _batch(self, x: np.ndarray):
+        """Residuals and Jacobian at x from one ensemble"""
+        if self._last is not None and np.array_equal(self._last[0], x):
+            return self._last[1:]
+        h = self.step * np.maximum(1.0, np.abs(x))
+        points = np.vstack([x, x + np.diag(h)])
+        residuals = self.evaluate(self._constants(points)) - self.observed
+        jacobian = (residuals[1:] - residuals[0]).T / h
+        self._last = (x.copy(), residuals[0], jacobian)
+        return residuals[0], jacobian
+
+    def residuals(self, x: np.ndarray) -> np.ndarray:
+        return self._batch(x)[0]
+
+    def jacobian(self, x: np.ndarray) -> np.ndarray:
+        return self._batch(x)[1]
+
+    def fit(self, **kwargs) -> Dict[str, float]:
+        """Runs scipy.optimize.least_squares and returns the fitted
+        constants, which are also stored in ModelFit.parameters
+
+        Parameters:
+            **kwargs: passed to least_squares e.g. xtol, max_nfev
+        """
+        self.result = least_squares(
+            self.residuals,
+            self._x(self.initial),
+            jac=self.jacobian,
+            bounds=self.bounds,
+            **kwargs
+        )
+        fitted = self._constants(self.result.x)
+        self.parameters = dict(zip(self.names, fitted.tolist()))
+        logger.info(
+            f'Fitted {self.parameters} (cost={self.result.cost:.3e}, '
+            f'{self.n_simulations} ensembles of {self.n_candidates} '
+            f'candidates)'
+        )
+        return self.parameters
+
+    def prediction(self, parameters: Dict[str, float] = None) -> pd.DataFrame:
+        """Dataframe of the data and the model at the times of the data"""
+        parameters = parameters or self.parameters
+        candidate = np.array([parameters[name] for name in self.names])
+        df = pd.DataFrame({'t': self.times, 'data': self.observed})
+        df['model'] = self.evaluate(candidate)[0]
+        return df
+
+def fit_experiments(
+    model: Union[Callable, Dict[str, Callable]],
+    experiments: Dict[str, pd.DataFrame],
+    parameters: Dict[str, float],
+    fit_kwargs: dict = None,
+    **kwargs
+) -> pd.DataFrame:
+    """Fits a model to each of many experiments and returns a dataframe
+    with one row per experiment containing the fitted constants, the
+    cost and the number of ensembles run
+
+    Parameters:
+        model: model for every experiment, or a dictionary containing the
+            model for each experiment e.g. with different initial numbers
+        experiments: dictionary of the species count dataframes
+        parameters: initial values of the fitted constants
+        fit_kwargs: passed to ModelFit.fit
+        **kwargs: passed to ModelFit
+    """
+    rows = []
+    for name, data in experiments.items():
+        fit = ModelFit(
+            model[name] if isinstance(model, dict) else model,
+            data,
+            parameters,
+            **kwargs
+        )
+        fitted = fit.fit(**(fit_kwargs or {}))
+        rows.append({
+            'experiment': name,
+            **fitted,
+            'cost': fit.result.cost,
+            'simulations': fit.n_simulations,
+        })
+    return pd.DataFrame(rows).set_index('experiment')
@@ -1 +1 @@
-from .engine import Simulation, Equation, History
\ No newline at end of file
+from .engine import Simulation, Equation, History, parameter_grid
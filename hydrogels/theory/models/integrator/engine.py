@@ -1,7 +1,9 @@
 import numpy as np
 import pandas as pd
-from typing import List
+from typing import Callable, Dict, Iterable, List
 import functools
+import warnings
+from scipy.integrate import solve_ivp
 from tqdm import tqdm
 
 class Equation():
@@ -28,12 +30,42 @@ class Equation():
         # set description
         self._string = f'{function.__name__} := {string}'
 
+        # whether the function accepts arrays, which is unknown until it
+        # is first evaluated for an ensemble
+        self._vectorised = None
+        self._elementwise = None
+
     def __call__(self, input_dict):
         parameters = {}
         for key in self.parameters:
             parameters[key] = input_dict[key]
         return self._function(**parameters)
 
+    def evaluate(self, input_dict, size: int) -> np.ndarray:
+        """Evaluates the equation element-wise for inputs that are arrays
+        of a given size (or scalars). The function is called with the
+        arrays directly if it accepts them, otherwise it falls back to
+        calling it for every element using np.vectorize"""
+        parameters = {key: input_dict[key] for key in self.parameters}
+        if self._vectorised is not False:
+            try:
+                result = self._function(**parameters)
+                result = np.broadcast_to(
+                    np.asarray(result, dtype=float),
+                    (size,)
+                )
+                self._vectorised = True
+                return result
+            except (TypeError, ValueError):
+                if self._vectorised:
+                    raise
+                self._vectorised = False
+                self._elementwise = np.vectorize(
+                    self._function,
+                    otypes=[float]
+                )
+        return self._elementwise(**parameters)
+
     @property
     def string(self):
         return self._string
@@ -45,31 +77,185 @@ class History():
     """
     An instance of History contains data from a Simulation instance and records it
     along with metadata for analysis afterwards.
+
+    The variables and the time of every recorded step are stored in
+    preallocated numpy buffers that double in size when they are full. For
+    a scalar Simulation all of them are columns of a single (steps,
+    variables + 1) array, so History.dataframe wraps it without copying.
+    For an ensemble Simulation, every variable is stored in a (steps,
+    ensemble) array, see History.array.
+
+    Parameters:
+        sim_obj: the Simulation
+        record_every: only record every record_every steps, which limits
+            the memory used by long runs (the initial state is always
+            recorded)
+        capacity: initial number of rows of the buffers
     """
-    def __init__(self, sim_obj, **kwargs):
+    # number of rows collected by History.record before they are copied
+    # into the buffer in one go
+    CHUNK = 4096
+
+    def __init__(self, sim_obj, record_every: int = 1, capacity: int = 1024, **kwargs):
         self._simulation = sim_obj
-        self.data = {}
+        self.record_every = int(record_every)
+        if self.record_every < 1:
+            raise ValueError('record_every must be at least 1')
+        self.capacity = max(int(capacity), 1)
 
         self.initialise()
 
     def initialise(self):
-        # read variables and setup data dictionary
-        self.data = {}
-        for key, value in self._simulation.variables.items():
-            self.data[key] = [value]
+        # read variables and setup buffers
+        self.keys = list(self._simulation.variables)
+        self.size = self._simulation.ensemble
+        self.step = 0
+        self._rows = 0
+        self._pending = []
+        if self.size:
+            self._buffers = {
+                key: np.empty((self.capacity, self.size)) for key in self.keys
+            }
+            self._time = np.empty(self.capacity)
+        else:
+            self._buffer = np.empty((self.capacity, len(self.keys) + 1))
+        self._store(tuple(self._simulation.variables.values()), 0.0)
+
+    @property
+    def dt(self) -> float:
+        return self._simulation.constants['dt']
+
+    def _grow(self, required: int):
+        """Reallocates the buffers with space for at least required rows"""
+        if required <= self.capacity:
+            return
+        self.capacity = max(required, 2 * self.capacity)
+        def grown(array):
+            result = np.empty(
+                (self.capacity,) + array.shape[1:],
+                dtype=array.dtype
+            )
+            result[:self._rows] = array[:self._rows]
+            return result
+        if self.size:
+            self._buffers = {
+                key: grown(array) for key, array in self._buffers.items()
+            }
+            self._time = grown(self._time)
+        else:
+            self._buffer = grown(self._buffer)
+
+    def _assign(self, rows: slice, values):
+        try:
+            self._buffer[rows] = values
+        except (TypeError, ValueError):
+            # variables that are not numbers are kept in an object buffer
+            self._buffer = self._buffer.astype(object)
+            self._buffer[rows] = values
+
+    def _store(self, values: tuple, t: float):
+        self._flush()
+        self._grow(self._rows + 1)
+        if self.size:
+            for key, value in zip(self.keys, values):
+                self._buffers[key][self._rows] = np.nan if value is None else value
+            self._time[self._rows] = t
+        else:
+            self._assign(self._rows, tuple(values) + (t,))
+        self._rows += 1
+
+    def _flush(self):
+        """Copies the rows collected by History.record into the buffer"""
+        if not self._pending:
+            return
+        n = len(self._pending)
+        self._grow(self._rows + n)
+        rows = slice(self._rows, self._rows + n)
+        self._assign(rows, self._pending)
+        # the last column holds the step until here
+        self._buffer[rows, -1] *= self.dt
+        self._rows += n
+        self._pending = []
+
+    def reserve(self, n_steps: int):
+        """Makes space for n_steps more steps"""
+        self._grow(
+            self._rows + len(self._pending) + n_steps // self.record_every + 1
+        )
 
     def update(self):
-        for key, value in self._simulation.variables.items():
-            self.data[key].append(value)
+        self.record(tuple(self._simulation.variables.values()))
         return
 
+    def record(self, values: tuple):
+        """Records the values of the variables in the order of
+        Simulation.variables for the next step, which is faster than
+        History.update"""
+        self.step += 1
+        if self.step % self.record_every:
+            return
+        if self.size:
+            self._store(values, self.step * self.dt)
+            return
+        self._pending.append(values + (self.step,))
+        if len(self._pending) >= self.CHUNK:
+            self._flush()
+        return
+
+    def replace(self, rows: List[tuple], times: Iterable):
+        """Replaces the history with the given rows of values of the
+        variables at explicit times, e.g. from Simulation.solve"""
+        self.initialise()
+        self._rows = 0
+        for values, t in zip(rows, times):
+            self._store(values, t)
+        self.step = self._rows - 1
+
+    @property
+    def rows(self) -> int:
+        """Number of recorded steps"""
+        return self._rows + len(self._pending)
+
+    @property
+    def data(self) -> Dict[str, np.ndarray]:
+        """Recorded values of each variable"""
+        return {key: self.array(key) for key in self.keys}
+
+    @property
+    def times(self) -> np.ndarray:
+        """Times of the recorded steps"""
+        self._flush()
+        if self.size:
+            return self._time[:self._rows]
+        return self._buffer[:self._rows, -1]
+
+    def array(self, key: str) -> np.ndarray:
+        """Returns the recorded values of a variable as a view of the
+        buffer, with shape (steps, ensemble) for an ensemble"""
+        self._flush()
+        if self.size:
+            return self._buffers[key][:self._rows]
+        return self._buffer[:self._rows, self.keys.index(key)]
+
     @property
     def dataframe(self) -> pd.DataFrame:
-        df = pd.DataFrame(self.data)
-        times = [i * self.meta['constants']['dt'] for i in range(self._simulation.timestep + 1)]
-        df['t'] = times
-        return df
-    
+        self._flush()
+        size = self.size
+        if size:
+            # long format with one row per step and ensemble member
+            rows = self._rows
+            df = pd.DataFrame({
+                key: self.array(key).reshape(-1) for key in self.keys
+            })
+            df['t'] = np.repeat(self.times, size)
+            df['member'] = np.tile(np.arange(size), rows)
+            return df
+        return pd.DataFrame(
+            self._buffer[:self._rows],
+            columns=self.keys + ['t'],
+            copy=False
+        )
+
     @property
     def meta(self) -> dict:
         data = {
@@ -78,18 +264,55 @@ class History():
         }
         return data
 
+def parameter_grid(**values) -> dict:
+    """Returns a dictionary of flat arrays containing every combination
+    of the given values, for use as the constants of an ensemble
+    Simulation
+
+    >>> parameter_grid(a=[1, 2], b=[3, 4])['b']
+    array([3., 4., 3., 4.])
+    """
+    grids = np.meshgrid(
+        *[np.asarray(value, dtype=float) for value in values.values()],
+        indexing='ij'
+    )
+    return {key: grid.reshape(-1) for key, grid in zip(values, grids)}
+
 class Simulation():
     """
     A simulation integrates over a given timestep to solve Equations in order as a function
     of time.
+
+    If any of the constants or variables are numpy arrays, the Simulation
+    integrates an ensemble of parameter sets at once, where every array
+    has one element for each member of the ensemble (see parameter_grid)
+    and the equations are evaluated element-wise.
+
+    If compile is True, the equations are compiled into a single step
+    function when the Simulation is created (see Simulation.compile),
+    which avoids building dictionaries of inputs for every equation at
+    every step.
     """
-    def __init__(self, dt, constants={}, variables={}, equations : List[Equation] = [], **kwargs):
+    def __init__(self, dt, constants={}, variables={}, equations : List[Equation] = [], compile: bool = True, **kwargs):
 
         self._constants = constants
         self._constants['dt'] = dt
         self._variables = variables
         self._equations = equations
 
+        self._step = None
+        self.source = None
+        if compile:
+            self.compile()
+
+        self.ensemble = self._ensemble_size()
+        if self.ensemble:
+            for key, value in self._variables.items():
+                self._variables[key] = np.broadcast_to(
+                    np.nan if value is None else np.asarray(value, dtype=float),
+                    (self.ensemble,)
+                )
+
         self.timestep = 0
 
         self.history = History(self, **kwargs)
@@ -100,15 +323,306 @@ class Simulation():
         output = ""
         return output
 
+    def _ensemble_size(self) -> int:
+        """Number of members of the ensemble, or None if all constants and
+        variables are scalars"""
+        sizes = {
+            len(value)
+            for value in {**self._constants, **self._variables}.values()
+            if isinstance(value, np.ndarray) and value.ndim == 1
+        }
+        sizes.discard(1)
+        if len(sizes) > 1:
+            raise ValueError(
+                f'Ensemble arrays have different sizes: {sorted(sizes)}'
+            )
+        return sizes.pop() if sizes else None
+
+    def compile(self):
+        """Generates a step function that evaluates every equation in
+        order, where the variables are held in local variables (slots)
+        instead of a dictionary, and stores its source in
+        Simulation.source.
+
+        The step function takes a tuple of the values of the variables in
+        the order of Simulation.variables and a tuple of the values of the
+        constants and returns the tuple of the new values of the
+        variables."""
+        for equation in self._equations:
+            self._variables.setdefault(equation.output, None)
+        variables = list(self._variables)
+        constants = [key for key in self._constants if key not in variables]
+        symbols = {key: f'_v{i}' for i, key in enumerate(variables)}
+        symbols.update({key: f'_c{i}' for i, key in enumerate(constants)})
+
+        namespace = {}
+        lines = ['def step(_variables, _constants):']
+        if variables:
+            lines.append(
+                f'    {", ".join(symbols[key] for key in variables)}, '
+                '= _variables'
+            )
+        if constants:
+            lines.append(
+                f'    {", ".join(symbols[key] for key in constants)}, '
+                '= _constants'
+            )
+        for i, equation in enumerate(self._equations):
+            namespace[f'_f{i}'] = equation._function
+            arguments = ', '.join(
+                f'{key}={symbols[key]}' for key in equation.parameters
+            )
+            lines.append(f'    # {equation.string}'.replace('\n', ' '))
+            lines.append(f'    {symbols[equation.output]} = _f{i}({arguments})')
+        lines.append(
+            f'    return ({"".join(symbols[key] + ", " for key in variables)})'
+        )
+        self.source = '\n'.join(lines)
+        exec(self.source, namespace)
+        self._step = namespace['step']
+        self._constant_keys = constants
+        return self._step
+
+    def _run_compiled(self, n_timesteps, progress: bool = True):
+        variables = tuple(self._variables.values())
+        constants = tuple(self._constants[key] for key in self._constant_keys)
+        step = self._step
+        record = self.history.record
+        steps = tqdm(range(n_timesteps)) if progress else range(n_timesteps)
+        for _ in steps:
+            variables = step(variables, constants)
+            record(variables)
+        self._variables.update(zip(self._variables, variables))
+        self.timestep += n_timesteps
+        return
+
     def integrate(self):
-        for equation in self.equations:
-            self._variables[equation.output] = equation(self.inputs)
+        if self._step is not None and not self.ensemble:
+            self._run_compiled(1, progress=False)
+            return
+        if self.ensemble:
+            for equation in self._equations:
+                self._variables[equation.output] = equation.evaluate(
+                    self.inputs,
+                    self.ensemble
+                )
+        else:
+            for equation in self.equations:
+                self._variables[equation.output] = equation(self.inputs)
         self.timestep += 1
         self.history.update()
         return
 
+    @property
+    def derivatives(self) -> Dict[str, Callable]:
+        """Functions of the variables that return the rate of change of
+        each state variable, which are used by Simulation.solve to treat
+        the equations as ODEs. Overridden by models"""
+        return {}
+
+    def solve(
+        self,
+        t_end: float,
+        t_eval: Iterable = None,
+        derivatives: Dict[str, Callable] = None,
+        terminate: bool = True,
+        method: str = 'LSODA',
+        **kwargs
+    ):
+        """Alternative to Simulation.run that integrates the state
+        variables (the keys of Simulation.derivatives) with an adaptive
+        step size using scipy.integrate.solve_ivp, and evaluates the
+        remaining equations in order for every evaluation of the
+        derivatives.
+
+        If terminate is True, integration stops as soon as any state
+        variable reaches zero e.g. when the gel has dissolved. The
+        history is replaced by the solution at t_eval (by default the
+        steps taken by the solver, plus the time at which integration was
+        terminated) and the dataframe has explicit times.
+
+        State variables are clamped to zero when the derivatives are
+        evaluated. Integration always stops if the derivatives are no
+        longer finite, e.g. when a rate overflows close to dissolution,
+        and the state variables that diverge are set to zero, as they
+        are by the clamped update of Simulation.run. This and a failure
+        of the solver both give a RuntimeWarning.
+
+        Parameters:
+            t_end: time to integrate to
+            t_eval: times to store in the history
+            derivatives: overrides Simulation.derivatives
+            terminate: stop when a state variable reaches zero
+            method: integration method passed to solve_ivp
+            **kwargs: passed to solve_ivp e.g. rtol, atol, max_step
+
+        Returns:
+            Simulation.history.dataframe
+        """
+        if self.ensemble:
+            raise NotImplementedError(
+                'Simulation.solve does not support ensembles'
+            )
+        derivatives = derivatives or self.derivatives
+        if not derivatives:
+            raise ValueError(
+                'Simulation.solve requires the derivatives of the state '
+                'variables'
+            )
+        states = list(derivatives)
+        chain = [i for i in self._equations if i.output not in derivatives]
+        variables = dict(self._variables)
+
+        def evaluate(y) -> dict:
+            variables.update(zip(states, y))
+            inputs = {**self._constants, **variables}
+            for equation in chain:
+                value = equation(inputs)
+                inputs[equation.output] = variables[equation.output] = value
+            return variables
+
+        def gradient(y) -> np.ndarray:
+            y = np.asarray(y, dtype=float)
+            current = evaluate(np.maximum(y, 0.0))
+            with np.errstate(invalid='ignore', over='ignore'):
+                result = np.array(
+                    [derivatives[key](current) for key in states],
+                    dtype=float
+                )
+            # a state variable that has run out cannot fall any further
+            return np.where(y > 0.0, result, np.maximum(result, 0.0))
+
+        def rhs(t, y):
+            # keeps the solver finite so that the diverged event can find
+            # where the derivatives stop being finite
+            result = gradient(y)
+            return np.where(np.isfinite(result), result, 0.0)
+
+        # state variables that diverged when the diverged event last fired
+        diverging = [None]
+        def diverged(t, y):
+            infinite = ~np.isfinite(y) | ~np.isfinite(gradient(y))
+            if infinite.any():
+                diverging[0] = infinite
+                return -1.0
+            return 1.0
+        diverged.terminal = True
+        diverged.direction = -1
+        events = [diverged]
+
+        if terminate:
+            def depleted(t, y):
+                return np.min(y)
+            depleted.terminal = True
+            depleted.direction = -1
+            events.append(depleted)
+
+        y0 = [float(self._variables[key]) for key in states]
+        with warnings.catch_warnings():
+            # overflowing rates are caught by the diverged event
+            warnings.simplefilter('ignore', RuntimeWarning)
+            solution = solve_ivp(
+                rhs,
+                (0.0, t_end),
+                y0,
+                method=method,
+                t_eval=t_eval,
+                events=events,
+                **kwargs
+            )
+        times = list(solution.t)
+        ys = list(solution.y.T)
+        if solution.status == 1:
+            # terminated by an event, so end exactly at the event
+            index = next(i for i, t in enumerate(solution.t_events) if len(t))
+            t_event = solution.t_events[index][0]
+            y_event = solution.y_events[index][0]
+            while times and times[-1] >= t_event:
+                times, ys = times[:-1], ys[:-1]
+            if events[index] is diverged:
+                if not np.isfinite(y_event).all():
+                    y_event = ys[-1] if ys else np.array(y0)
+                y_event = np.where(
+                    diverging[0], 0.0, np.maximum(y_event, 0.0)
+                )
+                warnings.warn(
+                    f'The derivatives of {type(self).__name__} are not '
+                    f'finite at t={t_event:g}, so integration stopped '
+                    f'and the diverging state variables were set to 0',
+                    RuntimeWarning
+                )
+            else:
+                y_event = np.maximum(y_event, 0.0)
+                y_event[np.argmin(y_event)] = 0.0
+            times.append(t_event)
+            ys.append(y_event)
+        elif not solution.success:
+            warnings.warn(
+                f'Simulation.solve stopped at t={times[-1]:g}: '
+                f'{solution.message}',
+                RuntimeWarning
+            )
+
+        rows = [dict(evaluate(y)) for y in ys]
+        self.history.replace(
+            [tuple(row.get(key) for key in self._variables) for row in rows],
+            times
+        )
+        self._variables.update(rows[-1])
+        self.timestep = len(times) - 1
+        self.solution = solution
+        return self.history.dataframe
+
+    def _native(self, n_timesteps: int, **kwargs) -> dict:
+        """Calls the function of the hydrogels.engine extension that
+        integrates the fixed chain of equations of a model and returns
+        its dictionary of arrays. Overridden by models"""
+        raise NotImplementedError(
+            f'{type(self).__name__} does not have a native integrator'
+        )
+
+    def run_native(
+        self,
+        n_timesteps: int,
+        stride: int = 1,
+        terminate: bool = False,
+    ) -> pd.DataFrame:
+        """Alternative to Simulation.run that runs the whole loop in C++
+        (see hydrogels.engine) for models with a fixed chain of equations,
+        starting from the current state of the Simulation.
+
+        The Simulation itself, including its history, is not changed, so
+        Simulation.run remains the reference implementation.
+
+        Parameters:
+            n_timesteps: number of steps
+            stride: record the variables every stride steps
+            terminate: stop once the number of particles reaches zero
+
+        Returns:
+            dataframe with the same columns as Simulation.history.dataframe
+        """
+        if self.ensemble:
+            raise NotImplementedError(
+                'Simulation.run_native does not support ensembles'
+            )
+        arrays = self._native(
+            n_timesteps,
+            stride=stride,
+            terminate=terminate,
+            t0=self.timestep * self._constants['dt'],
+        )
+        df = pd.DataFrame({key: arrays[key] for key in self._variables})
+        for key, value in self._variables.items():
+            # the first row is the current state, as in History
+            df.loc[0, key] = np.nan if value is None else value
+        df['t'] = arrays['t']
+        return df
+
     def add_equation(self, equation : Equation):
         self._equations.append(equation)
+        if self._step is not None:
+            self.compile()
         self.history.initialise()
 
     @property
@@ -128,6 +642,10 @@ class Simulation():
         return self._equations
 
     def run(self, n_timesteps):
+        self.history.reserve(n_timesteps)
+        if self._step is not None and not self.ensemble:
+            self._run_compiled(n_timesteps)
+            return
         for i in tqdm(range(n_timesteps)):
             self.integrate()
         return
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""Kinetic Monte Carlo model of the enzymatic degradation of a gel on the
+graph of its bonds, as an alternative to Brownian dynamics in ReaDDy
+
+Classes:
+    KineticMonteCarlo: samples the number of monomers, unbonded and
+        released particles of a gel over time
+"""
+import time
+from typing import Callable, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+import hydrogels.engine as engine
+
+MONOMER, UNBONDED, RELEASED = 0, 1, 2
+
+class KineticMonteCarlo():
+    """
+    Kinetic Monte Carlo model of the enzymatic degradation of a gel that
+    treats the degradation as a rate process on the graph of the gel
+    instead of running Brownian dynamics.
+
+    Every monomer is converted to an unbonded particle with rate
+    rate * accessibility (the equivalent of Gel.register_degradation,
+    where rate is the effective first order rate of a fully accessible
+    monomer). Every unbonded particle loses all of its bonds and is
+    released with scission_rate (the equivalent of Gel.register_decay).
+    Particles that are left without any bonds are released immediately,
+    which matches the lone particle rule of BondBreaking.polymer.
+
+    Accessibility can be a number, an array with a value for each
+    vertex, or a function that takes an array of numbers of bonds and
+    returns the accessibility of a vertex with each number of bonds.
+    With a function, the rates depend on the state of the gel and events
+    are drawn one at a time with the Gillespie algorithm, which runs in
+    C++ (see hydrogels.engine) with the function tabulated for every
+    number of bonds. Otherwise the particles degrade independently of each other, so the
+    time of every event can be drawn in one go (the 'direct' method),
+    which samples the same process at millions of events per second.
+
+    Example:
+
+    ```python
+    model = KineticMonteCarlo(gel, rate=0.1, seed=1)
+    df = model.run(100.0)
+    df.plot(x='t')
+    ```
+
+    Parameters:
+        topology: Gel or Topology containing the sequence and edges
+        rate: degradation rate of a fully accessible monomer
+        scission_rate: rate at which unbonded particles are released
+        accessibility: relative accessibility of monomers to enzymes
+        monomer: name of monomer type (defaults to Gel.monomer)
+        unbonded: name of unbonded type (defaults to Gel.unbonded)
+        released: name of released type
+        method: 'auto', 'gillespie' or 'direct'
+        seed: seed for the random number generator
+    """
+    def __init__(
+        self,
+        topology: "Topology",
+        rate: float = 1e-3,
+        scission_rate: float = 10000.0,
+        accessibility: Union[float, np.ndarray, Callable] = 1.0,
+        monomer: str = None,
+        unbonded: str = None,
+        released: str = 'released',
+        method: str = 'auto',
+        seed: int = None,
+    ):
+        self.monomer = monomer or getattr(topology, 'monomer', 'monomer')
+        self.unbonded = unbonded or getattr(topology, 'unbonded', 'unbonded')
+        self.released = released
+        self.rate = rate
+        self.scission_rate = scission_rate
+        self.accessibility = accessibility
+
+        if method == 'auto':
+            method = 'gillespie' if callable(accessibility) else 'direct'
+        if method not in ('gillespie', 'direct'):
+            raise ValueError(f"Unknown method '{method}'")
+        if method == 'direct' and callable(accessibility):
+            raise ValueError(
+                'The direct method requires a static accessibility'
+            )
+        self.method = method
+        self.rng = np.random.default_rng(seed)
+
+        # vertex states from the sequence
+        sequence = np.asarray(topology.sequence)
+        unknown = set(sequence) - {self.monomer, self.unbonded}
+        if unknown:
+            raise ValueError(
+                f'Cannot simulate particle types {unknown}, expected only '
+                f'{self.monomer} and {self.unbonded}'
+            )
+        self.initial = np.where(sequence == self.unbonded, UNBONDED, MONOMER)
+        self.initial = self.initial.astype(np.int8)
+        self.N = len(self.initial)
+
+        adjacency = topology.adjacency[:self.N, :self.N].tocsr()
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        self.indptr = adjacency.indptr
+        self.indices = adjacency.indices
+
+        self.n_events = 0
+        self.elapsed = 0.0
+
+    @property
+    def degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def _accessibility(self, degree: np.ndarray) -> np.ndarray:
+        if callable(self.accessibility):
+            return np.asarray(self.accessibility(degree), dtype=float)
+        return np.broadcast_to(
+            np.asarray(self.accessibility, dtype=float),
+            (self.N,)
+        )
+
+    @staticmethod
+    def _times(duration: float, samples: int, times: Iterable) -> np.ndarray:
+        if times is not None:
+            return np.sort(np.asarray(times, dtype=float))
+        return np.linspace(0.0, duration, samples)
+
+    def run(
+        self,
+        duration: float = None,
+        samples: int = 101,
+        times: Iterable = None,
+    ) -> pd.DataFrame:
+        """Runs the model and returns the number of particles of each
+        type at each time, with the same layout as
+        ParticleTrajectory.count_atoms
+
+        Parameters:
+            duration: end time, with samples evenly spaced times
+            samples: number of sampled times
+            times: sampled times (overrides duration and samples)
+        """
+        if duration is None and times is None:
+            raise ValueError('Either duration or times must be given')
+        times = self._times(duration, samples, times)
+        start = time.perf_counter()
+        if self.method == 'direct':
+            counts = self._direct(times)
+        else:
+            counts = self._gillespie(times)
+        self.elapsed = time.perf_counter() - start
+
+        result = pd.DataFrame()
+        result['t'] = times
+        for name, column in zip(
+            (self.monomer, self.unbonded, self.released),
+            counts.T
+        ):
+            result[name] = column
+        return result
+
+    @property
+    def events_per_second(self) -> float:
+        return self.n_events / self.elapsed if self.elapsed else 0.0
+
+    def _direct(self, times: np.ndarray) -> np.ndarray:
+        """Draws the time of every event at once.
+
+        For static accessibilities a monomer degrades at time T after an
+        exponential waiting time, and is then cut at S = T + an
+        exponential waiting time. A particle loses its last bond either
+        when it is cut or when the last of its neighbours is cut, so it is
+        released at R = min(S, max(S of neighbours)), and particles
+        without any bonds are released straight away"""
+        rates = self.rate * self._accessibility(self.degree)
+        with np.errstate(divide='ignore'):
+            T = self.rng.exponential(1.0, self.N) / rates
+        T[self.initial == UNBONDED] = 0.0
+        S = T + self.rng.exponential(1.0 / self.scission_rate, self.N)
+
+        degree = self.degree
+        R = np.zeros(self.N)
+        bonded = degree > 0
+        if bonded.any():
+            last = np.maximum.reduceat(
+                S[self.indices],
+                self.indptr[:-1][bonded]
+            )
+            R[bonded] = np.minimum(S[bonded], last)
+
+        degraded = np.sort(np.minimum(T, R))
+        released = np.sort(R)
+        self.n_events = int(
+            np.count_nonzero((T < R) & (self.initial == MONOMER))
+            + np.count_nonzero(np.isfinite(R))
+        )
+
+        n_degraded = np.searchsorted(degraded, times, side='right')
+        n_released = np.searchsorted(released, times, side='right')
+        return np.stack([
+            self.N - n_degraded,
+            n_degraded - n_released,
+            n_released
+        ], axis=1)
+
+    def _gillespie(self, times: np.ndarray) -> np.ndarray:
+        """Draws one event at a time with the event loop of
+        hydrogels.engine, which keeps the rate of the single possible
+        event of each particle in a binary sum tree.
+
+        The number of bonds of a particle can only fall, so a function
+        of the accessibility is evaluated once for every number of bonds
+        up to the largest in the gel instead of after every event"""
+        degree = self.degree
+        table = np.zeros(0)
+        if callable(self.accessibility):
+            bonds = np.arange(degree.max(initial=0) + 1)
+            table = self.rate * np.broadcast_to(
+                self._accessibility(bonds),
+                bonds.shape
+            )
+            rates = table[degree]
+        else:
+            rates = self.rate * self._accessibility(degree)
+        result = engine.kinetic_monte_carlo(
+            self.indptr,
+            self.indices,
+            self.initial,
+            rates,
+            table,
+            self.scission_rate,
+            times,
+            seed=int(self.rng.integers(2 ** 63)),
+        )
+        self.n_events = result['events']
+        return result['counts']
@@ -0,0 +1 @@
+from .radial import RadialDegradation
@@ -0,0 +1,218 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_banded
+
+import hydrogels.functions as functions
+
+class RadialDegradation():
+    """
+    Spherically symmetric finite volume model of the enzymatic degradation
+    of a gel, between the 0-D rate models (ConstantDensity, LennardJones)
+    and particle simulations in ReaDDy.
+
+    Three fields are defined on shells of equal thickness from the centre
+    of the gel to the edge of the domain:
+
+        c: concentration of enzymes, which diffuse with a coefficient that
+            is reduced inside the gel and are held at c0 at the edge of
+            the domain
+        monomer: density of intact monomers, which are degraded with the
+            local rate functions.rate_from_potential_energy(rate, c,
+            barrier, beta) i.e. rate * c * exp(-beta * barrier)
+        unbonded: density of degraded monomers that are still part of
+            the gel
+
+    Diffusion is integrated implicitly with a tridiagonal solve and the
+    reaction exactly, so the time step is not limited by stability. The
+    gel erodes from the outside: every shell outside of the outermost
+    shell in which the monomer density is at least threshold * density
+    is released, which defines the erosion front.
+
+    Example:
+
+    ```python
+    model = RadialDegradation(10.0, rate=0.1, diffusion=1.0, hindrance=4.0)
+    df = model.run(100.0, dt=0.1)
+    df.plot(x='t', y=['monomer', 'unbonded', 'released'])
+    ```
+
+    Parameters:
+        radius: initial radius of the gel
+        density: initial number density of monomers in the gel
+        rate: degradation rate per unit enzyme concentration
+        c0: enzyme concentration in the bulk
+        diffusion: diffusion coefficient of enzymes in solvent
+        hindrance: the diffusion coefficient in the gel is reduced by a
+            factor 1 + hindrance * (monomer + unbonded) / density
+        barrier: energy barrier for degradation
+        beta: inverse temperature
+        threshold: fraction of the initial monomer density below which
+            shells at the surface of the gel are released
+        length: radius of the domain (defaults to twice the radius)
+        cells: number of shells
+        c_gel: initial enzyme concentration inside the gel
+    """
+    def __init__(
+        self,
+        radius: float,
+        density: float = 1.0,
+        rate: float = 1e-3,
+        c0: float = 1.0,
+        diffusion: float = 1.0,
+        hindrance: float = 0.0,
+        barrier: float = 0.0,
+        beta: float = 1.0,
+        threshold: float = 0.1,
+        length: float = None,
+        cells: int = 200,
+        c_gel: float = 0.0,
+    ):
+        self.radius = radius
+        self.density = density
+        self.rate = rate
+        self.c0 = c0
+        self.diffusion = diffusion
+        self.hindrance = hindrance
+        self.barrier = barrier
+        self.beta = beta
+        self.threshold = threshold
+        self.length = length or 2.0 * radius
+        if self.length <= radius:
+            raise ValueError('The domain must be larger than the gel')
+
+        # shells of equal thickness
+        self.faces = np.linspace(0.0, self.length, cells + 1)
+        self.r = 0.5 * (self.faces[1:] + self.faces[:-1])
+        self.dr = self.faces[1] - self.faces[0]
+        self.volumes = 4.0 / 3.0 * np.pi * np.diff(self.faces ** 3)
+        self.areas = 4.0 * np.pi * self.faces ** 2
+
+        gel = self.r < radius
+        self.monomer_density = np.where(gel, density, 0.0)
+        self.unbonded_density = np.zeros(cells)
+        self.c = np.where(gel, c_gel, c0)
+        self.released = 0.0
+        self.t = 0.0
+        self.N = self.total(self.monomer_density)
+
+    def total(self, field: np.ndarray) -> float:
+        """Integral of a density over the domain"""
+        return float(np.dot(field, self.volumes))
+
+    @property
+    def monomer(self) -> float:
+        return self.total(self.monomer_density)
+
+    @property
+    def unbonded(self) -> float:
+        return self.total(self.unbonded_density)
+
+    @property
+    def front(self) -> float:
+        """Radius of the erosion front"""
+        intact = np.nonzero(self.monomer_density > 0.0)[0]
+        return self.faces[intact[-1] + 1] if len(intact) else 0.0
+
+    def diffusion_coefficients(self) -> np.ndarray:
+        gel = (self.monomer_density + self.unbonded_density) / self.density
+        return self.diffusion / (1.0 + self.hindrance * gel)
+
+    def _diffuse(self, dt: float):
+        """Backward Euler step of the enzyme concentration"""
+        D = self.diffusion_coefficients()
+        # harmonic mean of the coefficients of neighbouring shells
+        inner = 2.0 * D[1:] * D[:-1] / (D[1:] + D[:-1])
+        # conductance of each inner face and of the outer boundary, where
+        # the concentration is c0 half a shell away from the last centre
+        G = self.areas[1:-1] * inner / self.dr
+        G_out = self.areas[-1] * D[-1] / (0.5 * self.dr)
+        scale = dt / self.volumes
+
+        n = len(self.c)
+        ab = np.zeros((3, n))
+        diagonal = np.ones(n)
+        diagonal[:-1] += scale[:-1] * G
+        diagonal[1:] += scale[1:] * G
+        diagonal[-1] += scale[-1] * G_out
+        ab[1] = diagonal
+        ab[0, 1:] = -scale[:-1] * G
+        ab[2, :-1] = -scale[1:] * G
+        rhs = self.c.copy()
+        rhs[-1] += scale[-1] * G_out * self.c0
+        self.c = solve_banded((1, 1), ab, rhs)
+
+    def _react(self, dt: float):
+        """Exact step of the first order degradation of monomers"""
+        k = functions.rate_from_potential_energy(
+            self.rate, self.c, self.barrier, self.beta
+        )
+        remaining = self.monomer_density * np.exp(-k * dt)
+        self.unbonded_density += self.monomer_density - remaining
+        self.monomer_density = remaining
+
+    def _erode(self):
+        """Releases every shell outside of the erosion front"""
+        intact = np.nonzero(
+            self.monomer_density >= self.threshold * self.density
+        )[0]
+        first = intact[-1] + 1 if len(intact) else 0
+        gel = self.monomer_density[first:] + self.unbonded_density[first:]
+        self.released += float(np.dot(gel, self.volumes[first:]))
+        self.monomer_density[first:] = 0.0
+        self.unbonded_density[first:] = 0.0
+
+    def step(self, dt: float):
+        self._diffuse(dt)
+        self._react(dt)
+        self._erode()
+        self.t += dt
+
+    def run(
+        self,
+        duration: float = None,
+        dt: float = 0.1,
+        samples: int = 101,
+        times: Iterable = None,
+    ) -> pd.DataFrame:
+        """Integrates the model and returns the number of monomers,
+        unbonded monomers and released monomers and the radius of the
+        erosion front at each sampled time, with the same layout as
+        KineticMonteCarlo.run
+
+        Parameters:
+            duration: time to integrate for, with samples evenly spaced
+                times
+            dt: largest time step
+            samples: number of sampled times
+            times: sampled times relative to the current time (overrides
+                duration and samples)
+        """
+        if duration is None and times is None:
+            raise ValueError('Either duration or times must be given')
+        if times is None:
+            times = np.linspace(0.0, duration, samples)
+        times = self.t + np.sort(np.asarray(times, dtype=float))
+        rows = []
+        for t in times:
+            while self.t < t - 1e-12 * max(1.0, t):
+                self.step(min(dt, t - self.t))
+            rows.append({
+                't': self.t,
+                'monomer': self.monomer,
+                'unbonded': self.unbonded,
+                'released': self.released,
+                'front': self.front,
+            })
+        return pd.DataFrame(rows)
+
+    @property
+    def profile(self) -> pd.DataFrame:
+        """Current fields as a function of the radius"""
+        return pd.DataFrame({
+            'r': self.r,
+            'c': self.c,
+            'monomer': self.monomer_density,
+            'unbonded': self.unbonded_density,
+        })
@@ -1,10 +1,21 @@
 from ..integrator import Simulation, Equation
 import hydrogels.potentials as potentials
 import hydrogels.functions as functions
+import hydrogels.engine as engine
+
+# parameters that the potentials of the native integrator read from the
+# constants of a ConstantDensity simulation
+NATIVE_POTENTIALS = {
+    'zero': [],
+    'harmonic': ['K'],
+    'lennard_jones': ['sig', 'eps', 'rc'],
+    'macro_LJ': ['sig', 'eps', 'nV', 'rE'],
+}
 
 class ConstantDensity(Simulation):
     def __init__(self, dt, potential_equation, **kwargs):
         self._potential_equation = potential_equation
+        self.native_potential = kwargs.get('native_potential', None)
         super().__init__(
             dt, 
             constants = {
@@ -22,7 +33,9 @@ class ConstantDensity(Simulation):
                 'V' : None,
                 'k' : None
             },
-            equations= self.equations
+            equations= self.equations,
+            compile=kwargs.get('compile', True),
+            record_every=kwargs.get('record_every', 1),
         )
 
     @property
@@ -35,6 +48,36 @@ class ConstantDensity(Simulation):
                 )
         return self._potential_equation
 
+    @property
+    def derivatives(self) -> dict:
+        """The number of particles decreases with the rate k"""
+        return {'N': lambda variables: -variables['k']}
+
+    def _native(self, n_timesteps: int, **kwargs) -> dict:
+        """The potential is arbitrary Python, so the native integrator
+        uses the potential named by the native_potential keyword, which
+        must be one of NATIVE_POTENTIALS and match potential_equation"""
+        if self.native_potential not in NATIVE_POTENTIALS:
+            raise ValueError(
+                f'native_potential must be one of {list(NATIVE_POTENTIALS)}'
+                f' to use the native integrator, not {self.native_potential}'
+            )
+        c = self.constants
+        return engine.integrate_constant_density(
+            self.variables['N'],
+            c['dt'],
+            n_timesteps,
+            potential=self.native_potential,
+            parameters={
+                key: c[key] for key in NATIVE_POTENTIALS[self.native_potential]
+            },
+            beta=c['beta'],
+            c0=c['c0'],
+            KV=c['KV'],
+            nV=c['nV'],
+            **kwargs
+        )
+
     @property
     def equations(self) -> list:
         def radius(N: int = 0, nV: float = 1.0) -> 'R':
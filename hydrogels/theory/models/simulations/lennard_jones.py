@@ -1,9 +1,31 @@
+import numpy as np
+
 from ..integrator import Simulation, Equation
 import hydrogels.potentials as potentials
 import hydrogels.functions as functions
+import hydrogels.engine as engine
+from ..tabulated import macro_LJ_table
 
 class LennardJones(Simulation):
-    def __init__(self, dt, N, **constants):
+    """
+    If table is a (first radius, last radius, number of points) grid, the
+    potential is interpolated from cached tables of potentials.macro_LJ
+    (see tabulated.macro_LJ_table) instead of being evaluated exactly
+    """
+    def __init__(self, dt, N, compile: bool = True, table: tuple = None, record_every: int = 1, **constants):
+        self.table = None
+        if table is not None:
+            keys = ('sig', 'eps', 'nV', 'rE')
+            if any(np.ndim(constants[key]) for key in keys):
+                raise ValueError(
+                    'Tabulated potentials require scalar sig, eps, nV and rE'
+                )
+            parameters = [float(constants[key]) for key in keys]
+            grid = tuple(table)
+            self.table = (
+                macro_LJ_table(*parameters, 12, grid)
+                - macro_LJ_table(*parameters, 6, grid)
+            )
         super().__init__(
             dt, 
             constants = {
@@ -24,11 +46,20 @@ class LennardJones(Simulation):
                 'k' : None,
                 'KV' : None,
             },
-            equations= self.equations
+            equations= self.equations,
+            compile=compile,
+            record_every=record_every,
         )
 
     @property
     def potential(self) -> Equation:
+        if self.table is not None:
+            table = self.table
+            def tabulated(R: float = 2.0) -> 'V':
+                """Tabulated Macroscopic Lennard-Jones 12-6"""
+                return table(R)
+            return Equation(tabulated, string=tabulated.__doc__)
+
         def func(
             sig: float = 1.,
             eps: float =1., 
@@ -41,6 +72,29 @@ class LennardJones(Simulation):
             return potentials.macro_LJ(sig, eps, nV, 12, rE, R) - potentials.macro_LJ(sig, eps, nV, 6, rE, R)
         return Equation(func, string=func.__doc__)
 
+    @property
+    def derivatives(self) -> dict:
+        """The number of particles decreases with the rate k"""
+        return {'N': lambda variables: -variables['k']}
+
+    def _native(self, n_timesteps: int, **kwargs) -> dict:
+        c = self.constants
+        return engine.integrate_lennard_jones(
+            self.variables['N'],
+            c['dt'],
+            n_timesteps,
+            sig=c['sig'],
+            eps=c['eps'],
+            nV=c['nV'],
+            rE=c['rE'],
+            beta=c['beta'],
+            c0=c['c0'],
+            rate=c['base_rate'],
+            thickness=c['thickness'],
+            table=self.table,
+            **kwargs
+        )
+
     @property
     def equations(self) -> list:
         def radius(N: int = 0, nV: float = 1.0) -> 'R':
@@ -0,0 +1 @@
+from .runner import Sweep, ResultCache, grid_points
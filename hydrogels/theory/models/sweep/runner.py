@@ -0,0 +1,238 @@
+import functools
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+def _jsonable(value):
+    """Converts numpy types so that values can be written as JSON, and
+    numbers to floats so that e.g. 1 and 1.0 give the same key"""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if value is None or isinstance(value, str):
+        return value
+    return repr(value)
+
+def grid_points(grid: Union[Dict[str, Iterable], Iterable[dict]]) -> List[dict]:
+    """Returns the list of parameter sets of a sweep, from either a
+    dictionary of values for each parameter (every combination is used)
+    or an iterable of dictionaries
+
+    >>> grid_points({'a': [1, 2], 'b': [3]})
+    [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+    """
+    if isinstance(grid, dict):
+        keys = list(grid)
+        return [
+            dict(zip(keys, values))
+            for values in itertools.product(*grid.values())
+        ]
+    return [dict(point) for point in grid]
+
+class ResultCache():
+    """
+    Content-addressed cache on disk where the key of a result is the
+    sha256 hash of the JSON of everything that determines it. Every
+    result is stored as [key].csv (the dataframe) and [key].json (the
+    metadata and the payload that was hashed) in a subdirectory named
+    after the first two characters of the key.
+
+    Parameters:
+        directory: root directory of the cache
+    """
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(payload: dict) -> str:
+        text = json.dumps(_jsonable(payload), sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        folder = self.directory / key[:2]
+        return folder / f'{key}.csv', folder / f'{key}.json'
+
+    def __contains__(self, key: str) -> bool:
+        return all(path.exists() for path in self._paths(key))
+
+    def __len__(self) -> int:
+        return len(list(self.directory.glob('*/*.json')))
+
+    def load(self, key: str) -> Tuple[pd.DataFrame, dict]:
+        data, meta = self._paths(key)
+        with open(meta, 'r') as f:
+            meta = json.load(f)
+        return pd.read_csv(data), meta['meta']
+
+    def save(self, key: str, df: pd.DataFrame, meta: dict, payload: dict):
+        data, info = self._paths(key)
+        data.parent.mkdir(exist_ok=True)
+        # write to temporary files first so that a result is either
+        # complete or absent
+        df.to_csv(f'{data}.tmp', index=False)
+        with open(f'{info}.tmp', 'w') as f:
+            json.dump(
+                {'payload': _jsonable(payload), 'meta': _jsonable(meta)},
+                f,
+                indent=2
+            )
+        os.replace(f'{data}.tmp', data)
+        os.replace(f'{info}.tmp', info)
+        return
+
+def _model_name(model: Callable) -> str:
+    if isinstance(model, functools.partial):
+        return (
+            f'{_model_name(model.func)}'
+            f'({_jsonable(list(model.args))}, {_jsonable(model.keywords)})'
+        )
+    return f'{model.__module__}.{model.__qualname__}'
+
+def _run_point(
+    model: Callable,
+    parameters: dict,
+    method: str,
+    steps: int,
+    kwargs: dict,
+) -> Tuple[pd.DataFrame, dict]:
+    simulation = model(**parameters)
+    if method == 'run':
+        simulation.run(steps)
+        df = simulation.history.dataframe
+    elif method == 'run_native':
+        df = simulation.run_native(steps, **kwargs)
+    elif method == 'solve':
+        df = simulation.solve(**kwargs)
+    else:
+        raise ValueError(f"Unknown method '{method}'")
+    return df, simulation.history.meta
+
+class Sweep():
+    """
+    Runs a theory model for every point of a parameter grid across a pool
+    of processes and caches the results on disk, so that running a sweep
+    again, e.g. after adding points, only computes the new points.
+
+    The model is called with the parameters of each point and must return
+    a Simulation, e.g. LennardJones or a functools.partial of it. When
+    workers is not 1 the model is sent to other processes, so it must be
+    defined at the top level of a module (not in a notebook cell or a
+    closure).
+
+    Example:
+
+    ```python
+    model = functools.partial(LennardJones, 0.1, 1000, **settings)
+    sweep = Sweep(model, steps=10000, cache='lj-sweep')
+    df = sweep.run({'eps': [0.5, 1.0, 2.0], 'rate': [0.1, 0.2]})
+    df.groupby(['eps', 'rate'])['N'].last()
+    ```
+
+    Parameters:
+        model: callable that takes the parameters and returns a Simulation
+        steps: number of steps for Simulation.run or Simulation.run_native
+        method: 'run', 'run_native' or 'solve'
+        cache: directory of the ResultCache (no caching if None)
+        workers: number of processes (defaults to the number of cores)
+        name: identifies the model in the cache keys (defaults to the
+            module and name of model)
+        **kwargs: passed to the method e.g. stride or t_end
+    """
+    def __init__(
+        self,
+        model: Callable,
+        steps: int = None,
+        method: str = 'run',
+        cache: Union[str, Path] = None,
+        workers: int = None,
+        name: str = None,
+        **kwargs
+    ):
+        self.model = model
+        self.steps = steps
+        self.method = method
+        self.kwargs = kwargs
+        self.cache = ResultCache(cache) if cache is not None else None
+        self.workers = workers or os.cpu_count()
+        self.name = name or _model_name(model)
+        self.computed = 0
+        self.cached = 0
+
+    def payload(self, parameters: dict) -> dict:
+        """Everything that determines the result of a point"""
+        return {
+            'model': self.name,
+            'method': self.method,
+            'steps': self.steps,
+            'kwargs': self.kwargs,
+            'parameters': parameters,
+        }
+
+    def run(
+        self,
+        grid: Union[Dict[str, Iterable], Iterable[dict]]
+    ) -> pd.DataFrame:
+        """Runs every point of the grid (see grid_points) that is not in
+        the cache and returns the dataframes of all points joined into a
+        long dataframe with a column for each parameter. The metadata of
+        each point is stored in Sweep.meta in the same order as the
+        points"""
+        points = grid_points(grid)
+        keys = [ResultCache.key(self.payload(point)) for point in points]
+        results = {}
+        pending = []
+        for i, key in enumerate(keys):
+            if self.cache is not None and key in self.cache:
+                results[i] = self.cache.load(key)
+            else:
+                pending.append(i)
+        self.cached = len(points) - len(pending)
+        self.computed = len(pending)
+        logger.info(
+            f'Running {len(pending)} of {len(points)} points '
+            f'({self.cached} cached)'
+        )
+
+        def store(i, result):
+            results[i] = result
+            if self.cache is not None:
+                self.cache.save(keys[i], *result, self.payload(points[i]))
+
+        arguments = lambda i: (
+            self.model, points[i], self.method, self.steps, self.kwargs
+        )
+        if self.workers == 1 or len(pending) <= 1:
+            for i in pending:
+                store(i, _run_point(*arguments(i)))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    pool.submit(_run_point, *arguments(i)): i for i in pending
+                }
+                for future in as_completed(futures):
+                    store(futures[future], future.result())
+
+        self.meta = [results[i][1] for i in range(len(points))]
+        frames = []
+        for i, point in enumerate(points):
+            df = results[i][0].copy()
+            for key, value in point.items():
+                df[key] = value
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1 @@
+from .table import TabulatedPotential, macro_LJ_table
@@ -0,0 +1,158 @@
+import functools
+from typing import Callable, Tuple
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+import hydrogels.potentials as potentials
+
+class TabulatedPotential():
+    """
+    Cubic spline interpolation of a potential on a uniform grid of radii,
+    which is evaluated by potentials.CubicTable in C++ and can be passed
+    to the native integrator (hydrogels.engine) as well as called from
+    Python. Outside of the grid the exact function is used.
+
+    The error of the interpolation is estimated when the table is built
+    by comparing it to the exact function half way between every pair of
+    grid points, where the error of a cubic spline is largest. If
+    tolerance is given, the number of points is doubled until the
+    estimated error is below it.
+
+    Example:
+
+    ```python
+    table = TabulatedPotential(
+        lambda r: potentials.harmonic(1.0, r),
+        grid=(0.0, 10.0, 1001)
+    )
+    table(np.linspace(0, 10, 5))
+    ```
+
+    Parameters:
+        function: vectorised function of the radius to tabulate
+        grid: (first radius, last radius, number of points)
+        tolerance: maximum estimated absolute error
+        max_points: largest number of points used to meet tolerance
+    """
+    def __init__(
+        self,
+        function: Callable,
+        grid: Tuple[float, float, int] = (0.5, 10.0, 4097),
+        tolerance: float = None,
+        max_points: int = 2 ** 20,
+    ):
+        self.function = function
+        r0, r1, points = grid
+        if not r1 > r0 or points < 4:
+            raise ValueError(
+                f'grid must have r1 > r0 and at least 4 points, not {grid}'
+            )
+        while True:
+            self._build(r0, r1, int(points))
+            if tolerance is None or self.error <= tolerance:
+                break
+            if 2 * points - 1 > max_points:
+                raise ValueError(
+                    f'Could not tabulate to within {tolerance} using '
+                    f'{max_points} points (error={self.error:.3e})'
+                )
+            points = 2 * points - 1
+
+    def _build(self, r0: float, r1: float, points: int):
+        self.grid = (r0, r1, points)
+        r = np.linspace(r0, r1, points)
+        spline = CubicSpline(r, self.function(r))
+        self.h = r[1] - r[0]
+        self.coefficients = np.ascontiguousarray(spline.c.T)
+        self._set_table()
+
+        # estimate the error half way between the grid points
+        midpoints = r[:-1] + self.h / 2
+        exact = self.function(midpoints)
+        difference = np.abs(self.table(midpoints) - exact)
+        self.error = float(np.nanmax(difference))
+        self.relative_error = float(np.nanmax(
+            difference / np.maximum(np.abs(exact), np.finfo(float).tiny)
+        ))
+
+    def _set_table(self):
+        self.table = potentials.CubicTable(
+            self.r0, self.h, self.coefficients
+        )
+
+    @property
+    def r0(self) -> float:
+        return self.grid[0]
+
+    @property
+    def r1(self) -> float:
+        return self.grid[1]
+
+    def __call__(self, r):
+        # the table is NaN outside of the grid
+        value = self.table(r)
+        if isinstance(value, float):
+            return value if value == value else self.function(r)
+        outside = np.isnan(value)
+        if outside.any():
+            value[outside] = self.function(np.asarray(r, dtype=float)[outside])
+        return value
+
+    def _combine(self, other: 'TabulatedPotential', sign: float):
+        """The spline of a sum is the sum of the splines, so tables on the
+        same grid are combined by adding their coefficients"""
+        if not isinstance(other, TabulatedPotential):
+            return NotImplemented
+        if other.grid != self.grid:
+            raise ValueError(
+                f'Cannot combine tables with grids {self.grid} and '
+                f'{other.grid}'
+            )
+        f, g = self.function, other.function
+        result = TabulatedPotential.__new__(TabulatedPotential)
+        result.function = lambda r: f(r) + sign * g(r)
+        result.grid = self.grid
+        result.h = self.h
+        result.coefficients = self.coefficients + sign * other.coefficients
+        result._set_table()
+        # upper bound from the estimates of both tables
+        result.error = self.error + other.error
+        result.relative_error = np.nan
+        return result
+
+    def __add__(self, other):
+        return self._combine(other, 1.0)
+
+    def __sub__(self, other):
+        return self._combine(other, -1.0)
+
+    def __repr__(self):
+        return (
+            f'TabulatedPotential<r=[{self.r0}, {self.r1}]; '
+            f'{self.grid[2]} points; error={self.error:.2e}>'
+        )
+
+@functools.lru_cache(maxsize=256)
+def macro_LJ_table(
+    sig: float,
+    eps: float,
+    nV: float,
+    rE: float,
+    n: float,
+    grid: Tuple[float, float, int] = (0.5, 10.0, 4097),
+    tolerance: float = None,
+) -> TabulatedPotential:
+    """Returns a TabulatedPotential of potentials.macro_LJ that is cached
+    by its arguments, so that a table is only built once for every set of
+    constants, e.g. when many runs of a sweep share the same constants
+
+    >>> a = macro_LJ_table(1.0, 1.0, 1.0, 0.5, 12, (1.0, 5.0, 101))
+    >>> a is macro_LJ_table(1.0, 1.0, 1.0, 0.5, 12, (1.0, 5.0, 101))
+    True
+    """
+    return TabulatedPotential(
+        lambda r: potentials.macro_LJ(sig, eps, nV, n, rE, r),
+        grid=tuple(grid),
+        tolerance=tolerance,
+    )
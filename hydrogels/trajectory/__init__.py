@@ -1 +1,2 @@
-from .core import ParticleFrame, ParticleTrajectory
\ No newline at end of file
+from .core import ParticleFrame, ParticleTrajectory
+from .counting import count_species, count_observable_particles
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """core.py - auto-generated by softnanotools"""
 from pathlib import Path
+import json
 from typing import Iterable, Union, List, Tuple
 
 import numpy as np
@@ -20,6 +21,7 @@ from readdy._internal.readdybinding.api import ( # type: ignore
 )
 
 from .lammps import write_LAMMPS_dump, write_LAMMPS_configuration
+from .counting import count_species
 
 class ParticleFrame():
     def __init__(self, frame: List[TrajectoryParticle], box: np.ndarray):
@@ -109,19 +111,70 @@ class ParticleFrame():
 
 class ParticleTrajectory():
     """Class for storing positions of particles outputted from
-    a simulation using ReaDDy"""
-    def __init__(self, fname: Union[str, Path]):
-        logger.info(f'Reading ReaDDy trajectory from {fname}')
-        fname = Path(fname)
-        _traj = readdy.Trajectory(str(fname.absolute()))
-        _raw = _traj.read()
+    a simulation using ReaDDy
 
-        self.box = _traj.box_size
-        self.particle_types = _traj.particle_types
-        self._time, self._frames = self.load(_raw, self.box)
+    The trajectory can be read from a single file, a list of segment
+    files that are read as one continuous trajectory, or the progress
+    file written by hydrogels.utils.simulation.SimulationDriver
+    """
+    def __init__(
+        self,
+        fname: Union[str, Path, Iterable[Union[str, Path]]]
+    ):
+        self._frames = []
+        segments = self.segments(fname)
+        for segment, offset, steps in segments:
+            logger.info(f'Reading ReaDDy trajectory from {segment}')
+            try:
+                _traj = readdy.Trajectory(str(Path(segment).absolute()))
+                _raw = _traj.read()
+            except (OSError, RuntimeError, KeyError):
+                if len(segments) == 1:
+                    raise
+                logger.warning(f'Skipping unreadable segment {segment}')
+                continue
+
+            self.box = _traj.box_size
+            self.particle_types = _traj.particle_types
+            _, frames = self.load(_raw, self.box)
+
+            # segments restart from step 0 so they are shifted to follow
+            # on from the previous segment, unless the offset is known
+            if offset is None:
+                offset = self._frames[-1].time if self._frames else 0
+            for frame in frames:
+                if steps is not None and frame.time > steps:
+                    break
+                frame.time += offset
+                # the first frame of a segment repeats the last frame
+                # of the previous segment
+                if self._frames and frame.time <= self._frames[-1].time:
+                    continue
+                self._frames.append(frame)
+
+            del _traj
+            del _raw
+
+        self._time = np.array([f.time for f in self._frames])
 
-        del _traj
-        del _raw
+    @staticmethod
+    def segments(
+        fname: Union[str, Path, Iterable[Union[str, Path]]]
+    ) -> List[Tuple[Path, Union[int, None], Union[int, None]]]:
+        """Returns a list of (file, offset, steps) for each segment that
+        makes up a trajectory, where offset and steps are None if they
+        are unknown"""
+        if isinstance(fname, (str, Path)):
+            fname = Path(fname)
+            if fname.suffix == '.json':
+                with open(fname, 'r') as f:
+                    progress = json.load(f)
+                return [
+                    (fname.parent / i['file'], i['offset'], i['steps'])
+                    for i in progress['segments']
+                ]
+            return [(fname, 0, None)]
+        return [(Path(i), None, None) for i in fname]
 
     @staticmethod
     def load(
@@ -146,14 +199,14 @@ class ParticleTrajectory():
         """Returns a dataframe containing the number of
         each atom type at each timestep
         """
-        result = pd.DataFrame()
-        result['t'] = self.time
-
-        particles = [frame.count_atoms() for frame in self.frames]
-        for particle_type in self.particle_types:
-            result[particle_type] = [i.get(particle_type, 0) for i in particles]
-
-        return result
+        return count_species(
+            [
+                frame.dataframe['type'].map(self.particle_types).to_numpy()
+                for frame in self.frames
+            ],
+            self.particle_types,
+            time=self.time,
+        )
 
     def to_LAMMPS_dump(self, fname: Union[str, Path]):
         """Writes the whole trajectory to LAMMPS dump
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Counts the particles of each species in every frame of a trajectory
+with a single vectorised pass over all of the frames
+
+Functions:
+    count_species: counts the type ids of ragged frames
+    count_observable_particles: counts the particles observable of a
+        ReaDDy trajectory file
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+import readdy
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+def count_species(
+    types: Iterable[np.ndarray],
+    particle_types: Dict[str, int],
+    species: List[str] = None,
+    time: np.ndarray = None,
+) -> pd.DataFrame:
+    """Counts the particles of each species in every frame, where types
+    contains an array of type ids for every frame (e.g. the second element
+    returned by readdy.Trajectory.read_observable_particles).
+
+    The frames are concatenated once and every (frame, type) pair is
+    counted with a single call to np.bincount, rather than comparing each
+    frame with each species.
+
+    Parameters:
+        types: type ids of the particles in each frame
+        particle_types: dictionary of the type id of each species name,
+            e.g. readdy.Trajectory.particle_types
+        species: names of the species to count, in the order of the
+            columns (defaults to every species in particle_types), where
+            species that are not in particle_types are counted as zero
+        time: times of the frames, added as the first column 't'
+    """
+    if species is None:
+        species = list(particle_types)
+    frames = [np.asarray(frame, dtype=np.int64).ravel() for frame in types]
+    lengths = np.array([len(frame) for frame in frames], dtype=np.int64)
+    n_frames = len(frames)
+    ids = np.concatenate(frames) if n_frames else np.zeros(0, dtype=np.int64)
+    n_types = max(
+        int(ids.max()) + 1 if len(ids) else 0,
+        max(particle_types.values(), default=-1) + 1,
+    )
+
+    frame = np.repeat(np.arange(n_frames, dtype=np.int64), lengths)
+    counts = np.bincount(
+        frame * n_types + ids,
+        minlength=n_frames * n_types
+    ).reshape(n_frames, n_types)
+
+    result = {}
+    if time is not None:
+        result['t'] = np.asarray(time)
+    for name in species:
+        code = particle_types.get(name)
+        if code is None:
+            logger.debug(f'{name} is not a particle type and is counted as 0')
+            result[name] = np.zeros(n_frames, dtype=np.int64)
+        else:
+            result[name] = counts[:, code]
+    return pd.DataFrame(result)
+
+def count_observable_particles(
+    fname: Union[str, Path],
+    species: List[str] = None,
+    timestep: float = 1.0,
+) -> pd.DataFrame:
+    """Reads the particles observable of a ReaDDy trajectory file and
+    returns the number of particles of each species at each time, where
+    the steps of the simulation are converted to times using timestep"""
+    trajectory = readdy.Trajectory(str(Path(fname).absolute()))
+    time, types, _, _ = trajectory.read_observable_particles()
+    return count_species(
+        types,
+        trajectory.particle_types,
+        species=species,
+        time=np.asarray(time) * timestep,
+    )
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
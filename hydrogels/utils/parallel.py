@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Runs independent repeats of a simulation (one per seed) in parallel
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable
+import os
+import random
+import time
+
+import numpy as np
+import readdy
+
+from .system import System
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+# environment variables that limit the threads used by numerical libraries
+THREAD_VARIABLES = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+)
+
+def create_simulation(
+    system: readdy.ReactionDiffusionSystem,
+    threads: int = None,
+    output_file: str = None,
+) -> readdy.Simulation:
+    """Creates a simulation of a system that keeps to a thread budget,
+    using the SingleCPU kernel for one thread (or None) and otherwise
+    the CPU kernel with the given number of threads.
+
+    A hydrogels System is created with System.create_simulation, so its
+    potentials and reactions are configured, while a plain ReaDDy system
+    only has its kernel set.
+
+    Parameters:
+        system: ReaDDy or hydrogels System
+        threads: thread budget
+        output_file: file that the simulation writes to
+    """
+    options = {'kernel': 'SingleCPU'}
+    if threads is not None and threads > 1:
+        options = {'kernel': 'CPU', 'threads': threads}
+    if isinstance(system, System):
+        simulation = system.create_simulation(**options)
+    else:
+        simulation = system.simulation(kernel=options['kernel'])
+        if 'threads' in options:
+            simulation.kernel_configuration.n_threads = threads
+    if output_file is not None:
+        simulation.output_file = output_file
+    return simulation
+
+def _initialise_worker(threads: int):
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+
+def _run_seed(function: Callable, seed: int, threads: int):
+    # seed every random number generator used by the protocols, note
+    # that ReaDDy does not expose the seed of its own generator
+    random.seed(seed)
+    np.random.seed(seed)
+    start = time.perf_counter()
+    result = function(seed, threads)
+    return result, time.perf_counter() - start
+
+def run_seeds(
+    function: Callable[[int, int], Any],
+    seeds: Iterable[int],
+    workers: int = None,
+    threads: int = 1,
+    callback: Callable[[int, Any], None] = None,
+    keep: bool = True,
+) -> Dict[int, Any]:
+    """Calls function(seed, threads) for every seed across a pool of
+    worker processes and returns a dictionary of the results in the order
+    of the seeds.
+
+    Every worker seeds the random and numpy.random generators with the
+    seed before calling the function, and limits numerical libraries to
+    threads threads, which is the budget the function should use for
+    ReaDDy (see create_simulation). The function should write its own output
+    (e.g. a CSV for each seed), so that the output of every seed is on
+    disk as soon as it has finished, and it must be defined at the top
+    level of a module so that it can be sent to the workers.
+
+    Example:
+
+    ```python
+    def run_seed(seed: int, threads: int) -> Path:
+        trajectory = run_simulation(f'gel.{seed}', threads=threads)
+        analyse_trajectory(trajectory, output=f'gel.{seed}.csv')
+        return Path(f'gel.{seed}.csv')
+
+    run_seeds(run_seed, range(1, 6), threads=2)
+    ```
+
+    Parameters:
+        function: called with the seed and the number of threads
+        seeds: seeds to run
+        workers: number of processes running at once (defaults to the
+            number of cores divided by threads)
+        threads: thread budget of every worker
+        callback: called in the main process with the seed and the
+            result of each seed when it has finished
+        keep: whether to keep and return the results, set this to False
+            when the callback consumes the results (e.g. a
+            hydrogels.utils.statistics.StreamingAggregator) so that the
+            memory does not grow with the number of seeds, in which case
+            an empty dictionary is returned
+
+    Raises:
+        RuntimeError: if any of the seeds failed, after all of the other
+            seeds have finished
+    """
+    seeds = list(seeds)
+    threads = max(int(threads), 1)
+    if workers is None:
+        workers = max((os.cpu_count() or 1) // threads, 1)
+    workers = max(min(workers, len(seeds)), 1)
+    logger.info(
+        f'Running {len(seeds)} seeds with {workers} workers of '
+        f'{threads} threads'
+    )
+
+    results = {}
+    failures = {}
+    def finish(seed, result, elapsed):
+        if keep:
+            results[seed] = result
+        logger.info(f'Seed {seed} finished in {elapsed:.1f}s')
+        if callback is not None:
+            callback(seed, result)
+
+    if workers == 1:
+        for seed in seeds:
+            try:
+                finish(seed, *_run_seed(function, seed, threads))
+            except Exception as error:
+                logger.warning(f'Seed {seed} failed: {error!r}')
+                failures[seed] = error
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initialise_worker,
+            initargs=(threads,),
+        ) as pool:
+            futures = {
+                pool.submit(_run_seed, function, seed, threads): seed
+                for seed in seeds
+            }
+            for future in as_completed(futures):
+                seed = futures[future]
+                try:
+                    finish(seed, *future.result())
+                except Exception as error:
+                    logger.warning(f'Seed {seed} failed: {error!r}')
+                    failures[seed] = error
+
+    if failures:
+        raise RuntimeError(
+            f'{len(failures)} of {len(seeds)} seeds failed: '
+            f'{sorted(failures)}'
+        ) from next(iter(failures.values()))
+    return {seed: results[seed] for seed in seeds if seed in results}
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""
+Driver for running long ReaDDy simulations in resumable segments
+"""
+from pathlib import Path
+import typing
+import shutil
+import json
+import os
+
+import readdy
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+class SimulationDriver:
+    """
+    Runs a System in chunks of a fixed number of steps. Every chunk is
+    written to its own segment file and makes rotating checkpoints, and
+    the progress is stored in a JSON file so that the run can be resumed
+    from the latest checkpoint after it has been interrupted.
+
+    The progress file can be passed to ParticleTrajectory to read all of
+    the segments as one trajectory.
+
+    Example:
+
+    ```python
+    driver = SimulationDriver(system, 'gel', length=10**7, timestep=0.01)
+    driver.run()
+    trajectory = ParticleTrajectory(driver.progress_file)
+    ```
+
+    Parameters:
+        system: hydrogels.System instance
+        prefix: prefix for segment files, checkpoints and progress file
+        length: total number of steps
+        timestep: integration timestep
+        chunk: number of steps in each segment
+        stride: stride for the default observables
+        checkpoint_stride: number of steps between checkpoints, must
+            divide chunk (defaults to chunk)
+        max_n_saves: number of checkpoints kept in each segment
+        directory: folder to write all output to
+        observe: function that takes a readdy.Simulation and configures
+            its observables, by default the trajectory, particles and
+            topologies are recorded every stride steps
+        **kwargs: passed to System.initialise_simulation
+    """
+    def __init__(
+        self,
+        system: "System",
+        prefix: str = '_out',
+        length: int = 10000,
+        timestep: float = 0.01,
+        chunk: int = 1000,
+        stride: int = 100,
+        checkpoint_stride: int = None,
+        max_n_saves: int = 2,
+        directory: typing.Union[str, Path] = '.',
+        observe: typing.Callable = None,
+        **kwargs
+    ):
+        self.system = system
+        self.prefix = prefix
+        self.length = length
+        self.timestep = timestep
+        self.chunk = chunk
+        self.stride = stride
+        self.checkpoint_stride = checkpoint_stride or chunk
+        self.max_n_saves = max_n_saves
+        self.directory = Path(directory)
+        self.observe = observe or self.default_observables
+        self.settings = kwargs
+
+        if self.chunk % self.checkpoint_stride != 0:
+            raise ValueError(
+                f'The checkpoint stride ({self.checkpoint_stride}) must '
+                f'divide the chunk size ({self.chunk})'
+            )
+        if self.chunk % self.stride != 0:
+            logger.warning(
+                f'The stride ({self.stride}) does not divide the chunk size '
+                f'({self.chunk}) so frames will not be evenly spaced'
+            )
+
+    def default_observables(self, simulation: readdy.Simulation):
+        simulation.record_trajectory(self.stride)
+        simulation.observe.particles(self.stride)
+        simulation.observe.topologies(self.stride)
+
+    @property
+    def progress_file(self) -> Path:
+        return self.directory / f'{self.prefix}.progress.json'
+
+    def segment_file(self, index: int) -> Path:
+        return self.directory / f'{self.prefix}.{index:04d}.h5'
+
+    def checkpoint_directory(self, index: int) -> Path:
+        return self.directory / f'{self.prefix}.{index:04d}.checkpoints'
+
+    @property
+    def progress(self) -> dict:
+        """Progress of the run as stored on disk"""
+        if self.progress_file.exists():
+            with open(self.progress_file, 'r') as f:
+                return json.load(f)
+        return {
+            'length': self.length,
+            'timestep': self.timestep,
+            'completed': 0,
+            'segments': [],
+            'current': None,
+        }
+
+    def _save(self, progress: dict):
+        """Atomically writes the progress file"""
+        temporary = self.progress_file.with_suffix('.tmp')
+        with open(temporary, 'w') as f:
+            json.dump(progress, f, indent=2)
+        os.replace(temporary, self.progress_file)
+
+    @staticmethod
+    def _latest_checkpoint(directory: Path) -> typing.Tuple[str, int]:
+        """Returns the latest checkpoint file in a directory and its step
+        or (None, 0) if there are none"""
+        if not directory.exists():
+            return None, 0
+        try:
+            fname = readdy.Simulation.get_latest_checkpoint_file(
+                str(directory)
+            )
+        except ValueError:
+            return None, 0
+        step = int(readdy.Simulation.list_checkpoints(fname)[-1]['step'])
+        return fname, step
+
+    def _recover(self, progress: dict) -> dict:
+        """Finalises a segment that was interrupted, keeping the steps up
+        to its latest checkpoint"""
+        current = progress['current']
+        directory = self.directory / current['checkpoints']
+        _, step = self._latest_checkpoint(directory)
+        if step > 0:
+            logger.info(
+                f'Recovering {step} steps from interrupted segment '
+                f'{current["file"]}'
+            )
+            current['steps'] = step
+            progress['segments'].append(current)
+            progress['completed'] = current['offset'] + step
+        else:
+            logger.info(f'Discarding interrupted segment {current["file"]}')
+            segment = self.directory / current['file']
+            if segment.exists():
+                segment.unlink()
+            shutil.rmtree(directory, ignore_errors=True)
+        progress['current'] = None
+        self._save(progress)
+        return progress
+
+    def _tidy(self, progress: dict):
+        """Removes checkpoints of all but the latest completed segment"""
+        for segment in progress['segments'][:-1]:
+            shutil.rmtree(
+                self.directory / segment['checkpoints'],
+                ignore_errors=True
+            )
+
+    def run(self) -> dict:
+        """Runs (or resumes) the simulation until all of the steps have
+        been completed and returns the progress dictionary"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        progress = self.progress
+        if progress['current'] is not None:
+            progress = self._recover(progress)
+
+        while progress['completed'] < self.length:
+            index = len(progress['segments'])
+            steps = min(self.chunk, self.length - progress['completed'])
+            fout = self.segment_file(index)
+            checkpoints = self.checkpoint_directory(index)
+            shutil.rmtree(checkpoints, ignore_errors=True)
+
+            # load from the end of the last segment
+            checkpoint = None
+            if progress['segments']:
+                previous = progress['segments'][-1]
+                checkpoint, _ = self._latest_checkpoint(
+                    self.directory / previous['checkpoints']
+                )
+                if checkpoint is None:
+                    raise FileNotFoundError(
+                        f'Cannot resume since no checkpoints can be found '
+                        f'for segment {previous["file"]}'
+                    )
+
+            simulation = self.system.initialise_simulation(
+                fout=str(fout),
+                checkpoint=checkpoint,
+                timestep=self.timestep,
+                **self.settings
+            )
+            self.observe(simulation)
+            simulation.make_checkpoints(
+                self.checkpoint_stride,
+                output_directory=str(checkpoints),
+                max_n_saves=self.max_n_saves
+            )
+
+            progress['current'] = {
+                'file': fout.name,
+                'checkpoints': checkpoints.name,
+                'offset': progress['completed'],
+                'steps': steps,
+            }
+            self._save(progress)
+
+            logger.info(
+                f'Running segment {index} (steps {progress["completed"]}'
+                f' to {progress["completed"] + steps} of {self.length})'
+            )
+            simulation.run(steps, self.timestep)
+            del simulation
+
+            progress['segments'].append(progress['current'])
+            progress['completed'] += steps
+            progress['current'] = None
+            self._save(progress)
+            self._tidy(progress)
+
+        logger.info(f'Completed {progress["completed"]} steps')
+        return progress
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+"""Streaming statistics for combining the results of many independent
+simulations (e.g. one per seed) without holding all of them in memory
+
+Classes:
+    RunningStatistics: Welford mean and variance of arrays
+    QuantileSketch: fixed-size reservoir of samples for quantiles
+    StreamingAggregator: mean, std and quantiles of the columns of many
+        dataframes, interpolated to a common grid
+"""
+from os import PathLike
+from typing import Any, Iterable, List, Mapping, Tuple, Union
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from softnanotools.logger import Logger
+logger = Logger(__name__)
+
+class RunningStatistics:
+    """Updates the mean and variance of every element of an array of a
+    fixed shape one sample at a time using Welford's algorithm.
+
+    NaN values are skipped, so every element keeps its own count.
+
+    Parameters:
+        shape: shape of the samples
+    """
+    def __init__(self, shape: Union[int, Tuple[int, ...]]):
+        self.count = np.zeros(shape, dtype=np.int64)
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        self.count += valid
+        delta = np.where(valid, values - self._mean, 0.0)
+        self._mean += delta / np.maximum(self.count, 1)
+        self._m2 += np.where(valid, delta * (values - self._mean), 0.0)
+        return
+
+    def extend(self, n: int):
+        """Appends n elements without any samples along the first axis"""
+        pad = ((0, n),) + ((0, 0),) * (self.count.ndim - 1)
+        self.count = np.pad(self.count, pad)
+        self._mean = np.pad(self._mean, pad)
+        self._m2 = np.pad(self._m2, pad)
+        return
+
+    @property
+    def mean(self) -> np.ndarray:
+        return np.where(self.count > 0, self._mean, np.nan)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Sample variance (ddof=1) as calculated by pandas"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(
+                self.count > 1,
+                self._m2 / (self.count - 1),
+                np.nan
+            )
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+class QuantileSketch:
+    """Estimates quantiles of every element of an array of a fixed shape
+    from a uniform random sample (reservoir) of at most size samples of
+    each element, so that the memory does not grow with the number of
+    samples. The quantiles are exact until more than size samples have
+    been added.
+
+    Parameters:
+        shape: shape of the samples
+        size: number of samples kept for every element
+        seed: seed of the generator that picks the samples to keep
+    """
+    def __init__(
+        self,
+        shape: Union[int, Tuple[int, ...]],
+        size: int = 256,
+        seed: int = None,
+    ):
+        self.size = size
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.reservoir = np.full((size,) + self.count.shape, np.nan)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        self.count += valid
+        # the nth sample replaces a random slot with probability size / n
+        slot = np.where(
+            self.count <= self.size,
+            self.count - 1,
+            self._rng.integers(0, np.maximum(self.count, 1)),
+        )
+        keep = valid & (slot < self.size)
+        index = np.nonzero(keep)
+        self.reservoir[(slot[keep],) + index] = values[keep]
+        return
+
+    def extend(self, n: int):
+        """Appends n elements without any samples along the first axis"""
+        pad = ((0, n),) + ((0, 0),) * (self.count.ndim - 1)
+        self.count = np.pad(self.count, pad)
+        self.reservoir = np.pad(
+            self.reservoir, ((0, 0),) + pad, constant_values=np.nan
+        )
+        return
+
+    def quantile(self, q: Union[float, Iterable[float]]) -> np.ndarray:
+        if not self.count.any():
+            return np.full(np.shape(q) + self.count.shape, np.nan)
+        # elements without any samples give NaN and an unwanted warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanquantile(self.reservoir, q, axis=0)
+
+class StreamingAggregator:
+    """Combines dataframes with the same columns, e.g. the results of
+    every seed of a simulation, into the mean and standard deviation (and
+    optionally quantiles) of each column at each point of a grid.
+
+    Each dataframe is folded into running statistics as soon as it is
+    added and is not kept, so the memory used does not depend on the
+    number of dataframes. Dataframes are linearly interpolated to the grid
+    using their time column, where points outside of the range of a
+    dataframe are ignored (so the count of these points is lower). If time
+    is None, dataframes are aligned on their index instead, which grows
+    to the union of the indices of every dataframe in the order that the
+    rows first appear, and rows missing from a dataframe are ignored in
+    the same way.
+
+    The aggregator can be used as the callback of
+    hydrogels.utils.parallel.run_seeds with keep=False, so that neither
+    holds on to the results of the seeds, or be given its results:
+
+    ```python
+    aggregator = StreamingAggregator(columns=['A', 'B'])
+    run_seeds(run_seed, range(1, 1001), callback=aggregator, keep=False)
+    aggregator.dataframe.to_csv('results.csv')
+    ```
+
+    Parameters:
+        columns: columns to aggregate (defaults to every numeric column
+            of the first dataframe other than time)
+        time: name of the column that is interpolated to the grid
+        grid: values of time to interpolate to (defaults to the times of
+            the first dataframe)
+        quantiles: quantiles to estimate, e.g. [0.05, 0.5, 0.95]
+        size: number of samples kept for every point for the quantiles
+        seed: seed used to choose the samples kept for the quantiles
+    """
+    def __init__(
+        self,
+        columns: List[str] = None,
+        time: str = 't',
+        grid: Iterable[float] = None,
+        quantiles: Iterable[float] = None,
+        size: int = 256,
+        seed: int = None,
+    ):
+        self.columns = list(columns) if columns is not None else None
+        self.time = time
+        self.grid = np.asarray(grid, dtype=float) if grid is not None else None
+        self.quantiles = list(quantiles) if quantiles is not None else []
+        self.size = size
+        self.seed = seed
+        self.count = 0
+        self._index = None
+        self._statistics = None
+        self._sketch = None
+
+    def _initialise(self, data: pd.DataFrame):
+        if self.columns is None:
+            self.columns = [
+                column for column in data.select_dtypes('number').columns
+                if column != self.time
+            ]
+        if self.time is None:
+            self._index = data.index
+        elif self.grid is None:
+            self.grid = data[self.time].to_numpy(dtype=float)
+        shape = (self.points, len(self.columns))
+        self._statistics = RunningStatistics(shape)
+        if self.quantiles:
+            self._sketch = QuantileSketch(shape, self.size, self.seed)
+        return
+
+    @property
+    def points(self) -> int:
+        """Number of points that every column is aggregated at"""
+        if self.time is None:
+            return 0 if self._index is None else len(self._index)
+        return 0 if self.grid is None else len(self.grid)
+
+    def _values(self, data: pd.DataFrame) -> np.ndarray:
+        if self.time is None:
+            new = data.index[~data.index.isin(self._index)]
+            if len(new):
+                self._index = self._index.append(new)
+                self._statistics.extend(len(new))
+                if self._sketch is not None:
+                    self._sketch.extend(len(new))
+            return data.reindex(self._index)[self.columns].to_numpy(
+                dtype=float
+            )
+        data = data.sort_values(self.time)
+        times = data[self.time].to_numpy(dtype=float)
+        values = data[self.columns].to_numpy(dtype=float)
+        if np.array_equal(times, self.grid):
+            return values
+        return np.column_stack([
+            np.interp(
+                self.grid, times, values[:, i], left=np.nan, right=np.nan
+            ) for i in range(len(self.columns))
+        ])
+
+    def add(self, data: Union[pd.DataFrame, Mapping, str, PathLike]):
+        """Adds a dataframe, a dictionary of columns or a CSV file"""
+        if isinstance(data, (str, PathLike)):
+            data = pd.read_csv(data)
+        elif not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame(data)
+        if self._statistics is None:
+            self._initialise(data)
+        values = self._values(data)
+        self._statistics.update(values)
+        if self._sketch is not None:
+            self._sketch.update(values)
+        self.count += 1
+        return
+
+    def update(self, results: Union[Iterable, Mapping[Any, Any]]):
+        """Adds every result of an iterable, or every value of a
+        dictionary such as the one returned by run_seeds"""
+        if isinstance(results, Mapping):
+            results = results.values()
+        for result in results:
+            self.add(result)
+        return
+
+    def __call__(self, seed: Any, result: Any):
+        """Callback of hydrogels.utils.parallel.run_seeds"""
+        self.add(result)
+
+    @property
+    def mean(self) -> pd.DataFrame:
+        return self._frame(self._statistics.mean)
+
+    @property
+    def std(self) -> pd.DataFrame:
+        return self._frame(self._statistics.std)
+
+    def quantile(self, q: float) -> pd.DataFrame:
+        if self._sketch is None:
+            raise ValueError('No quantiles were requested')
+        return self._frame(self._sketch.quantile(q))
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, columns=self.columns, index=self._index)
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        """Returns the grid (if there is a time column) followed by the
+        mean, std and quantiles of each column e.g. t, A_mean, A_std,
+        A_q50"""
+        if self._statistics is None:
+            return pd.DataFrame()
+        result = {}
+        if self.time is not None:
+            result[self.time] = self.grid
+        mean = self._statistics.mean
+        std = self._statistics.std
+        quantiles = {
+            q: self._sketch.quantile(q) for q in self.quantiles
+        }
+        for i, column in enumerate(self.columns):
+            result[f'{column}_mean'] = mean[:, i]
+            result[f'{column}_std'] = std[:, i]
+            for q, values in quantiles.items():
+                result[f'{column}_q{100 * q:g}'] = values[:, i]
+        return pd.DataFrame(result, index=self._index)
+
+    def __repr__(self):
+        return (
+            f'StreamingAggregator<{self.count} results; '
+            f'{self.points} points>'
+        )
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
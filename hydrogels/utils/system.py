@@ -6,6 +6,7 @@ from pathlib import Path
 import typing
 import os
 import json
+import time
 
 import numpy as np
 import pandas as pd
@@ -13,7 +14,9 @@ import readdy
 
 from readdy.api.reaction_diffusion_system import ReactionDiffusionSystem
 
-from .topology import Topology
+from .topology import Topology, add_topologies
+from ..reactions.spatial import SpatialReactionRegistry
+from ..reactions.structural import StructuralReaction
 
 from softnanotools.logger import Logger
 logger = Logger(__name__)
@@ -41,11 +44,77 @@ class Potential:
                 cutoff=self.settings['cutoff'],
             )
 
+class PotentialMatrix:
+    """Symmetric matrix of potentials keyed by kind and unordered species
+    pair, so that (a, b) and (b, a) can only ever be registered once.
+
+    When a pair is added more than once:
+        - identical settings are merged into a single entry
+        - entries given explicitly take precedence over entries that
+          were expanded from 'all'
+        - otherwise the latest entry overrides the earlier one
+    """
+    def __init__(self):
+        self._entries = {}
+
+    @staticmethod
+    def pair(atom_1: str, atom_2: str) -> tuple:
+        """Returns the unordered (sorted) species pair"""
+        return tuple(sorted((atom_1, atom_2)))
+
+    def add(self, potential: Potential, explicit: bool = True):
+        key = (potential.kind, self.pair(*potential.atoms))
+        existing = self._entries.get(key)
+        if existing is not None:
+            old_explicit, old = existing
+            if old.settings == potential.settings:
+                self._entries[key] = (old_explicit or explicit, old)
+                return
+            if old_explicit and not explicit:
+                logger.debug(f'Keeping {old} instead of {potential}')
+                return
+            logger.debug(f'Overriding {old} with {potential}')
+        self._entries[key] = (explicit, potential)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, pair):
+        return any(key[1] == self.pair(*pair) for key in self._entries)
+
+    @property
+    def keys(self) -> typing.List[tuple]:
+        return list(self._entries.keys())
+
+    @property
+    def potentials(self) -> typing.List[Potential]:
+        return [potential for _, potential in self._entries.values()]
+
+    @property
+    def pairs(self) -> typing.List[tuple]:
+        """Unordered species pairs that have a potential"""
+        return sorted(set(key[1] for key in self._entries))
+
+    @property
+    def cutoff(self) -> float:
+        """Maximum cutoff of all potentials, which sets the size of the
+        neighbour cells in ReaDDy"""
+        return max(
+            [p.settings.get('cutoff', 0.0) for p in self.potentials],
+            default=0.0
+        )
+
 class PotentialManager:
-    """Class that ensures all of the correct potentials are used"""
+    """Class that ensures all of the correct potentials are used
+
+    Potentials are stored as they are added and expanded into a
+    PotentialMatrix at configure time, when all species are known.
+    """
     def __init__(self, system: "System"):
         self.system = system
-        self._potentials = []
+        self._requests = []
+        self._matrix = None
+        self._registered = {}
 
     @property
     def species(self):
@@ -55,49 +124,89 @@ class PotentialManager:
         for item in _deep_names:
             for name in item:
                 _names.append(name)
-        return _species + _names
+        return list(dict.fromkeys(_species + _names))
+
+    @property
+    def matrix(self) -> PotentialMatrix:
+        if self._matrix is None:
+            self._matrix = self._build()
+        return self._matrix
 
     @property
     def potentials(self):
-        return self._potentials
+        return self.matrix.potentials
+
+    @property
+    def pairs(self) -> typing.List[tuple]:
+        return self.matrix.pairs
+
+    @property
+    def cutoff(self) -> float:
+        return self.matrix.cutoff
 
     def add(self, kind, atom_1, atom_2, **kwargs):
-        """Adds a potential to be registered"""
-
-        species = self.species.copy()
-        logger.debug(species)
-
-        if isinstance(atom_1, str):
-            if atom_1 == 'all':
-                atom_1 = species
-            else:
-                # this is commented out because sometimes potentials
-                # are registered before species - same as below
-                #assert atom_1 in species
-                atom_1 = [atom_1]
-
-        for i, a in enumerate(atom_1):
-            assert isinstance(a, str), f'{a} should be a string but is not!'
-            if isinstance(atom_2, str):
-                if atom_2 == 'all':
-                    atom_2 = species
-                else:
-                    #assert atom_2 in species
-                    atom_2 = [atom_2]
-
-            for j, b in enumerate(atom_2):
-                if j > i: continue
-                assert isinstance(b, str), f'{b} should be a string but is not!'
-                logger.debug(f'Adding potential with\n\tkind: {kind}\n\ta<->b: {a}<->{b}\n\tkwargs: {json.dumps(kwargs, indent=2)}')
-                potential = Potential(kind, a, b, **kwargs.copy())
-                logger.debug(f'Potential added: {potential}')
-                self._potentials.append(potential)
+        """Adds a potential to be registered, atom_1 and atom_2 can be
+        a species name, a list of names or 'all'"""
+        logger.debug(
+            f'Adding potential with\n\tkind: {kind}\n\ta<->b: {atom_1}<->'
+            f'{atom_2}\n\tkwargs: {json.dumps(kwargs, indent=2)}'
+        )
+        self._requests.append((kind, atom_1, atom_2, kwargs.copy()))
+        self._matrix = None
+
+    def _build(self) -> PotentialMatrix:
+        matrix = PotentialMatrix()
+        species = None
+
+        def expand(atoms):
+            nonlocal species
+            if isinstance(atoms, str):
+                if atoms != 'all':
+                    # species are not checked since sometimes potentials
+                    # are registered before species
+                    return [atoms], True
+                if species is None:
+                    species = self.species
+                    logger.debug(species)
+                return species, False
+            return list(atoms), True
+
+        for kind, atom_1, atom_2, kwargs in self._requests:
+            atoms_1, explicit_1 = expand(atom_1)
+            atoms_2, explicit_2 = expand(atom_2)
+            for a in atoms_1:
+                assert isinstance(a, str), f'{a} should be a string but is not!'
+                for b in atoms_2:
+                    assert isinstance(b, str), f'{b} should be a string but is not!'
+                    matrix.add(
+                        Potential(kind, a, b, **kwargs.copy()),
+                        explicit=explicit_1 and explicit_2
+                    )
+        return matrix
 
     def configure(self):
         logger.debug('Configuring potentials...')
-        for potential in self._potentials:
+        self._matrix = self._build()
+        registered_before = len(self._registered)
+        for key, potential in zip(self._matrix.keys, self._matrix.potentials):
+            registered = self._registered.get(key)
+            if registered is not None:
+                if registered.settings != potential.settings:
+                    logger.warning(
+                        f'{registered} has already been registered and '
+                        f'cannot be replaced by {potential}'
+                    )
+                continue
             logger.debug(f'Configuring:\n\t{potential}')
             potential.register(self.system)
+            self._registered[key] = potential
+        if len(self._registered) > registered_before:
+            logger.info(
+                f'Registered {len(self._registered)} potentials for pairs '
+                f'{self._matrix.pairs} with maximum cutoff '
+                f'{self._matrix.cutoff}'
+            )
+        return self._matrix
 
 class System(ReactionDiffusionSystem):
     """
@@ -107,6 +216,7 @@ class System(ReactionDiffusionSystem):
         super().__init__(box, unit_system=unit_system, **kwargs)
         self._topologies = []
         self.manager = PotentialManager(self)
+        self.reaction_registry = SpatialReactionRegistry(self)
         self._species = {}
 
     @property
@@ -192,31 +302,132 @@ class System(ReactionDiffusionSystem):
         # may cause unnecessary memory usage
         self._topologies.append(topology)
 
-    def initialise_simulation(
-        self,
-        fout: str = '_out.h5',
-        checkpoint: Path = None,
-        checkpoint_directory: Path = None,
-    ):
-        # configure potential manager
+    def simulation(self, *args, **kwargs) -> readdy.Simulation:
+        """Registers the potentials and spatial reactions that have not
+        been registered yet and then creates a ReaDDy simulation, so that
+        every way of creating a simulation (including the inherited
+        ReactionDiffusionSystem.simulation) includes them"""
         self.manager.configure()
+        self.reaction_registry.configure()
+        return super().simulation(*args, **kwargs)
 
-        # initialise simulation object
-        simulation = self.simulation()
+    def create_simulation(
+        self,
+        kernel: str = 'SingleCPU',
+        threads: int = None,
+        cell_radius: int = None,
+        skin: float = None,
+    ) -> readdy.Simulation:
+        """Creates an empty simulation using the given kernel options
+
+        Parameters:
+            kernel: either 'SingleCPU' or 'CPU'
+            threads: number of threads used by the CPU kernel
+            cell_radius: radius of the CPU kernel's cell linked list
+            skin: skin of the neighbour list
+        """
+        if kernel not in ('SingleCPU', 'CPU'):
+            raise ValueError(
+                f'Kernel must be either SingleCPU or CPU but is {kernel}'
+            )
+        kwargs = {'kernel': kernel}
+        if skin is not None:
+            kwargs['skin'] = skin
+        simulation = self.simulation(**kwargs)
+        self._configure_kernel(simulation, threads, cell_radius)
+        return simulation
 
-        # allocate output file
-        simulation.output_file = fout
-        if os.path.exists(simulation.output_file):
-            os.remove(simulation.output_file)
+    @staticmethod
+    def _configure_kernel(
+        simulation: readdy.Simulation,
+        threads: int = None,
+        cell_radius: int = None,
+    ):
+        """Sets the kernel options of a simulation, which ReaDDy applies
+        at the start of every run"""
+        if threads is not None:
+            simulation.kernel_configuration.n_threads = threads
+        if cell_radius is not None:
+            simulation.kernel_configuration.cell_linked_list_radius = \
+                cell_radius
+        return
 
-        if checkpoint and checkpoint_directory:
-            logger.error(
-                'You have provided both a checkpoint file and checkpoint'
-                ' directory, please pick only one!'
-            )
+    @staticmethod
+    def autotune_candidates(max_threads: int = None) -> typing.List[dict]:
+        """Returns a list of kernel options to try when autotuning, the
+        SingleCPU kernel and the CPU kernel with powers of two threads
+        up to max_threads (defaults to the number of cores)"""
+        if max_threads is None:
+            max_threads = os.cpu_count() or 1
+        threads = {2 ** i for i in range(int(np.log2(max_threads)) + 1)}
+        threads.add(max_threads)
+        candidates = [{'kernel': 'SingleCPU'}]
+        for n in sorted(threads):
+            for radius in (1, 2):
+                candidates.append({
+                    'kernel': 'CPU',
+                    'threads': n,
+                    'cell_radius': radius
+                })
+        return candidates
+
+    def autotune(
+        self,
+        timestep: float,
+        steps: int = 100,
+        candidates: typing.List[dict] = None,
+        checkpoint: Path = None,
+        checkpoint_directory: Path = None,
+    ) -> dict:
+        """Runs a short trial integration of the system for every set of
+        kernel options and returns the fastest set
+
+        Every trial runs on a new simulation that is populated from the
+        system (or checkpoint), so that all candidates start from the
+        same state. Structural reactions are not instrumented or recorded
+        during the trials (see StructuralReaction.quiet).
+
+        Parameters:
+            timestep: timestep of the run, which is used in the trials
+            steps: number of steps in each trial
+            candidates: list of keyword arguments for create_simulation,
+                by default uses System.autotune_candidates()
+
+        Returns:
+            The keyword arguments for create_simulation that were fastest
+        """
+        if candidates is None:
+            candidates = self.autotune_candidates()
+
+        timings = []
+        with StructuralReaction.quiet():
+            for settings in candidates:
+                simulation = self.create_simulation(**settings)
+                simulation.show_progress = False
+                self._populate(simulation, checkpoint, checkpoint_directory)
+                start = time.perf_counter()
+                simulation.run(steps, timestep, show_summary=False)
+                elapsed = time.perf_counter() - start
+                logger.debug(f'Autotune {settings}: {elapsed:.3f}s')
+                timings.append((elapsed, settings))
+                del simulation
+
+        elapsed, best = min(timings, key=lambda x: x[0])
+        logger.info(
+            f'Autotune selected {best} ({steps / elapsed:.1f} steps/s)'
+        )
+        self.autotune_timings = timings
+        return best
 
+    def _populate(
+        self,
+        simulation: readdy.Simulation,
+        checkpoint: Path = None,
+        checkpoint_directory: Path = None,
+    ) -> dict:
+        """Adds particles and topologies to a simulation either from the
+        system or from a checkpoint"""
         if checkpoint:
-
             checkpoint = str(Path(checkpoint).absolute())
             logger.info(f'Loading checkpoint from {checkpoint}')
             # implement loading particles from checkpoint
@@ -238,8 +449,77 @@ class System(ReactionDiffusionSystem):
                 if len(positions) != 0:
                     simulation.add_particles(species, positions)
 
-            # add topologies to simulation using their method
-            for top in self.topology_list:
-                top.add_to_sim(simulation)
+            # add all topologies to simulation in one batch
+            return add_topologies(simulation, self.topology_list)
+
+    def initialise_simulation(
+        self,
+        fout: str = '_out.h5',
+        checkpoint: Path = None,
+        checkpoint_directory: Path = None,
+        kernel: str = 'SingleCPU',
+        threads: int = None,
+        cell_radius: int = None,
+        skin: float = None,
+        autotune: typing.Union[bool, dict] = False,
+        timestep: float = None,
+    ):
+        """Configures the potentials and creates a simulation containing
+        the particles and topologies of the system
+
+        Parameters:
+            fout: output file
+            checkpoint: checkpoint file to load particles from
+            checkpoint_directory: directory to load latest checkpoint from
+            kernel: either 'SingleCPU' or 'CPU'
+            threads: number of threads used by the CPU kernel
+            cell_radius: radius of the CPU kernel's cell linked list
+            skin: skin of the neighbour list
+            autotune: if True (or a dictionary of arguments for
+                System.autotune) the kernel options are chosen by running
+                short trial integrations and the options above are ignored
+            timestep: timestep of the run, required by autotune
+        """
+        if checkpoint and checkpoint_directory:
+            logger.error(
+                'You have provided both a checkpoint file and checkpoint'
+                ' directory, please pick only one!'
+            )
+
+        if autotune:
+            options = dict(autotune) if isinstance(autotune, dict) else {}
+            options.setdefault('timestep', timestep)
+            if options['timestep'] is None:
+                raise ValueError(
+                    'Autotuning needs the timestep of the run'
+                )
+            settings = self.autotune(
+                checkpoint=checkpoint,
+                checkpoint_directory=checkpoint_directory,
+                **options
+            )
+        else:
+            settings = {
+                'kernel': kernel,
+                'threads': threads,
+                'cell_radius': cell_radius,
+                'skin': skin,
+            }
+
+        # initialise simulation object
+        simulation = self.create_simulation(**settings)
+
+        # allocate output file
+        simulation.output_file = fout
+        if os.path.exists(simulation.output_file):
+            os.remove(simulation.output_file)
+
+        stats = self._populate(simulation, checkpoint, checkpoint_directory)
+        if stats:
+            logger.info(
+                f'Inserted {stats["topologies"]} topologies '
+                f'({stats["particles"]} particles, {stats["edges"]} edges) '
+                f'in {stats["total_time"]:.3f}s'
+            )
 
         return simulation
@@ -2,11 +2,13 @@
 """
 Objects for handling commonly used high-level readdy topologies
 """
+import time
 import typing
 
 import numpy as np
 import pandas as pd
-import networkx as nx
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
 import readdy
 
@@ -39,6 +41,14 @@ class Topology():
     """
     Wrapper for a readdy topology
 
+    The sequence is stored as an array of integer type codes indexing into
+    Topology.type_names, and the edges as an (E, 2) int32 array, so that
+    large gels do not carry a Python object per bead or per bond.
+    Connectivity is computed with scipy's sparse graph routines and cached
+    until the positions or edges are changed. Subclasses should declare
+    __slots__ for their own attributes, otherwise their instances carry
+    a __dict__ as well.
+
     Parameters:
         sequence:
             String or list containing sequence of particles
@@ -51,16 +61,27 @@ class Topology():
         bonds:
             List of TopologyBond instances containing bonding information
     """
+    __slots__ = (
+        'top_type',
+        '_codes',
+        '_type_names',
+        '_names',
+        '_positions',
+        '_edges',
+        '_bonds',
+        '_labels',
+        '_n_components',
+        '_degree',
+    )
+
     def __init__(self, top_type : str, **kwargs):
         self.top_type = top_type
-        _sequence = kwargs.get('sequence', [])
-        if isinstance(_sequence, str):
-            _sequence = list(_sequence)
-        self._sequence = _sequence
-        self._names = list(set(self._sequence + kwargs.get('names', [])))
+        self._set_sequence(kwargs.get('sequence', []))
+        self._names = list(set(self._type_names + kwargs.get('names', [])))
         self._positions = kwargs.get('positions', np.array([]))
-        self._edges = kwargs.get('edges', [])
+        self._edges = self._as_edges(kwargs.get('edges', []))
         self._bonds = kwargs.get('bonds', [])
+        self._invalidate()
 
     @property
     def _string(self):
@@ -71,7 +92,7 @@ class Topology():
 
     @property
     def N(self):
-        return len(self._positions)
+        return len(self.positions)
 
     @property
     def positions(self) -> np.ndarray:
@@ -80,22 +101,56 @@ class Topology():
     @positions.setter
     def positions(self, value):
         self._positions = value
+        self._invalidate()
 
     @property
-    def sequence(self) -> typing.List[str]:
-        return self._sequence
+    def sequence(self) -> typing.Tuple[str, ...]:
+        """Particle type of every bead, which is built from the type codes
+        on every access and is therefore a tuple, so assign a new sequence
+        to change it"""
+        return tuple(np.array(self._type_names, dtype=object)[self._codes])
 
     @sequence.setter
     def sequence(self, value):
-        self._sequence = value
+        self._set_sequence(value)
 
     @property
-    def edges(self) -> typing.List[tuple]:
+    def type_codes(self) -> np.ndarray:
+        """Sequence as integer indices into Topology.type_names"""
+        return self._codes
+
+    @property
+    def type_names(self) -> typing.List[str]:
+        """Particle types that appear in the sequence"""
+        return self._type_names
+
+    def _set_sequence(self, value):
+        if isinstance(value, str):
+            value = list(value)
+        value = np.asarray(value, dtype=str)
+        if len(value) == 0:
+            self._type_names = []
+            self._codes = np.zeros(0, dtype=np.int32)
+            return
+        names, codes = np.unique(value, return_inverse=True)
+        self._type_names = names.tolist()
+        self._codes = codes.astype(np.int32).reshape(-1)
+
+    @property
+    def edges(self) -> np.ndarray:
         return self._edges
 
     @edges.setter
     def edges(self, value):
-        self._edges = value
+        self._edges = self._as_edges(value)
+        self._invalidate()
+
+    @staticmethod
+    def _as_edges(value) -> np.ndarray:
+        """Converts any iterable of pairs to an (E, 2) int32 array"""
+        if value is None:
+            value = []
+        return np.asarray(value, dtype=np.int32).reshape(-1, 2)
 
     @property
     def names(self) -> typing.List[str]:
@@ -140,25 +195,75 @@ class Topology():
 
         self._bonds.append(bond)
 
+    def _invalidate(self):
+        """Clears the cached connectivity"""
+        self._labels = None
+        self._n_components = None
+        self._degree = None
+
     @property
-    def graph(self) -> nx.Graph:
-        """Uses NetworkX to get graph of the particles and bonds"""
-        g = nx.Graph()
-        for edge in self._edges:
-            # add edges (nodes are added automatically)
-            g.add_edge(edge[0], edge[1])
+    def n_vertices(self) -> int:
+        """Number of vertices in the graph, which includes every position
+        and every vertex referenced by an edge"""
+        edges = self.edges
+        if len(edges) == 0:
+            return self.N
+        return max(self.N, int(edges.max()) + 1)
 
-        # add all the nodes in case any were left out
-        # to check that the graph is connected (it must be connected)
-        # use self.connected
-        for i, _ in enumerate(self.positions):
-            g.add_node(i)
+    @property
+    def adjacency(self) -> csr_matrix:
+        """Sparse (symmetric) adjacency matrix of the particles and bonds"""
+        n = self.n_vertices
+        edges = self.edges
+        data = np.ones(2 * len(edges), dtype=np.int8)
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        return csr_matrix((data, (rows, cols)), shape=(n, n))
 
-        return g
+    @property
+    def components(self) -> np.ndarray:
+        """Array containing the connected component label of each vertex"""
+        if self._labels is None:
+            self._n_components, self._labels = connected_components(
+                self.adjacency,
+                directed=False
+            )
+        return self._labels
+
+    @property
+    def n_components(self) -> int:
+        """Number of connected components in the graph"""
+        if self._n_components is None:
+            self.components
+        return int(self._n_components)
+
+    @property
+    def degree(self) -> np.ndarray:
+        """Array containing the number of bonds of each vertex"""
+        if self._degree is None:
+            self._degree = np.bincount(
+                self.edges.reshape(-1),
+                minlength=self.n_vertices
+            )
+        return self._degree
 
     @property
     def connected(self) -> bool:
-        return nx.is_connected(self.graph)
+        return self.n_components <= 1
+
+    def to_networkx(self) -> "networkx.Graph":
+        """Exports the particles and bonds to a NetworkX graph, networkx
+        is imported on demand since it is too heavy for large gels"""
+        import networkx as nx
+        g = nx.Graph()
+        g.add_nodes_from(range(self.n_vertices))
+        g.add_edges_from(self.edges.tolist())
+        return g
+
+    @property
+    def graph(self) -> "networkx.Graph":
+        """Uses NetworkX to get graph of the particles and bonds"""
+        return self.to_networkx()
 
     def species(
             self,
@@ -194,7 +299,7 @@ class Topology():
 
     @property
     def is_valid(self) -> bool:
-        return len(self.sequence) == len(self.positions)
+        return len(self._codes) == len(self.positions)
 
     def import_dataframe(self, dataframe : pd.DataFrame):
         """
@@ -229,17 +334,104 @@ class Topology():
         """
         Adds the topology to a readdy simulation
         """
-        # use property to make sure that the topology
-        # is actually connected before adding it to the simulation
-        assert self.connected
-
-        # Add to simulation using its own method
-        topology = simulation.add_topology(
-            self.top_type,
-            self.sequence,
-            self.positions
+        return add_topologies(simulation, [self], shift=shift)
+
+def add_topologies(
+    simulation: readdy.Simulation,
+    topologies: typing.Iterable[Topology],
+    shift: int = 0,
+) -> dict:
+    """
+    Adds many topologies to a readdy simulation
+
+    The positions of all topologies are concatenated and unit-converted
+    in a single call, and the sequences are built once for every
+    distinct sequence. ReaDDy has no bulk insertion, so the cost is
+    still one call to the add_topology binding per topology and one
+    Python call to add_edge per edge. Without the private ReaDDy API
+    the public Simulation.add_topology is called for every topology,
+    which converts the positions of each topology again.
+
+    Parameters:
+        simulation: readdy simulation to add the topologies to
+        topologies: iterable of Topology instances
+        shift: integer added to every vertex index in the edges
+
+    Returns:
+        Dictionary containing the number of topologies, particles and
+        edges that were inserted and the time taken in seconds
+
+    Raises:
+        ValueError: if any of the topologies is not connected
+    """
+    start = time.perf_counter()
+    topologies = list(topologies)
+
+    # make sure that every topology is actually connected
+    # before adding any of them to the simulation
+    for topology in topologies:
+        if not topology.connected:
+            raise ValueError(f'{topology} is not connected')
+
+    # written against ReaDDy 2.0.14, where Simulation.add_topology converts
+    # the positions of each topology with the private _unit_conf and then
+    # calls the private _simulation binding, so the positions of every
+    # topology are converted at once and the binding is called directly,
+    # falling back to the public method if the private API is missing
+    unit_conf = getattr(simulation, '_unit_conf', None)
+    binding = getattr(simulation, '_simulation', None)
+    direct = unit_conf is not None and hasattr(binding, 'add_topology')
+    if direct:
+        add_topology = binding.add_topology
+    else:
+        logger.debug('Using the public Simulation.add_topology')
+        add_topology = simulation.add_topology
+
+    # prepare every position in a single array
+    counts = [len(topology.positions) for topology in topologies]
+    offsets = np.cumsum([0] + counts)
+    if topologies:
+        positions = np.concatenate([
+            np.asarray(topology.positions, dtype=float).reshape(-1, 3)
+            for topology in topologies
+        ])
+        if direct:
+            positions = unit_conf.convert(positions, simulation.length_unit)
+
+    # many small topologies (e.g. cubes) share the same sequence
+    sequences = {}
+    prepared = time.perf_counter()
+
+    n_edges = 0
+    for k, topology in enumerate(topologies):
+        key = (tuple(topology.type_names), topology.type_codes.tobytes())
+        if key not in sequences:
+            sequences[key] = topology.sequence
+
+        handle = add_topology(
+            topology.top_type,
+            sequences[key],
+            positions[offsets[k]:offsets[k+1]]
         )
 
         # add the bonds connecting the network
-        for atoms in self.edges:
-            topology.get_graph().add_edge(atoms[0] + shift, atoms[1] + shift)
+        add_edge = handle.get_graph().add_edge
+        for i, j in (topology.edges + shift).tolist():
+            add_edge(i, j)
+        n_edges += len(topology.edges)
+
+    end = time.perf_counter()
+    result = {
+        'topologies': len(topologies),
+        'particles': int(offsets[-1]),
+        'edges': n_edges,
+        'prepare_time': prepared - start,
+        'insert_time': end - prepared,
+        'total_time': end - start,
+    }
+    logger.debug(
+        f'Inserted {result["topologies"]} topologies containing '
+        f'{result["particles"]} particles and {result["edges"]} edges '
+        f'in {result["total_time"]:.3f}s'
+    )
+    return result
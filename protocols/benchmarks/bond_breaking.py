@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""bond_breaking.py - scaling of the BondBreaking.polymer reaction function
+
+Builds a single linear gel strand of N beads in ReaDDy and times one call
+of the structural reaction function on it, with and without intermediate
+beads present, for N from 10^2 to 10^5. The legacy scheme, which loops
+over every edge and looks up the types of both of its vertices, is timed
+alongside for comparison.
+
+Usage:
+
+    python bond_breaking.py --sizes 100 1000 10000 100000 -o scaling.csv
+"""
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from softnanotools.logger import Logger
+logger = Logger('BOND BREAKING')
+
+from hydrogels.utils.system import System
+from hydrogels.utils.topology import Topology, TopologyBond, add_topologies
+from hydrogels.reactions import BondBreaking
+from hydrogels.reactions.structural import Recipe
+
+def legacy(reactant: str, intermediate: str):
+    """The original edge loop of BondBreaking.polymer for polymers with
+    more than two beads"""
+    def fn(topology) -> Recipe:
+        recipe = Recipe(topology)
+        for edge in topology.get_graph().get_edges():
+            if topology.particle_type_of_vertex(edge[0]) == intermediate:
+                recipe.remove_edge(edge[0], edge[1])
+                recipe.change_particle_type(edge[0], reactant)
+            elif topology.particle_type_of_vertex(edge[1]) == intermediate:
+                recipe.remove_edge(edge[0], edge[1])
+                recipe.change_particle_type(edge[1], reactant)
+        return recipe
+    return fn
+
+def strand(size: int, intermediates: int):
+    system = System([size + 10., 10., 10.])
+    system.topologies.add_type('molecule')
+    system.add_topology_species('A', 1.0)
+    system.add_topology_species('B', 1.0)
+    for pair in (('A', 'A'), ('A', 'B')):
+        TopologyBond(
+            'harmonic', *pair, force_constant=1.0, length=1.0
+        ).register(system)
+    simulation = system.simulation()
+
+    sequence = np.array(['A'] * size)
+    sequence[np.linspace(1, size - 2, intermediates, dtype=int)] = 'B'
+    positions = np.zeros((size, 3))
+    positions[:, 0] = np.arange(size) - size / 2
+    add_topologies(simulation, [Topology(
+        'molecule',
+        sequence=list(sequence),
+        positions=positions,
+        edges=np.stack([np.arange(size - 1), np.arange(1, size)], axis=1)
+    )])
+    return simulation
+
+def benchmark(size: int, intermediates: int, repeats: int) -> dict:
+    simulation = strand(size, intermediates)
+    topology = simulation.current_topologies[0]
+    result = {'size': size, 'intermediates': intermediates}
+    for name, fn in (
+        ('polymer', BondBreaking('A', 'B', 'C').polymer),
+        ('legacy', legacy('A', 'B')),
+    ):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn(topology)
+            timings.append(time.perf_counter() - start)
+        result[name] = min(timings)
+    result['speedup'] = result['legacy'] / result['polymer']
+    logger.info(
+        f'N={size:<7d} I={intermediates:<3d} '
+        f'polymer={result["polymer"]:.3e}s '
+        f'legacy={result["legacy"]:.3e}s '
+        f'speedup={result["speedup"]:.1f}x'
+    )
+    return result
+
+def main(
+    sizes: List[int],
+    intermediates: List[int],
+    repeats: int = 5,
+    output: str = None,
+):
+    results = pd.DataFrame([
+        benchmark(size, n, repeats)
+        for size in sizes
+        for n in intermediates
+    ])
+    logger.info(f'Results:\n{results.to_string(index=False)}')
+    if output:
+        results.to_csv(output, index=False)
+        logger.info(f'Written results to {output}')
+    return results
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Scaling benchmark for BondBreaking.polymer'
+    )
+    parser.add_argument(
+        '--sizes',
+        nargs='+',
+        type=int,
+        default=[100, 1000, 10000, 100000]
+    )
+    parser.add_argument('-i', '--intermediates', nargs='+', type=int,
+                        default=[0, 1, 10])
+    parser.add_argument('-r', '--repeats', default=5, type=int)
+    parser.add_argument('-o', '--output', default=None)
+    main(**vars(parser.parse_args()))
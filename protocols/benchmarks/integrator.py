@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""integrator.py - steps per second of the theory integrator
+
+Runs the LennardJones model with the equations evaluated one by one
+through Equation.__call__ (compile=False), with the compiled step
+function (compile=True) and with the native C++ loop
+(Simulation.run_native), and checks that all give the same history.
+
+Usage:
+
+    python integrator.py --steps 100000
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from softnanotools.logger import Logger
+logger = Logger('INTEGRATOR')
+
+from hydrogels.theory.models.simulations import LennardJones
+
+SETTINGS = {
+    'sig': 1.0,
+    'eps': 1.0,
+    'rc': 5.0,
+    'beta': 1.0,
+    'c0': 5.0,
+    'nV': 1.0,
+    'rate': 0.1,
+    'thickness': 0.01,
+    'rE': 0.5,
+}
+
+def benchmark(steps: int, compile: bool, N: int = 10000, dt: float = 0.1):
+    simulation = LennardJones(dt, N, compile=compile, **SETTINGS)
+    start = time.perf_counter()
+    simulation.run(steps)
+    elapsed = time.perf_counter() - start
+    return simulation, steps / elapsed
+
+def native(steps: int, N: int = 10000, dt: float = 0.1):
+    simulation = LennardJones(dt, N, **SETTINGS)
+    start = time.perf_counter()
+    df = simulation.run_native(steps)
+    elapsed = time.perf_counter() - start
+    return df, steps / elapsed
+
+def main(steps: int = 100000, repeats: int = 3, output: str = None):
+    rows = []
+    histories = {}
+    for mode in ('python', 'compiled'):
+        for _ in range(repeats):
+            simulation, rate = benchmark(steps, mode == 'compiled')
+            rows.append({'mode': mode, 'steps_per_second': rate})
+        histories[mode] = simulation.history.dataframe
+        logger.info(f'{mode}: {rate:.0f} steps/s')
+    for _ in range(repeats):
+        histories['native'], rate = native(steps)
+        rows.append({'mode': 'native', 'steps_per_second': rate})
+    logger.info(f'native: {rate:.0f} steps/s')
+
+    assert histories['python'].equals(histories['compiled'])
+    assert np.allclose(
+        histories['python'],
+        histories['native'],
+        equal_nan=True
+    )
+    results = pd.DataFrame(rows).groupby('mode', sort=False).max()
+    results['speedup'] = (
+        results['steps_per_second']
+        / results.loc['python', 'steps_per_second']
+    )
+    logger.info(f'Results:\n{results.to_string()}')
+    if output:
+        results.to_csv(output)
+        logger.info(f'Written results to {output}')
+    return results
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Steps per second of the LennardJones theory model'
+    )
+    parser.add_argument('-n', '--steps', default=100000, type=int)
+    parser.add_argument('-r', '--repeats', default=3, type=int)
+    parser.add_argument('-o', '--output', default=None)
+    main(**vars(parser.parse_args()))
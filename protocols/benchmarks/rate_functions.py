@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""rate_functions.py - constant rate against intermediate_rate
+
+Degrades linear strands of N beads with enzymes through the spatial
+topology reaction of the enzymatic examples, molecule(A) + (E) ->
+molecule(B) + (E), and releases the intermediates with
+BondBreaking.polymer. The same run (same seed) is timed with the
+constant rate of the reaction, which ReaDDy evaluates for every
+topology at every step, and with intermediate_rate, which is only
+evaluated when a topology changes and is zero without intermediates.
+
+The number of calls of the reaction function, the fraction of them that
+returned an empty recipe and the number of released particles are
+reported alongside the wall time.
+
+Usage:
+
+    python rate_functions.py --sizes 10 100 --strands 20 -o rates.csv
+"""
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from softnanotools.logger import Logger
+logger = Logger('RATE FUNCTIONS')
+
+from hydrogels.utils.system import System
+from hydrogels.utils.topology import Topology, TopologyBond, add_topologies
+from hydrogels.reactions import BondBreaking, intermediate_rate
+
+RATE = 10000.0
+
+def simulation(
+    size: int,
+    strands: int,
+    enzymes: int,
+    rate_function,
+    seed: int,
+):
+    np.random.seed(seed)
+    box = np.array([size + 10., 2. * strands + 10., 20.])
+    system = System(list(box))
+    system.topologies.add_type('molecule')
+    system.add_topology_species('A', 1.0)
+    system.add_topology_species('B', 1.0)
+    system.add_species('C', 1.0)
+    system.add_species('E', 1.0)
+    for pair in (('A', 'A'), ('A', 'B'), ('B', 'B')):
+        TopologyBond(
+            'harmonic', *pair, force_constant=1.0, length=1.0
+        ).register(system)
+    system.topologies.add_spatial_reaction(
+        'degradation: molecule(A) + (E) -> molecule(B) + (E)',
+        rate=0.1,
+        radius=1.0,
+    )
+    reaction = BondBreaking(
+        'A', 'B', 'C',
+        rate_function=rate_function,
+        instrument=True,
+    ).polymer
+    reaction.register(system)
+    simulation = system.simulation()
+    simulation.show_progress = False
+
+    topologies = []
+    for i in range(strands):
+        positions = np.zeros((size, 3))
+        positions[:, 0] = np.arange(size) - size / 2
+        positions[:, 1] = 2. * i - strands
+        topologies.append(Topology(
+            'molecule',
+            sequence=['A'] * size,
+            positions=positions,
+            edges=np.stack([np.arange(size - 1), np.arange(1, size)], axis=1)
+        ))
+    add_topologies(simulation, topologies)
+    simulation.add_particles(
+        'E',
+        np.random.uniform(-0.5, 0.5, (enzymes, 3)) * (box - 1.)
+    )
+    return simulation, reaction
+
+def benchmark(
+    size: int,
+    strands: int,
+    enzymes: int,
+    steps: int,
+    timestep: float,
+    seed: int,
+) -> List[dict]:
+    results = []
+    for name, rate_function in (
+        ('constant', lambda topology: RATE),
+        ('intermediate', intermediate_rate('B', RATE)),
+    ):
+        sim, reaction = simulation(
+            size, strands, enzymes, rate_function, seed
+        )
+        start = time.perf_counter()
+        sim.run(steps, timestep)
+        elapsed = time.perf_counter() - start
+        statistics = reaction.statistics
+        released = sum(p.type == 'C' for p in sim.current_particles)
+        result = {
+            'size': size,
+            'strands': strands,
+            'rate': name,
+            'time': elapsed,
+            'calls': statistics.calls,
+            'empty': statistics.outcomes['none'] / max(statistics.calls, 1),
+            'released': released,
+        }
+        logger.info(
+            f'N={size:<5d} strands={strands:<4d} {name:<12s} '
+            f'time={elapsed:.2f}s calls={statistics.calls:<7d} '
+            f'empty={result["empty"]:.0%} released={released}'
+        )
+        results.append(result)
+    return results
+
+def main(
+    sizes: List[int],
+    strands: int = 20,
+    enzymes: int = 100,
+    steps: int = 2000,
+    timestep: float = 0.01,
+    seed: int = 1,
+    output: str = None,
+):
+    results = pd.DataFrame([
+        result
+        for size in sizes
+        for result in benchmark(
+            size, strands, enzymes, steps, timestep, seed
+        )
+    ])
+    logger.info(f'Results:\n{results.to_string(index=False)}')
+    if output:
+        results.to_csv(output, index=False)
+        logger.info(f'Written results to {output}')
+    return results
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Benchmark of the rate functions of BondBreaking'
+    )
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100])
+    parser.add_argument('--strands', default=20, type=int)
+    parser.add_argument('--enzymes', default=100, type=int)
+    parser.add_argument('--steps', default=2000, type=int)
+    parser.add_argument('--timestep', default=0.01, type=float)
+    parser.add_argument('--seed', default=1, type=int)
+    parser.add_argument('-o', '--output', default=None)
+    main(**vars(parser.parse_args()))
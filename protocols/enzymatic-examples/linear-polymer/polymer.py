@@ -26,6 +26,7 @@ Uses hydrogels to configure the following system
     harmonic bonding (bond; A-A A-B) r0=1.0, k=5.0
 """
 from pathlib import Path
+import functools
 from typing import List, Union
 import numpy as np
 import readdy
@@ -38,7 +39,11 @@ from softnanotools.logger import Logger
 logger = Logger('POLYMER')
 
 from hydrogels.utils.system import System
-from hydrogels.utils.topology import Topology, TopologyBond
+from hydrogels.utils.topology import Topology, TopologyBond, add_topologies
+from hydrogels.reactions import intermediate_rate
+from hydrogels.utils.parallel import run_seeds, create_simulation
+from hydrogels.trajectory import count_species
+from hydrogels.utils.statistics import StreamingAggregator
 
 DEFAULT_DICTIONARY = {
     'A': 1.0,
@@ -204,7 +209,7 @@ def create_system(
         name="BondBreaking",
         topology_type="molecule",
         reaction_function=reaction_function,
-        rate_function=lambda x: 10000.,
+        rate_function=intermediate_rate('B'),
 
     )
 
@@ -215,13 +220,14 @@ def run_simulation(
     stride: int = 100,
     timestep: float = 0.01,
     length: int = 10000,
+    threads: int = None,
     **kwargs
 ) -> Path:
     # run equilibration
     logger.info('Running equilibration...')
     # insert code here
     system = create_system(**kwargs)#, reaction=False)
-    simulation = system.simulation()
+    simulation = create_simulation(system, threads)
 
     box = kwargs['box']
     simulation.add_particles(
@@ -231,8 +237,11 @@ def run_simulation(
 
     # add topologies
     topologies = create_topologies(kwargs['molecules'], box=box)
-    for topology in topologies:
-        topology.add_to_sim(simulation)
+    stats = add_topologies(simulation, topologies)
+    logger.info(
+        f'Inserted {stats["topologies"]} topologies in '
+        f'{stats["total_time"]:.3f}s'
+    )
 
     #output = Path(f'{name}.h5')
     #if output.exists():
@@ -298,46 +307,20 @@ def analyse_trajectory(
     particle_types = trajectory.particle_types
     particles = trajectory.read_observable_particles()
 
-    numbers = {
-        't': particles[0] * timestep,
-        'A': [],
-        'B': [],
-        'E': [],
-        'C': [],
-    }
-    for row in particles[1]:
-        numbers['A'].append(len(row[row == particle_types['A']]))
-        numbers['E'].append(len(row[row == particle_types['E']]))
-        numbers['B'].append(len(row[row == particle_types['B']]))
-        numbers['C'].append(len(row[row == particle_types['C']]))
-
-    results = pd.DataFrame(numbers)
+    results = count_species(
+        particles[1],
+        particle_types,
+        species=['A', 'B', 'E', 'C'],
+        time=particles[0] * timestep,
+    )
     if output:
         results.to_csv(output, index=False)
     return results
 
 def gather_results(targets: List[Path]) -> pd.DataFrame:
-    results = pd.DataFrame()
-    dfs = {
-        'A': pd.DataFrame(),
-        'E': pd.DataFrame(),
-        'B': pd.DataFrame(),
-        'C': pd.DataFrame()
-    }
-
-    for i, target in enumerate(targets):
-        data = pd.read_csv(target)
-        if i == 0:
-            results['t'] = data['t']
-
-        for kind in dfs:
-            dfs[kind][i] = data[kind]
-
-    for kind in dfs.keys():
-        results[f'{kind}_mean'] = dfs[kind].mean(axis=1)
-        results[f'{kind}_std'] = dfs[kind].std(axis=1)
-
-    return results
+    aggregator = StreamingAggregator(columns=['A', 'E', 'B', 'C'])
+    aggregator.update(targets)
+    return aggregator.dataframe
 
 def plot_final(data: pd.DataFrame, name: str = 'polymer'):
     fig, ax = plt.subplots()
@@ -383,11 +366,26 @@ def plot_final(data: pd.DataFrame, name: str = 'polymer'):
     data.to_csv(f'{name}.csv', index=False)
     return
 
+def run_seed(seed: int, threads: int, name: str, parameters: dict) -> Path:
+    """Runs and analyses the simulation of a single seed, writing
+    [name].[seed].csv as soon as it has finished"""
+    prefix = f'{name}.{seed}'
+    traj = run_simulation(prefix, threads=threads, **parameters)
+    output = f'{prefix}.csv'
+    analyse_trajectory(
+        traj,
+        output=output,
+        timestep=parameters['timestep']
+    )
+    return Path(output)
+
 def main(
     settings: str,
     run: bool = False,
     seeds: int = 5,
     name: str = 'monatomic',
+    workers: int = None,
+    threads: int = 1,
     **kwargs
 ):
     logger.info('Running polymer...')
@@ -395,18 +393,15 @@ def main(
     with open(settings, 'r') as f:
         parameters = yaml.safe_load(f)
     # insert code here
-    for seed in range(1, seeds + 1, 1):
-        prefix = f'{name}.{seed}'
-        if run:
-            traj = run_simulation(prefix, **parameters)
-            analyse_trajectory(
-                traj,
-                output=f'{prefix}.csv',
-                timestep=parameters['timestep']
-            )
-        else:
-            logger.info('Skipping simulation because --run was not passed!')
-            break
+    if run:
+        run_seeds(
+            functools.partial(run_seed, name=name, parameters=parameters),
+            range(1, seeds + 1),
+            workers=workers,
+            threads=threads,
+        )
+    else:
+        logger.info('Skipping simulation because --run was not passed!')
 
     results = gather_results(Path().glob(f'{name}.*.csv'))
     logger.info(results)
@@ -425,4 +420,8 @@ if __name__ == '__main__':
     parser.add_argument('--run', action='store_true')
     parser.add_argument('-s', '--seeds', default=5, type=int)
     parser.add_argument('-n', '--name', default='polymer')
+    parser.add_argument('-w', '--workers', default=None, type=int,
+                        help='number of seeds run at once')
+    parser.add_argument('-t', '--threads', default=1, type=int,
+                        help='ReaDDy threads for each seed')
     main(**vars(parser.parse_args()))
\ No newline at end of file
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """Enzymatic reaction A + E -> B + E using ReaDDy"""
 from pathlib import Path
+import functools
 from typing import List, Union
 import numpy as np
 import pandas as pd
@@ -12,6 +13,10 @@ logger = Logger('MONATOMIC')
 
 import readdy
 
+from hydrogels.utils.parallel import run_seeds, create_simulation
+from hydrogels.trajectory import count_species
+from hydrogels.utils.statistics import StreamingAggregator
+
 def create_system(
     box: float = 25.0,
     diffusion_dictionary: dict = {
@@ -78,6 +83,7 @@ def run_simulation(
     stride: int = 100,
     timestep: float = 0.01,
     length: int = 10000,
+    threads: int = None,
     **kwargs
 ) -> Path:
     # run equilibration
@@ -86,7 +92,11 @@ def run_simulation(
     output = Path(f'{name}.h5')
     if output.exists():
         output.unlink()
-    simulation = system.simulation(output_file=str(output.absolute()))
+    simulation = create_simulation(
+        system,
+        threads,
+        output_file=str(output.absolute())
+    )
     add_particles(simulation, **kwargs)
     simulation.make_checkpoints(
         stride=stride,
@@ -103,7 +113,11 @@ def run_simulation(
     output = Path(f'{name}.h5')
     if output.exists():
         output.unlink()
-    simulation = system.simulation(output_file=str(output.absolute()))
+    simulation = create_simulation(
+        system,
+        threads,
+        output_file=str(output.absolute())
+    )
 
     # skip adding particles since these will be loaded
     # add_particles(simulation, **kwargs)
@@ -132,43 +146,20 @@ def analyse_trajectory(
     particle_types = trajectory.particle_types
     particles = trajectory.read_observable_particles()
 
-    numbers = {
-        't': particles[0] * timestep,
-        'A': [],
-        'B': [],
-        'E': []
-    }
-    for row in particles[1]:
-        numbers['A'].append(len(row[row == particle_types['A']]))
-        numbers['E'].append(len(row[row == particle_types['E']]))
-        numbers['B'].append(len(row[row == particle_types['B']]))
-
-    results = pd.DataFrame(numbers)
+    results = count_species(
+        particles[1],
+        particle_types,
+        species=['A', 'B', 'E'],
+        time=particles[0] * timestep,
+    )
     if output:
         results.to_csv(output, index=False)
     return results
 
 def gather_results(targets: List[Path]) -> pd.DataFrame:
-    results = pd.DataFrame()
-    dfs = {
-        'A': pd.DataFrame(),
-        'E': pd.DataFrame(),
-        'B': pd.DataFrame(),
-    }
-
-    for i, target in enumerate(targets):
-        data = pd.read_csv(target)
-        if i == 0:
-            results['t'] = data['t']
-
-        for kind in dfs:
-            dfs[kind][i] = data[kind]
-
-    for kind in dfs.keys():
-        results[f'{kind}_mean'] = dfs[kind].mean(axis=1)
-        results[f'{kind}_std'] = dfs[kind].std(axis=1)
-
-    return results
+    aggregator = StreamingAggregator(columns=['A', 'E', 'B'])
+    aggregator.update(targets)
+    return aggregator.dataframe
 
 def plot_final(data: pd.DataFrame, name: str = 'monatomic'):
     fig, ax = plt.subplots()
@@ -204,23 +195,41 @@ def plot_final(data: pd.DataFrame, name: str = 'monatomic'):
     data.to_csv(f'{name}.csv', index=False)
     return
 
-def main(settings: str, run: bool = False, seeds: int = 5, name: str = 'monatomic', **kwargs):
+def run_seed(seed: int, threads: int, name: str, parameters: dict) -> Path:
+    """Runs and analyses the simulation of a single seed, writing
+    [name].[seed].csv as soon as it has finished"""
+    prefix = f'{name}.{seed}'
+    traj = run_simulation(prefix, threads=threads, **parameters)
+    output = f'{prefix}.csv'
+    analyse_trajectory(
+        traj,
+        output=output,
+        timestep=parameters['timestep']
+    )
+    return Path(output)
+
+def main(
+    settings: str,
+    run: bool = False,
+    seeds: int = 5,
+    name: str = 'monatomic',
+    workers: int = None,
+    threads: int = 1,
+    **kwargs
+):
     logger.info('Running monatomic...')
     with open(settings, 'r') as f:
         parameters = yaml.safe_load(f)
     # insert code here
-    for seed in range(1, seeds + 1, 1):
-        prefix = f'{name}.{seed}'
-        if run:
-            traj = run_simulation(prefix, **parameters)
-            analyse_trajectory(
-                traj,
-                output=f'{prefix}.csv',
-                timestep=parameters['timestep']
-            )
-        else:
-            logger.info('Skipping simulation because --run was not passed!')
-            break
+    if run:
+        run_seeds(
+            functools.partial(run_seed, name=name, parameters=parameters),
+            range(1, seeds + 1),
+            workers=workers,
+            threads=threads,
+        )
+    else:
+        logger.info('Skipping simulation because --run was not passed!')
 
     results = gather_results(Path().glob(f'{name}.*.csv'))
     logger.info(results)
@@ -237,4 +246,8 @@ if __name__ == '__main__':
     parser.add_argument('--run', action='store_true')
     parser.add_argument('-s', '--seeds', default=5, type=int)
     parser.add_argument('-n', '--name', default='monatomic')
+    parser.add_argument('-w', '--workers', default=None, type=int,
+                        help='number of seeds run at once')
+    parser.add_argument('-t', '--threads', default=1, type=int,
+                        help='ReaDDy threads for each seed')
     main(**vars(parser.parse_args()))
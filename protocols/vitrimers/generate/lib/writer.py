@@ -12,6 +12,8 @@ import pandas as pd
 from microgel import Microgel
 from enzyme import EnzymeContainer
 
+from hydrogels.utils.statistics import StreamingAggregator
+
 import json
 
 from typing import Iterable, Union, List
@@ -29,8 +31,12 @@ class Writer:
         self._dataframes = {}
         self._values = {}
 
+        # dataframes are aligned on their index and reduced as they are
+        # added, so only their running statistics are kept
         if isinstance(dataframe_keys, Iterable):
-            self._dataframes = {key: [] for key in dataframe_keys}
+            self._dataframes = {
+                key: StreamingAggregator(time=None) for key in dataframe_keys
+            }
 
         if isinstance(value_keys, Iterable):
             self._values = {key: [] for key in value_keys}
@@ -53,26 +59,10 @@ class Writer:
         return values
 
     def gather_dfs(self) -> dict:
-
-        # create final dictionary
-        results = {}
-
-        # iterate over if kind of df
-        for kind, df_list in self._dataframes.items():
-            results[kind] = pd.DataFrame()
-
-            columns = df_list[0].columns
-            for column in columns:
-                temp = []
-                for df in df_list:
-                    temp.append(df[column])
-
-                temp = pd.concat(temp, axis=1)
-
-                results[kind][f'{column}_mean'] = temp.mean(axis=1)
-                results[kind][f'{column}_std'] = temp.std(axis=1)
-
-        return results
+        return {
+            kind: aggregator.dataframe
+            for kind, aggregator in self._dataframes.items()
+        }
 
     def process_files(self, targets: List[PathLike], **kwargs):
         """Take multiple filepaths and collate into the Writer"""
@@ -130,8 +120,8 @@ class MicrogelWriter(Writer):
         # do new stuff
 
         # update dfs
-        self._dataframes['density'].append(obj.density_map)
-        self._dataframes['energy'].append(obj.energy_map)
+        self._dataframes['density'].add(obj.density_map)
+        self._dataframes['energy'].add(obj.energy_map)
 
         # update values
         self._values['radius'].append(obj.radius)
@@ -180,7 +170,7 @@ class EnzymeWriter(Writer):
         super().add_object(obj)
 
         # do new stuff
-        self._dataframes['density'].append(obj.density_map)
+        self._dataframes['density'].add(obj.density_map)
 
         return
 
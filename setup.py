@@ -7,7 +7,7 @@ import versioneer
 with open("README.md", "r") as f:
     long_description = f.read()
 
-cpp_args = ['-std=c++11']#, '-stdlib=libc++']#, '-mmacosx-version-min=10.7']
+cpp_args = ['-std=c++14', '-pthread']#, '-stdlib=libc++']#, '-mmacosx-version-min=10.7']
 
 class get_pybind_include(object):
     """Helper class to determine the pybind11 include path
@@ -24,6 +24,7 @@ potentials = Extension(
     include_dirs=[get_pybind_include(), './hydrogels/theory/models/_cxx/'],
     language='c++',
     extra_compile_args = cpp_args,
+    extra_link_args = ['-pthread'],
     )
 
 functions = Extension(
@@ -31,6 +32,20 @@ functions = Extension(
     include_dirs=[get_pybind_include(), './hydrogels/theory/models/_cxx/'],
     language='c++',
     extra_compile_args = cpp_args,
+    extra_link_args = ['-pthread'],
+    )
+
+engine = Extension(
+    'engine', sources = [
+        './hydrogels/theory/models/_cxx/engine.cpp',
+        './hydrogels/theory/models/_cxx/functions.cpp',
+        './hydrogels/theory/models/_cxx/potentials.cpp',
+    ],
+    include_dirs=[get_pybind_include(), './hydrogels/theory/models/_cxx/'],
+    define_macros=[('KERNELS_ONLY', None)],
+    language='c++',
+    extra_compile_args = cpp_args,
+    extra_link_args = ['-pthread'],
     )
 
 packages = []
@@ -56,7 +71,7 @@ setuptools.setup(
     ],
     python_requires=">=3.6",
     ext_package='hydrogels',
-    ext_modules=[potentials, functions],
+    ext_modules=[potentials, functions, engine],
     version=versioneer.get_version(),
     cmdclass=versioneer.get_cmdclass(),
 )
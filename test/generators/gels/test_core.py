@@ -29,6 +29,7 @@ def generate_gel():
 
 def test_Gel():
     gel = generate_gel()
+    assert not hasattr(gel, '__dict__')
     system = System([10., 10., 10.])
     system.insert_topology(gel, diffusion_constant=1.0)
     system.add_species('enzyme', 1.0)
@@ -44,5 +45,19 @@ def test_Gel():
     simulation.run(10000, 0.001)
     return
 
+def test_batched_decay():
+    gel = generate_gel()
+    system = System([10., 10., 10.])
+    system.insert_topology(gel, diffusion_constant=1.0)
+    system.add_species('enzyme', 1.0)
+    system.add_species('released', 1.0)
+    gel.register_decay(system, reaction_type='batched', scission_rate=100.)
+    gel.register_degradation(system, rate=10.)
+    simulation = system.initialise_simulation()
+    simulation.add_particles('enzyme', np.array([[2.0, 0.0, 0.0]]))
+    simulation.run(1000, 0.001)
+    return
+
 if __name__ == '__main__':
-    test_Gel()
\ No newline at end of file
+    test_Gel()
+    test_batched_decay()
\ No newline at end of file
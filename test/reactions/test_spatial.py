@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+pytest script for testing the spatial reaction registry
+"""
+import numpy as np
+import pytest
+
+from hydrogels.systems import EnzymaticDegradation
+from hydrogels.generators.gels import Gel
+
+def generate_gel(shift: float = 0.0):
+    gel = Gel(
+        'gel',
+        np.array([
+            [1., 0., 0.],
+            [1., 1., 0.],
+            [0., 1., 0.],
+            [0., 0., 0.],
+        ]) + shift
+    )
+    gel.edges = [(0, 1), (1, 2), (2, 3)]
+    gel.configure_bonds('harmonic', force_constant=1.0, length=1.0)
+    return gel
+
+def test_registry():
+    system = EnzymaticDegradation([10., 10., 10.], diffusion_constant=1.0)
+    for shift in (0.0, 3.0):
+        gel = generate_gel(shift)
+        system.insert_topology(gel, diffusion_constant=1.0)
+    gel.register_decay(system)
+
+    # one reaction for both gels, and one more for a second enzyme
+    system.add_enzyme(np.array([[5.0, 0.0, 0.0]]), rate=1e-2)
+    gel.register_degradation(system, 'enzyme', rate=1e-2)
+    system.add_enzyme(np.array([[-4.0, 0.0, 0.0]]), name='protease')
+    registry = system.reaction_registry
+    assert len(registry) == 2
+    assert sorted(i.name for i in registry.reactions) == [
+        'degradation', 'degradation_1'
+    ]
+
+    with pytest.raises(ValueError):
+        gel.register_degradation(system, 'enzyme', rate=1.0)
+
+    simulation = system.initialise_simulation(fout='')
+    simulation.run(10, 0.1)
+
+    # configuring again does not register the reactions twice
+    registry.configure()
+    assert len(registry._registered) == 2
+
+    # reactions added later are registered by the inherited simulation()
+    system.add_species('lysozyme', 1.0)
+    gel.register_degradation(system, 'lysozyme', rate=1e-2)
+    simulation = system.simulation()
+    assert len(registry._registered) == 3
+    return
+
+if __name__ == '__main__':
+    test_registry()
@@ -4,10 +4,19 @@ pytest script for testing utils folder
 """
 from pathlib import Path
 import numpy as np
+import pytest
 
 from hydrogels import System, Topology
 from hydrogels.utils.topology import TopologyBond
-from hydrogels.reactions import BondBreaking
+from hydrogels.reactions import (
+    BondBreaking,
+    dump_statistics,
+    intermediate_rate,
+    vertex_types,
+    indices_of,
+    EventRecorder,
+    load_events,
+)
 from hydrogels.trajectory.core import ParticleTrajectory
 
 from pathlib import Path
@@ -139,6 +148,309 @@ def test_polymer():
     OUTPUT.unlink()
     return
 
+def test_long_polymer():
+    # adjacent intermediates share an edge that must only be removed once
+    n = 20
+    sequence = ['A'] * n
+    for i in (5, 10, 11):
+        sequence[i] = 'B'
+    system = System([30., 30., 30.])
+    topology = Topology(
+        'molecule',
+        sequence=sequence,
+        positions=np.array([[i - n / 2, 0., 0.] for i in range(n)]),
+        edges=[(i, i + 1) for i in range(n - 1)]
+    )
+    reaction = BondBreaking('A', 'B', 'C').polymer
+
+    system.topologies.add_type('molecule')
+    system.add_topology_species('A', 1.0)
+    system.add_topology_species('B', 1.0)
+    system.add_species('C', 1.0)
+    for combination in (['A', 'A'], ['A', 'B'], ['B', 'B']):
+        TopologyBond(
+            'harmonic',
+            *combination,
+            force_constant=1.0,
+            length=1.0,
+        ).register(system)
+    reaction.register(system)
+
+    simulation = system.simulation()
+    # an idle strand added first, so that the indices of the particles in
+    # the kernel differ from the indices of the vertices of the topology
+    Topology(
+        'molecule',
+        sequence=['A'] * 5,
+        positions=np.array([[i - 2., 5., 0.] for i in range(5)]),
+        edges=[(i, i + 1) for i in range(4)]
+    ).add_to_sim(simulation)
+    topology.add_to_sim(simulation)
+    simulation.run(100, 0.01)
+
+    sizes = sorted(
+        top.get_n_particles() for top in simulation.current_topologies
+    )
+    assert sizes == [4, 5, 5, 8]
+    assert len(simulation.current_particles) == n + 5
+    for top in simulation.current_topologies:
+        types = vertex_types(top.get_graph().get_vertices())
+        assert types == ['A'] * top.get_n_particles()
+    assert indices_of(sequence, 'B') == [5, 10, 11]
+    return
+
+def test_instrumentation(tmp_path):
+    system = System([10., 10., 10.])
+    topology = Topology(
+        'molecule',
+        sequence = ['A', 'B', 'A', 'A'],
+        positions = np.array([
+            [0., 0., 0.],
+            [1., 0., 0.],
+            [2., 0., 0.],
+            [3., 0., 0.],
+        ]),
+        edges = [(0, 1), (1, 2), (2, 3)]
+    )
+    reaction = BondBreaking('A', 'B', 'C', instrument=True).polymer
+
+    system.topologies.add_type('molecule')
+    system.add_topology_species('A', 1.0)
+    system.add_topology_species('B', 1.0)
+    system.add_species('C', 1.0)
+    TopologyBond(
+        'harmonic', 'A', 'A', force_constant=1.0, length=1.0
+    ).register(system)
+    TopologyBond(
+        'harmonic', 'A', 'B', force_constant=1.0, length=1.0
+    ).register(system)
+    reaction.register(system)
+
+    simulation = system.simulation()
+    topology.add_to_sim(simulation)
+    simulation.run(10, 0.1)
+
+    statistics = reaction.statistics
+    assert statistics.calls > 0
+    assert statistics.calls == sum(statistics.latency)
+    assert statistics.calls == sum(statistics.outcomes.values())
+    assert statistics.outcomes['edge_removed'] == 1
+    assert statistics.outcomes['separated'] >= 1
+
+    dump_statistics([statistics], tmp_path / 'statistics.json')
+    dump_statistics([statistics], tmp_path / 'statistics.csv')
+    assert (tmp_path / 'statistics.csv').exists()
+    return
+
+def test_intermediate_rate():
+    system = System([10., 10., 10.])
+    system.topologies.add_type('molecule')
+    system.add_topology_species('A', 1.0)
+    system.add_topology_species('B', 1.0)
+    system.add_species('C', 1.0)
+    TopologyBond(
+        'harmonic', 'A', 'A', force_constant=1.0, length=1.0
+    ).register(system)
+    TopologyBond(
+        'harmonic', 'A', 'B', force_constant=1.0, length=1.0
+    ).register(system)
+    breaking = BondBreaking(
+        'A', 'B', 'C',
+        rate_function=intermediate_rate('B'),
+        instrument=True
+    )
+    reaction = breaking.polymer
+    reaction.register(system)
+
+    simulation = system.simulation()
+    for i, sequence in enumerate((['A', 'A', 'A'], ['A'])):
+        Topology(
+            'molecule',
+            sequence=sequence,
+            positions=np.array([
+                [float(j), float(i), 0.] for j in range(len(sequence))
+            ]),
+            edges=[(j, j + 1) for j in range(len(sequence) - 1)]
+        ).add_to_sim(simulation)
+
+    rate = intermediate_rate('B', 5.0, lone=False)
+    assert [rate(top) for top in simulation.current_topologies] == [0., 0.]
+    assert reaction.rate_function(simulation.current_topologies[1]) > 0.
+    assert breaking.rate == 10000.0
+
+    # the default rate is constant, since the rate is not re-evaluated
+    # after ordinary reactions create intermediates
+    default = BondBreaking('A', 'B', 'C')
+    assert default.rate_function(simulation.current_topologies[0]) == 1e4
+    assert default.rate == 1e4
+
+    # only the lone particle is released and the idle trimer is never
+    # passed to the reaction function
+    simulation.run(10, 0.1)
+    assert reaction.statistics.calls == 1
+    assert len(simulation.current_topologies) == 1
+    return
+
+def batched_simulation(reaction, sequence):
+    system = System([30., 30., 30.])
+    system.topologies.add_type('molecule')
+    system.add_topology_species('A', 1.0)
+    system.add_topology_species('B', 1.0)
+    system.add_species('C', 1.0)
+    for combination in (['A', 'A'], ['A', 'B'], ['B', 'B']):
+        TopologyBond(
+            'harmonic',
+            *combination,
+            force_constant=1.0,
+            length=1.0,
+        ).register(system)
+    reaction.register(system)
+    simulation = system.simulation()
+    Topology(
+        'molecule',
+        sequence=sequence,
+        positions=np.array([[i - 4., 0., 0.] for i in range(len(sequence))]),
+        edges=[(i, i + 1) for i in range(len(sequence) - 1)]
+    ).add_to_sim(simulation)
+    return simulation
+
+def test_batched():
+    sequence = ['A', 'B', 'A', 'B', 'B', 'A', 'A', 'B']
+    reaction = BondBreaking(
+        'A', 'B', 'C',
+        rate_function=intermediate_rate('B'),
+        instrument=True
+    ).batched
+    simulation = batched_simulation(reaction, sequence)
+    simulation.run(10, 0.01)
+
+    # every intermediate is released in the first call, followed by one
+    # call for each of the two lone A particles
+    types = [p.type for p in simulation.current_particles]
+    assert types.count('C') == 6
+    assert [
+        top.get_n_particles() for top in simulation.current_topologies
+    ] == [2]
+    assert reaction.statistics.calls == 3
+
+    # with a negligible scission rate nothing is released
+    reaction = BondBreaking('A', 'B', 'C', scission_rate=1e-12).batched
+    simulation = batched_simulation(reaction, sequence)
+    simulation.run(10, 0.01)
+    assert len(simulation.current_topologies) == 1
+
+    # the probability uses the rate of the rate function
+    breaking = BondBreaking(
+        'A', 'B', 'C',
+        rate_function=intermediate_rate('B', 50),
+        scission_rate=1.0
+    )
+    assert breaking.rate == 50
+    breaking.batched
+    with pytest.raises(ValueError):
+        BondBreaking(
+            'A', 'B', 'C', rate_function=lambda x: 1.0, scission_rate=1.0
+        ).batched
+    return
+
+def test_event_recorder(tmp_path):
+    fname = tmp_path / 'events.bin'
+    recorder = EventRecorder(fname, capacity=2)
+    reaction = BondBreaking('A', 'B', 'C', recorder=recorder).polymer
+    system = System([10., 10., 10.])
+    system.topologies.add_type('molecule')
+    system.add_topology_species('A', 1.0)
+    system.add_topology_species('B', 1.0)
+    system.add_species('C', 1.0)
+    TopologyBond(
+        'harmonic', 'A', 'A', force_constant=1.0, length=1.0
+    ).register(system)
+    TopologyBond(
+        'harmonic', 'A', 'B', force_constant=1.0, length=1.0
+    ).register(system)
+    reaction.register(system)
+    simulation = system.simulation()
+    Topology(
+        'molecule',
+        sequence=['A', 'B', 'A', 'A'],
+        positions=np.array([[float(i), 0., 0.] for i in range(4)]),
+        edges=[(0, 1), (1, 2), (2, 3)]
+    ).add_to_sim(simulation)
+    recorder.attach(simulation, timestep=0.1)
+    simulation.run(10, 0.1)
+    recorder.close()
+
+    # -A-B-A-A -> A + A + A-A, after which both lone A particles are
+    # separated and converted to C
+    events = load_events(fname)
+    types = events['types']
+    assert len(events['time']) == recorder.total == 7
+    assert np.all(np.isfinite(events['time']))
+    assert (events['edge'] >= 0).sum() == 2
+    assert (events['edge'] == -2).sum() == 2
+    changes = [
+        (types[i], types[j])
+        for i, j in zip(events['old'], events['new']) if i != j
+    ]
+    assert sorted(changes) == [('A', 'C'), ('A', 'C'), ('B', 'A')]
+
+    # events before the fission belong to the whole topology, which is
+    # identified by its smallest particle id, and the lone fragments are
+    # identified by their own particle
+    fission = (events['edge'] >= 0) | (
+        (events['old'] != events['new']) & (types[events['new']] == 'A')
+    )
+    ids = np.concatenate([
+        events['vertex'], events['edge'][events['edge'] >= 0]
+    ])
+    assert np.all(events['topology'][fission] == ids.min())
+    lone = ~fission
+    assert lone.sum() == 4
+    assert np.all(events['topology'][lone] == events['vertex'][lone])
+
+    # the id of a topology is only looked up from every vertex again
+    # once it has changed size
+    class Vertex:
+        def __init__(self, i):
+            self.i = i
+
+    class Lookup:
+        def __init__(self, n):
+            self.vertices = [Vertex(i) for i in range(n, 0, -1)]
+            self.calls = 0
+
+        def particle_id_of_vertex(self, vertex):
+            self.calls += 1
+            return vertex.i
+
+        def particle_type_of_vertex(self, vertex):
+            return 'A'
+
+    class Operations:
+        def __init__(self, vertices):
+            self.operations = [('type', 3, 'B')]
+            self.vertices = vertices
+
+    top = Lookup(100)
+    recipe = Operations(top.vertices)
+    cached = EventRecorder(capacity=8)
+    cached.record(top, recipe)
+    first = top.calls
+    cached.record(top, recipe)
+    assert top.calls - first < 10
+    top.vertices.pop(50)
+    cached.record(top, recipe)
+    assert list(cached.events['topology']) == [1, 1, 1]
+    assert top.calls - first > 100
+
+    # without a file only the latest records are kept
+    ring = EventRecorder(capacity=3)
+    for i in range(5):
+        ring.append(0, i, 0, 0, -1)
+    assert list(ring.events['vertex']) == [2, 3, 4]
+    return
+
 if __name__=='__main__':
     test_diatomic()
     test_polymer()
+    test_long_polymer()
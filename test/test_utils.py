@@ -5,11 +5,15 @@ pytest script for testing utils folder
 import typing
 from pathlib import Path
 import numpy as np
+import readdy
+import pandas as pd
 
 from hydrogels.utils import *
 from hydrogels.utils import simulation
 from hydrogels.utils import system
 from hydrogels.utils import topology
+from hydrogels.utils import parallel
+from hydrogels.utils import statistics
 
 import pytest
 
@@ -38,10 +42,196 @@ def test_topology():
         edges=[(0, 1), (1, 2), (2, 0)]
     )
     assert top.connected
+    assert top.sequence == ('A', 'A', 'A')
+    # the sequence is rebuilt on access, so it cannot be changed in place
+    with pytest.raises(AttributeError):
+        top.sequence.append('A')
+    assert not hasattr(top, '__dict__')
+    assert top.edges.shape == (3, 2)
+    assert list(top.degree) == [2, 2, 2]
+
+    # removing edges must invalidate the cached connectivity
+    top.edges = [(0, 1)]
+    assert not top.connected
+    assert top.n_components == 2
+    assert list(top.degree) == [1, 1, 0]
+    assert top.to_networkx().number_of_nodes() == 3
+    top.edges = [(0, 1), (1, 2)]
+    assert top.connected
+
     xyz_path = Path(__file__).parent / 'test.xyz'
     top.export_xyz(xyz_path)
     xyz_path.unlink()
 
+def test_add_topologies():
+    sys = system.System([10., 10., 10.,])
+    sys.topologies.add_type('polymer')
+    sys.add_topology_species('A', 1.0)
+    sys.topologies.configure_harmonic_bond(
+        'A', 'A', force_constant=1.0, length=1.0
+    )
+    simulation = sys.simulation()
+    topologies = [
+        topology.Topology(
+            'polymer',
+            sequence=['A', 'A', 'A'],
+            positions=np.array([
+                [float(i), 0., 0.],
+                [float(i), 0., 1.],
+                [float(i), 0., 2.],
+            ]),
+            edges=[(0, 1), (1, 2)]
+        ) for i in range(4)
+    ]
+    stats = topology.add_topologies(simulation, topologies)
+    assert stats['topologies'] == 4
+    assert stats['particles'] == 12
+    assert stats['edges'] == 8
+    assert len(simulation.current_topologies) == 4
+    assert all(
+        len(top.graph.get_edges()) == 2
+        for top in simulation.current_topologies
+    )
+
+    # without the private ReaDDy API the public add_topology is used
+    class PublicSimulation:
+        def __init__(self, simulation):
+            self.add_topology = simulation.add_topology
+
+    stats = topology.add_topologies(PublicSimulation(simulation), topologies)
+    assert stats['edges'] == 8
+    assert len(simulation.current_topologies) == 8
+
+    # nothing is inserted if any topology is not connected
+    disconnected = topology.Topology(
+        'polymer',
+        sequence=['A', 'A', 'A'],
+        positions=np.zeros((3, 3)),
+        edges=[(0, 1)]
+    )
+    with pytest.raises(ValueError):
+        topology.add_topologies(simulation, topologies + [disconnected])
+    assert len(simulation.current_topologies) == 8
+
+def test_potential_matrix():
+    sys = system.System([10., 10., 10.,])
+    sys.insert_species('a', 1.0, np.array([[1.0, 0.0, 0.0]]))
+    sys.insert_species('b', 1.0, np.array([[3.0, 0.0, 0.0]]))
+    sys.add_potential('lj', 'all', 'all', epsilon=1.0, sigma=1.0, cutoff=2.0)
+
+    # mirrored and duplicated pairs are merged
+    sys.add_potential('lj', 'b', 'a', epsilon=1.0, sigma=1.0, cutoff=2.0)
+    sys.add_potential('lj', ['a'], 'all', epsilon=1.0, sigma=1.0, cutoff=2.0)
+    assert sys.manager.pairs == [('a', 'a'), ('a', 'b'), ('b', 'b')]
+
+    # explicit pairs override pairs expanded from 'all'
+    sys.add_potential('lj', 'b', 'b', epsilon=2.0, sigma=1.0, cutoff=3.0)
+    sys.add_potential('lj', 'all', 'all', epsilon=1.0, sigma=1.0, cutoff=2.0)
+    assert len(sys.potential_list) == 3
+    assert sys.manager.cutoff == 3.0
+
+    matrix = sys.manager.configure()
+    assert ('b', 'a') in matrix
+    # configuring again must not register potentials twice
+    sys.manager.configure()
+    assert len(sys.manager._registered) == 3
+
+def test_kernel_configuration():
+    sys = system.System([10., 10., 10.,])
+    sys.insert_species('a', 1.0, np.random.random((20, 3)))
+    simulation = sys.initialise_simulation(
+        fout=str(OUT),
+        kernel='CPU',
+        threads=1,
+        cell_radius=2,
+    )
+    assert simulation.kernel_configuration.n_threads == 1
+    assert simulation.kernel_configuration.cell_linked_list_radius == 2
+    simulation.run(10, 0.1)
+
+    candidates = system.System.autotune_candidates(max_threads=2)
+    assert {'kernel': 'SingleCPU'} in candidates
+    with pytest.raises(ValueError):
+        sys.initialise_simulation(fout=str(OUT), autotune=True)
+
+    # every candidate is timed on a freshly populated simulation and the
+    # particles are inserted once more for the selected simulation
+    populated = []
+    populate = sys._populate
+    sys._populate = lambda *args: populated.append(1) or populate(*args)
+    simulation = sys.initialise_simulation(
+        fout=str(OUT),
+        timestep=0.1,
+        autotune={'steps': 5, 'candidates': candidates}
+    )
+    del sys._populate
+    assert len(populated) == len(candidates) + 1
+    assert len(sys.autotune_timings) == len(candidates)
+    assert [i[1] for i in sys.autotune_timings] == candidates
+    simulation.run(10, 0.1)
+    OUT.unlink()
+
+    with pytest.raises(ValueError):
+        sys.create_simulation(kernel='GPU')
+
+def test_autotune_quiet():
+    from hydrogels.reactions import BondBreaking
+
+    sys = system.System([10., 10., 10.,])
+    sys.add_species('C', 1.0)
+    sys.insert_topology(
+        topology.Topology(
+            'molecule',
+            sequence=['A', 'B', 'A'],
+            positions=np.array([[0., 0., 0.], [1., 0., 0.], [2., 0., 0.]]),
+            edges=[(0, 1), (1, 2)],
+            bonds=[
+                topology.TopologyBond(
+                    'harmonic', 'A', 'B', force_constant=1.0, length=1.0
+                )
+            ],
+        ),
+        diffusion_constant=1.0,
+    )
+    reaction = BondBreaking('A', 'B', 'C', instrument=True).polymer
+    reaction.register(sys)
+
+    # the trials fire the reaction but must not instrument it
+    sys.autotune(0.1, steps=5, candidates=[{'kernel': 'SingleCPU'}])
+    assert reaction.statistics.calls == 0
+
+def test_simulation_driver(tmp_path):
+    from hydrogels.trajectory.core import ParticleTrajectory
+
+    sys = system.System([10., 10., 10.,])
+    sys.insert_species('a', 1.0, np.array([[1.0, 0.0, 0.0], [2.0, 0.0, 0.0]]))
+    settings = dict(
+        prefix='driver',
+        timestep=0.1,
+        chunk=10,
+        stride=5,
+        checkpoint_stride=5,
+        directory=tmp_path,
+    )
+    driver = simulation.SimulationDriver(sys, length=20, **settings)
+    progress = driver.run()
+    assert progress['completed'] == 20
+    assert len(progress['segments']) == 2
+
+    # pretend that the last segment was interrupted after its checkpoint
+    # at step 5 and then resume with a longer run
+    progress['current'] = progress['segments'].pop()
+    progress['completed'] = 10
+    driver._save(progress)
+    (tmp_path / 'driver.0001.checkpoints' / 'checkpoint_10.h5').unlink()
+    driver = simulation.SimulationDriver(sys, length=30, **settings)
+    progress = driver.run()
+    assert progress['completed'] == 30
+    assert [i['steps'] for i in progress['segments']] == [10, 5, 10, 5]
+
+    trajectory = ParticleTrajectory(driver.progress_file)
+    assert list(trajectory.time) == [0, 5, 10, 15, 20, 25, 30]
+
 def test_system():
     sys = system.System([10., 10., 10.,])
     sys.insert_species('a', 1.0, np.array([[1.0, 0.0, 0.0], [2.0, 0.0, 0.0]]))
@@ -71,7 +261,115 @@ def test_system():
     for target in FOLDER.glob('checkpoint_*'):
         target.unlink()
 
+def _random_seed(seed, threads):
+    if seed == 3:
+        raise ValueError('Bad seed')
+    return np.random.random()
+
+def test_run_seeds():
+    serial = parallel.run_seeds(_random_seed, [1, 2], workers=1)
+    finished = []
+    results = parallel.run_seeds(
+        _random_seed,
+        [1, 2],
+        workers=2,
+        callback=lambda seed, result: finished.append(seed)
+    )
+    assert list(results) == [1, 2]
+    assert results == serial
+    assert sorted(finished) == [1, 2]
+
+    # a failing seed does not stop the others
+    finished = []
+    with pytest.raises(RuntimeError):
+        parallel.run_seeds(
+            _random_seed,
+            [1, 2, 3],
+            workers=2,
+            callback=lambda seed, result: finished.append(seed)
+        )
+    assert sorted(finished) == [1, 2]
+
+def test_create_simulation():
+    sys = system.System([10., 10., 10.,])
+    sys.insert_species('a', 1.0, np.array([[1.0, 0.0, 0.0]]))
+    sys.add_potential('lj', 'all', 'all', epsilon=1.0, sigma=1.0, cutoff=2.0)
+    simulation = parallel.create_simulation(sys, threads=2)
+    assert simulation.kernel_configuration.n_threads == 2
+    # the potentials of a hydrogels System are configured
+    assert len(sys.manager._registered) == 1
+
+    plain = readdy.ReactionDiffusionSystem([10., 10., 10.])
+    plain.add_species('a', 1.0)
+    simulation = parallel.create_simulation(plain, output_file=str(OUT))
+    assert simulation.output_file == str(OUT)
+
+def _random_frame(seed, threads):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'t': np.arange(5.), 'A': rng.random(5)})
+
+def test_streaming_aggregator():
+    rng = np.random.default_rng(0)
+    frames = [
+        pd.DataFrame({'t': np.arange(10.), 'A': rng.random(10), 'B': 1.0})
+        for _ in range(6)
+    ]
+    aggregator = statistics.StreamingAggregator(quantiles=[0.5])
+    aggregator.update(frames)
+    result = aggregator.dataframe
+    assert list(result.columns) == [
+        't', 'A_mean', 'A_std', 'A_q50', 'B_mean', 'B_std', 'B_q50'
+    ]
+    A = pd.concat([frame['A'] for frame in frames], axis=1)
+    assert np.allclose(result['A_mean'], A.mean(axis=1))
+    assert np.allclose(result['A_std'], A.std(axis=1))
+    assert np.allclose(result['A_q50'], A.median(axis=1))
+
+    # results on other grids are interpolated and ignored outside of them
+    aggregator = statistics.StreamingAggregator(grid=[0., 1., 2., 3.])
+    aggregator.add({'t': [0., 2.], 'A': [0., 2.]})
+    aggregator.add({'t': [0., 1., 2., 3.], 'A': [3., 3., 3., 3.]})
+    result = aggregator.dataframe
+    assert np.allclose(result['A_mean'], [1.5, 2.0, 2.5, 3.0])
+    assert np.isnan(result['A_std'][3])
+
+    # without a time column the index grows to hold every row
+    aggregator = statistics.StreamingAggregator(time=None, quantiles=[0.5])
+    aggregator.add(pd.DataFrame({'A': [1., 2.]}, index=[0, 1]))
+    aggregator.add(pd.DataFrame({'A': [3., 4., 5.]}, index=[1, 2, 3]))
+    result = aggregator.dataframe
+    assert list(result.index) == [0, 1, 2, 3]
+    assert np.allclose(result['A_mean'], [1., 2.5, 4., 5.])
+    assert np.allclose(result['A_q50'], [1., 2.5, 4., 5.])
+    assert list(aggregator._statistics.count[:, 0]) == [1, 2, 1, 1]
+
+    # the memory does not grow with the number of results
+    aggregator = statistics.StreamingAggregator(
+        quantiles=[0.1], size=16, seed=0
+    )
+    results = parallel.run_seeds(
+        _random_frame, range(1000), workers=1, callback=aggregator, keep=False
+    )
+    assert results == {}
+    assert aggregator.count == 1000
+    reservoir = aggregator._sketch.reservoir
+    assert reservoir.shape == (16, 5, 1)
+    A = np.array([_random_frame(seed, 1)['A'] for seed in range(1000)])
+    assert np.allclose(aggregator.mean['A'], A.mean(axis=0))
+    assert np.allclose(aggregator.std['A'], A.std(axis=0, ddof=1))
+    # the quantiles are those of a sample of the values of each point
+    assert all(np.isin(reservoir[:, i, 0], A[:, i]).all() for i in range(5))
+    assert np.allclose(
+        aggregator.quantile(0.1)['A'],
+        np.quantile(reservoir[:, :, 0], 0.1, axis=0)
+    )
 
 if __name__=='__main__':
     test_topology()
+    test_add_topologies()
+    test_potential_matrix()
+    test_kernel_configuration()
     test_system()
+    test_run_seeds()
+    test_create_simulation()
+    test_streaming_aggregator()
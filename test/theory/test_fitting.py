@@ -0,0 +1,74 @@
+import functools
+
+import numpy as np
+
+from hydrogels.theory.models import potentials
+from hydrogels.theory.models.integrator import Equation
+from hydrogels.theory.models.simulations import ConstantDensity, LennardJones
+from hydrogels.theory.models.fitting import ModelFit, fit_experiments
+
+SETTINGS = {
+    'sig' : 1.0,
+    'rc' : 5.0,
+    'beta' : 1.0,
+    'c0' : 5.0,
+    'nV' : 1.0,
+    'thickness': 0.01,
+    'rE': 0.5
+}
+
+def experiment(eps: float, rate: float, N: int = 100):
+    simulation = LennardJones(0.1, N, eps=eps, rate=rate, **SETTINGS)
+    simulation.run(300)
+    df = simulation.history.dataframe
+    # same layout as analyse_trajectory
+    return df[['t', 'N']].rename(columns={'N': 'monomer'}).iloc[::10]
+
+def harmonic(R: float = 0.0, K: float = 1.0) -> 'V':
+    """harmonic"""
+    return potentials.harmonic(K, R)
+
+def constant_density(KV: float = 1.0, K: float = 0.01) -> ConstantDensity:
+    return ConstantDensity(
+        0.1,
+        Equation(harmonic, string=harmonic.__doc__),
+        N=100,
+        KV=KV,
+        constants={'K': K}
+    )
+
+def test_fit():
+    simulation = constant_density(2.0, 0.02)
+    simulation.run(300)
+    data = simulation.history.dataframe.iloc[::10]
+    data = data.rename(columns={'N': 'monomer'})
+
+    fit = ModelFit(
+        constant_density,
+        data,
+        {'KV': 5.0, 'K': 0.05},
+        column='monomer'
+    )
+    fitted = fit.fit()
+    assert np.isclose(fitted['KV'], 2.0, rtol=1e-6)
+    assert np.isclose(fitted['K'], 0.02, rtol=1e-6)
+    # every ensemble evaluates the point and a copy for each parameter
+    assert fit.n_candidates == 3 * fit.n_simulations
+    prediction = fit.prediction()
+    assert np.allclose(prediction['data'], prediction['model'])
+
+def test_fit_experiments():
+    model = functools.partial(LennardJones, 0.1, 100, eps=0.03, **SETTINGS)
+    experiments = {
+        'slow': experiment(0.03, 0.3),
+        'fast': experiment(0.03, 0.6),
+    }
+    df = fit_experiments(
+        model,
+        experiments,
+        {'rate': 0.1},
+        column='monomer',
+        fit_kwargs={'xtol': 1e-10},
+    )
+    assert list(df.index) == ['slow', 'fast']
+    assert np.allclose(df['rate'], [0.3, 0.6], rtol=1e-4)
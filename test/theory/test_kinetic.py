@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import hydrogels.engine as engine
+from hydrogels import Topology
+from hydrogels.generators.gels import Gel
+from hydrogels.theory.models.kinetic import KineticMonteCarlo
+
+def chain(n: int, sequence: list = None) -> Topology:
+    return Topology(
+        'gel',
+        sequence=sequence or ['monomer'] * n,
+        positions=np.zeros((n, 3)),
+        edges=[(i, i + 1) for i in range(n - 1)]
+    )
+
+def test_kinetic_monte_carlo():
+    topology = chain(200)
+    times = np.linspace(0.0, 100.0, 21)
+    results = {}
+    for method in ('direct', 'gillespie'):
+        released = []
+        for seed in range(20):
+            model = KineticMonteCarlo(
+                topology,
+                rate=0.2,
+                scission_rate=1.0,
+                method=method,
+                seed=seed
+            )
+            df = model.run(times=times)
+            assert list(df.columns) == ['t', 'monomer', 'unbonded', 'released']
+            assert (df[['monomer', 'unbonded', 'released']].sum(axis=1)
+                    == 200).all()
+            assert (np.diff(df['released']) >= 0).all()
+            released.append(df['released'].values)
+        results[method] = np.mean(released, axis=0)
+
+    # both methods sample the same process
+    assert np.allclose(results['direct'], results['gillespie'], atol=10.)
+    assert results['direct'][-1] == 200
+
+def test_kinetic_monte_carlo_options():
+    # unbonded particles in the sequence are released by scission and
+    # lone particles are released straight away
+    topology = chain(3, ['monomer', 'unbonded', 'monomer'])
+    model = KineticMonteCarlo(topology, rate=0.0, method='gillespie')
+    df = model.run(times=[0.0, 1.0])
+    assert list(df['released']) == [0, 3]
+
+    gel = Gel(
+        'gel',
+        np.array([[0., 0., 0.], [1., 0., 0.], [0., 1., 0.], [0., 0., 1.]]),
+        edges=[(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]
+    )
+    model = KineticMonteCarlo(
+        gel,
+        rate=1.0,
+        accessibility=lambda degree: 1.0 / (1.0 + degree),
+        seed=0
+    )
+    assert model.method == 'gillespie'
+    assert model.run(100.0)['released'].iloc[-1] == 4
+
+    with pytest.raises(ValueError):
+        KineticMonteCarlo(chain(2, ['A', 'monomer']))
+
+def test_kinetic_monte_carlo_dynamic():
+    # a constant function of the number of bonds samples the same process
+    # as the direct method
+    topology = chain(200)
+    times = np.linspace(0.0, 100.0, 21)
+    results = {}
+    for accessibility in (0.5, lambda degree: np.full(len(degree), 0.5)):
+        released = []
+        for seed in range(20):
+            model = KineticMonteCarlo(
+                topology,
+                rate=0.4,
+                scission_rate=1.0,
+                accessibility=accessibility,
+                seed=seed
+            )
+            released.append(model.run(times=times)['released'].values)
+            assert model.n_events > 0
+        results[model.method] = np.mean(released, axis=0)
+    assert np.allclose(results['direct'], results['gillespie'], atol=10.)
+
+    # the same seed gives the same events
+    model = KineticMonteCarlo(
+        topology,
+        accessibility=lambda degree: 1.0 / (1.0 + degree),
+        seed=3
+    )
+    df = model.run(5000.0)
+    other = KineticMonteCarlo(
+        topology,
+        accessibility=lambda degree: 1.0 / (1.0 + degree),
+        seed=3
+    )
+    assert df.equals(other.run(5000.0))
+
+def test_kinetic_monte_carlo_engine():
+    indptr = np.array([0, 1, 2])
+    indices = np.array([1, 0])
+    initial = np.zeros(2, dtype=np.int8)
+    result = engine.kinetic_monte_carlo(
+        indptr, indices, initial, np.ones(2), np.zeros(0), 1e6,
+        np.array([0.0, 1e6]), seed=0
+    )
+    assert result['counts'].tolist() == [[2, 0, 0], [0, 0, 2]]
+    # one monomer degrades and is cut, which releases the other
+    assert result['events'] == 3
+
+    with pytest.raises(ValueError):
+        engine.kinetic_monte_carlo(
+            indptr, np.array([1, 2]), initial, np.ones(2), np.zeros(0),
+            1.0, np.array([0.0]), seed=0
+        )
+    with pytest.raises(ValueError):
+        # no rate for particles with one bond
+        engine.kinetic_monte_carlo(
+            indptr, indices, initial, np.ones(2), np.ones(1), 1.0,
+            np.array([0.0]), seed=0
+        )
@@ -9,6 +9,31 @@ def test_cxx():
     assert functions.boltzmann(1.0, 0.0) == 1.0
     return
 
+def test_cxx_arrays():
+    import numpy as np
+    from hydrogels.theory.models import potentials, functions
+    r = np.linspace(0.9, 3.0, 50)
+    expected = [potentials.lennard_jones(1., 1., 2.5, x) for x in r]
+    assert np.allclose(potentials.lennard_jones(1., 1., 2.5, r), expected)
+
+    # broadcasting (2, 1) against (50,)
+    eps = np.array([[1.], [2.]])
+    result = potentials.lennard_jones(1., eps, 2.5, r)
+    assert result.shape == (2, 50)
+    assert np.allclose(result[1], 2 * np.array(expected))
+
+    # results do not depend on the number of threads
+    N = np.linspace(1., 1e3, 100000)
+    assert np.array_equal(
+        functions.radius_from_number(N, 0.5),
+        functions.radius_from_number(N, 0.5, threads=4)
+    )
+    assert np.allclose(
+        functions.boltzmann(1.0, r),
+        [functions.boltzmann(1.0, x) for x in r]
+    )
+    return
+
 def test_utils():
     return
 
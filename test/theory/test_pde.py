@@ -0,0 +1,42 @@
+import numpy as np
+
+from hydrogels.theory.models.pde import RadialDegradation
+
+def test_conservation():
+    model = RadialDegradation(10.0, rate=0.05, diffusion=0.5, hindrance=4.0)
+    df = model.run(200.0, dt=0.5, samples=21)
+    total = df['monomer'] + df['unbonded'] + df['released']
+    assert np.allclose(total, model.N)
+    assert np.isclose(df['released'].iloc[-1], model.N)
+    assert np.all(np.diff(df['front']) <= 0.0)
+    assert df['front'].iloc[0] == 10.0 and df['front'].iloc[-1] == 0.0
+
+    # no enzymes means no degradation
+    model = RadialDegradation(10.0, rate=0.05, c0=0.0)
+    df = model.run(50.0, dt=1.0, samples=3)
+    assert np.allclose(df['monomer'], model.N)
+
+def test_limits():
+    # with fast diffusion the enzymes are everywhere, so without erosion
+    # the monomers decay with the rate of the 0-D model
+    model = RadialDegradation(
+        5.0,
+        rate=0.1,
+        c0=2.0,
+        diffusion=1e4,
+        barrier=0.5,
+        threshold=0.0,
+        c_gel=2.0,
+    )
+    df = model.run(10.0, dt=0.01, samples=11)
+    k = 0.1 * 2.0 * np.exp(-0.5)
+    assert np.allclose(df['monomer'], model.N * np.exp(-k * df['t']), rtol=1e-3)
+
+    # with slow diffusion the surface degrades before the centre
+    model = RadialDegradation(10.0, rate=0.1, diffusion=0.1, hindrance=10.0)
+    model.run(20.0, dt=0.5)
+    profile = model.profile
+    gel = profile[profile['r'] < model.front]
+    assert gel['monomer'].iloc[0] > 0.9
+    assert gel['monomer'].iloc[-1] < 0.5
+    assert gel['c'].iloc[0] < gel['c'].iloc[-1]
@@ -43,6 +43,244 @@ def test_lennard_jones():
     simu.run(10)
     return
 
+def test_ensemble():
+    import numpy as np
+    from hydrogels.theory.models.simulations import LennardJones
+    from hydrogels.theory.models.integrator import parameter_grid
+    settings = {
+        'sig' : 1.0,
+        'rc' : 5.0,
+        'beta' : 1.0,
+        'c0' : 5.0,
+        'nV' : 1.0,
+        'thickness': 0.01,
+        'rE': 0.5
+    }
+    grid = parameter_grid(eps=[0.5, 1.0, 2.0], rate=[0.1, 0.2])
+    ensemble = LennardJones(0.1, 100, **settings, **grid)
+    assert ensemble.ensemble == 6
+    ensemble.run(20)
+    N = ensemble.history.array('N')
+    assert N.shape == (21, 6)
+    df = ensemble.history.dataframe
+    assert len(df) == 21 * 6
+
+    # every member matches a scalar simulation with the same parameters
+    for member in (0, 5):
+        simu = LennardJones(
+            0.1,
+            100,
+            **settings,
+            eps=grid['eps'][member],
+            rate=grid['rate'][member]
+        )
+        simu.run(20)
+        assert np.allclose(simu.history.dataframe['N'], N[:, member])
+    return
+
+def test_compile():
+    from hydrogels.theory.models.simulations import LennardJones
+    settings = {
+        'sig' : 1.0,
+        'eps' : 1.0,
+        'rc' : 5.0,
+        'beta' : 1.0,
+        'c0' : 5.0,
+        'nV' : 1.0,
+        'rate': 0.1,
+        'thickness': 0.01,
+        'rE': 0.5
+    }
+    reference = LennardJones(0.1, 100, compile=False, **settings)
+    reference.integrate()
+    reference.run(50)
+    compiled = LennardJones(0.1, 100, **settings)
+    assert 'def step' in compiled.source
+    compiled.integrate()
+    compiled.run(50)
+    assert compiled.timestep == 51
+    assert compiled.history.dataframe.equals(reference.history.dataframe)
+    assert compiled.history.meta == reference.history.meta
+    return
+
+def test_solve():
+    import numpy as np
+    from hydrogels.theory.models.simulations import ConstantDensity
+    def func(R: float = 0, K: float = 1.0, rc: float = 10.) -> 'V':
+        """ harmonic with cutoff """
+        if R == 0 or R > rc:
+            return 0.
+        return K * R ** -2
+
+    def simulation(K: float) -> ConstantDensity:
+        return ConstantDensity(
+            0.01,
+            Equation(func, string=func.__doc__),
+            N=100,
+            constants={'K': K, 'rc': 1.0}
+        )
+
+    # the adaptive solution agrees with small fixed steps
+    reference = simulation(1.0)
+    reference.run(20000)
+    adaptive = simulation(1.0)
+    df = adaptive.solve(200.0)
+    assert list(df.columns) == list(reference.history.dataframe.columns)
+    assert np.isclose(
+        df['N'].iloc[-1],
+        reference.history.dataframe['N'].iloc[-1],
+        rtol=1e-2
+    )
+    assert len(df) < 1000
+
+    # without a barrier the gel dissolves at t = N / k
+    adaptive = simulation(0.0)
+    df = adaptive.solve(200.0, t_eval=np.linspace(0, 200, 201))
+    assert df['N'].iloc[-1] == 0.0
+    assert np.isclose(df['t'].iloc[-1], 100.0)
+    assert np.allclose(df['N'][df['t'] <= 50], 100 - df['t'][df['t'] <= 50])
+    return
+
+def test_solve_divergence():
+    import numpy as np
+    import pytest
+    from hydrogels.theory.models.simulations import (
+        ConstantDensity,
+        LennardJones
+    )
+
+    # the rate overflows close to dissolution, which the solver cannot
+    # follow, so it warns instead of returning NaN
+    simulation = LennardJones(
+        0.1, 100, sig=1, eps=0.01, rc=5, beta=1, c0=5, nV=1, rate=1,
+        thickness=1, rE=0.5
+    )
+    with pytest.warns(RuntimeWarning):
+        df = simulation.solve(200.0)
+    assert not simulation.solution.success
+    assert not df.isna().any().any()
+    assert df['t'].iloc[-1] < 0.2
+    assert df['N'].between(0.0, 100.0).all()
+
+    # infinite derivatives stop the integration and deplete the state
+    def func(R: float = 0) -> 'V':
+        return 0.
+    for method in ('LSODA', 'RK45'):
+        simulation = ConstantDensity(0.01, Equation(func), N=100)
+        with pytest.warns(RuntimeWarning, match='not finite'):
+            df = simulation.solve(
+                200.0,
+                method=method,
+                derivatives={
+                    'N': lambda v: -1.0 if v['N'] > 50 else -np.inf
+                }
+            )
+        assert df['N'].iloc[-1] == 0.0
+        assert np.isclose(df['t'].iloc[-1], 50.0, atol=1.0)
+        assert (df['N'].iloc[:-1] >= 49.0).all()
+    return
+
+def test_native():
+    import numpy as np
+    from hydrogels.theory.models import potentials
+    from hydrogels.theory.models.simulations import (
+        ConstantDensity,
+        LennardJones
+    )
+    settings = {
+        'sig' : 1.0,
+        'eps' : 1.0,
+        'rc' : 5.0,
+        'beta' : 1.0,
+        'c0' : 5.0,
+        'nV' : 1.0,
+        'rate': 0.1,
+        'thickness': 0.01,
+        'rE': 0.5
+    }
+    reference = LennardJones(1.0, 100, **settings)
+    reference.run(200)
+    expected = reference.history.dataframe
+    native = LennardJones(1.0, 100, **settings).run_native(200)
+    assert list(native.columns) == list(expected.columns)
+    assert np.allclose(native, expected, equal_nan=True)
+
+    # recording every 10 steps from the current state
+    simu = LennardJones(1.0, 100, **settings)
+    simu.run(50)
+    strided = simu.run_native(150, stride=10)
+    assert len(strided) == 16
+    assert np.allclose(strided, expected.iloc[50::10], equal_nan=True)
+
+    def func(R: float = 0, K: float = 1.0) -> 'V':
+        """harmonic"""
+        return potentials.harmonic(K, R)
+
+    def simulation() -> ConstantDensity:
+        return ConstantDensity(
+            0.1,
+            Equation(func, string=func.__doc__),
+            N=50,
+            KV=2.0,
+            native_potential='harmonic',
+            constants={'K': 0.01},
+        )
+
+    reference = simulation()
+    reference.run(500)
+    native = simulation().run_native(500, terminate=True)
+    assert native['N'].iloc[-1] == 0.0
+    assert len(native) < 501
+    assert np.allclose(
+        native,
+        reference.history.dataframe.iloc[:len(native)],
+        equal_nan=True
+    )
+    return
+
+def test_record_every():
+    import numpy as np
+    from hydrogels.theory.models.simulations import LennardJones
+    settings = {
+        'sig' : 1.0,
+        'eps' : 0.03,
+        'rc' : 5.0,
+        'beta' : 1.0,
+        'c0' : 5.0,
+        'nV' : 1.0,
+        'rate': 0.5,
+        'thickness': 0.01,
+        'rE': 0.5
+    }
+    reference = LennardJones(0.1, 100, **settings)
+    reference.run(10000)
+    expected = reference.history.dataframe
+    assert len(expected) == 10001
+    # the dataframe wraps the buffer of the history
+    assert np.shares_memory(expected['N'].values, reference.history.array('N'))
+
+    decimated = LennardJones(0.1, 100, record_every=100, **settings)
+    decimated.run(5000)
+    decimated.run(5000)
+    df = decimated.history.dataframe
+    assert len(df) == 101
+    assert np.allclose(df, expected.iloc[::100], equal_nan=True)
+    assert np.allclose(df['t'], np.arange(101) * 10.0)
+
+    ensemble = LennardJones(
+        0.1, 100, record_every=10, **{**settings, 'rate': np.array([0.5, 1.0])}
+    )
+    ensemble.run(100)
+    assert ensemble.history.array('N').shape == (11, 2)
+    assert np.allclose(ensemble.history.array('N')[:, 0], expected['N'][:101:10])
+    return
+
 if __name__ == '__main__':
     test_constant_density()
-    test_lennard_jones()
\ No newline at end of file
+    test_lennard_jones()
+    test_ensemble()
+    test_compile()
+    test_solve()
+    test_solve_divergence()
+    test_native()
+    test_record_every()
\ No newline at end of file
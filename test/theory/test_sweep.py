@@ -0,0 +1,52 @@
+import functools
+
+import numpy as np
+
+from hydrogels.theory.models.simulations import LennardJones
+from hydrogels.theory.models.sweep import Sweep, ResultCache, grid_points
+
+SETTINGS = {
+    'sig' : 1.0,
+    'rc' : 5.0,
+    'beta' : 1.0,
+    'c0' : 5.0,
+    'nV' : 1.0,
+    'thickness': 0.01,
+    'rE': 0.5
+}
+
+def test_grid_points():
+    points = grid_points({'eps': [1.0, 2.0], 'rate': [0.1, 0.2, 0.3]})
+    assert len(points) == 6
+    assert points[1] == {'eps': 1.0, 'rate': 0.2}
+    assert grid_points([{'eps': 1.0}]) == [{'eps': 1.0}]
+    assert ResultCache.key({'a': 1}) == ResultCache.key({'a': 1.0})
+    assert ResultCache.key({'a': 1}) != ResultCache.key({'a': 2})
+
+def test_sweep(tmp_path):
+    model = functools.partial(LennardJones, 0.1, 100, **SETTINGS)
+    sweep = Sweep(model, steps=20, cache=tmp_path, workers=2)
+    df = sweep.run({'eps': [0.5, 1.0], 'rate': [0.1, 0.2]})
+    assert sweep.computed == 4 and sweep.cached == 0
+    assert len(df) == 4 * 21
+    assert len(sweep.cache) == 4
+
+    reference = LennardJones(0.1, 100, eps=1.0, rate=0.2, **SETTINGS)
+    reference.run(20)
+    point = df[(df['eps'] == 1.0) & (df['rate'] == 0.2)]
+    assert np.allclose(point['N'], reference.history.dataframe['N'])
+
+    # only the new points are computed when the grid is extended
+    extended = Sweep(model, steps=20, cache=tmp_path, workers=1)
+    result = extended.run({'eps': [0.5, 1.0, 2.0], 'rate': [0.1, 0.2]})
+    assert extended.computed == 2 and extended.cached == 4
+    assert np.allclose(
+        result[result['eps'] < 2.0]['N'].values,
+        df['N'].values
+    )
+    assert extended.meta[0]['constants']['eps'] == 0.5
+
+    # other settings do not reuse the cached results
+    longer = Sweep(model, steps=30, cache=tmp_path, workers=1)
+    longer.run({'eps': [0.5], 'rate': [0.1]})
+    assert longer.computed == 1
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from hydrogels.theory.models import potentials
+from hydrogels.theory.models.tabulated import TabulatedPotential, macro_LJ_table
+
+SETTINGS = {
+    'sig' : 1.0,
+    'eps' : 1.0,
+    'rc' : 5.0,
+    'beta' : 1.0,
+    'c0' : 5.0,
+    'nV' : 1.0,
+    'rate': 0.1,
+    'thickness': 0.01,
+    'rE': 0.5
+}
+
+def test_table():
+    table = macro_LJ_table(1.0, 1.0, 1.0, 0.5, 12, (1.0, 10.0, 1025))
+    assert table is macro_LJ_table(1.0, 1.0, 1.0, 0.5, 12, (1.0, 10.0, 1025))
+    r = np.linspace(1.0, 10.0, 10001)
+    exact = potentials.macro_LJ(1.0, 1.0, 1.0, 12, 0.5, r)
+    assert np.max(np.abs(table(r) - exact)) <= 2 * table.error
+    assert np.isclose(table(3.3), potentials.macro_LJ(1, 1, 1, 12, 0.5, 3.3))
+
+    # the exact function is used outside of the grid
+    assert table(0.8) == potentials.macro_LJ(1, 1, 1, 12, 0.5, 0.8)
+    assert np.isnan(table.table(0.8))
+
+    # tables on the same grid can be combined
+    other = macro_LJ_table(1.0, 1.0, 1.0, 0.5, 6, (1.0, 10.0, 1025))
+    difference = table - other
+    assert np.allclose(
+        difference(r),
+        exact - potentials.macro_LJ(1.0, 1.0, 1.0, 6, 0.5, r),
+        atol=difference.error
+    )
+    with pytest.raises(ValueError):
+        table - macro_LJ_table(1.0, 1.0, 1.0, 0.5, 6, (1.0, 10.0, 513))
+
+def test_tolerance():
+    table = TabulatedPotential(
+        lambda r: potentials.macro_LJ(1.0, 1.0, 1.0, 12, 0.5, r),
+        grid=(1.0, 10.0, 17),
+        tolerance=1e-8
+    )
+    assert table.error <= 1e-8
+    assert table.grid[2] > 17
+    with pytest.raises(ValueError):
+        TabulatedPotential(np.sin, (0.0, 10.0, 5), 1e-12, max_points=100)
+
+def test_lennard_jones_table():
+    from hydrogels.theory.models.simulations import LennardJones
+    exact = LennardJones(1.0, 100, **SETTINGS)
+    exact.run(100)
+    tabulated = LennardJones(1.0, 100, table=(1.0, 10.0, 4097), **SETTINGS)
+    tabulated.run(100)
+    assert 'Tabulated' in tabulated.history.meta['equations'][1]
+    assert np.allclose(
+        tabulated.history.dataframe,
+        exact.history.dataframe,
+        equal_nan=True,
+        rtol=1e-6
+    )
+
+    # the native integrator uses the same table
+    native = LennardJones(
+        1.0, 100, table=(1.0, 10.0, 4097), **SETTINGS
+    ).run_native(100)
+    assert np.allclose(native, tabulated.history.dataframe, equal_nan=True)
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import numpy as np
+import readdy
+
+from hydrogels.trajectory import count_species, count_observable_particles
+
+FOLDER = Path(__file__).parent
+H5 = FOLDER / '_test.h5'
+
+def test_count_species():
+    particle_types = {'A': 2, 'B': 0, 'C': 1}
+    types = [
+        np.array([2, 2, 0]),
+        np.array([], dtype=int),
+        np.array([1, 0, 0, 2]),
+    ]
+    counts = count_species(
+        types,
+        particle_types,
+        species=['A', 'B', 'D'],
+        time=[0., 1., 2.]
+    )
+    assert list(counts.columns) == ['t', 'A', 'B', 'D']
+    assert list(counts['A']) == [2, 0, 1]
+    assert list(counts['B']) == [1, 0, 2]
+    assert list(counts['D']) == [0, 0, 0]
+
+    counts = count_species(types, particle_types)
+    assert list(counts.columns) == ['A', 'B', 'C']
+    assert list(counts['C']) == [0, 0, 1]
+
+def test_count_observable_particles():
+    trajectory = readdy.Trajectory(str(H5))
+    time, types, _, _ = trajectory.read_observable_particles()
+    counts = count_observable_particles(H5, timestep=0.1)
+    assert np.allclose(counts['t'], np.asarray(time) * 0.1)
+    for name, code in trajectory.particle_types.items():
+        expected = [np.sum(row == code) for row in types]
+        assert list(counts[name]) == expected
+
+if __name__ == '__main__':
+    test_count_species()
+    test_count_observable_particles()